@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Batch Analyze - Run a folder of saved screenshots through the AI analyzer
+
+Example (against a local mock Gemini server):
+    python scripts/batch_analyze.py screenshots results.jsonl --base-url http://127.0.0.1:8765/v1beta/models/mock:generateContent
+"""
+
+import os
+import sys
+import argparse
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.ai_analyzer import AIAnalyzer
+from src.core.batch_analyzer import BatchAnalyzer
+from src.core.rate_limiter import TokenBucket
+from src.utils.logger import Logger
+
+def main():
+    """Parse arguments and run the batch"""
+    parser = argparse.ArgumentParser(description="Offline batch evaluation of base screenshots")
+    parser.add_argument("screenshot_dir", help="Directory with saved screenshots")
+    parser.add_argument("output", help="Output file (.jsonl or .csv)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY", "offline"),
+                        help="Gemini API key (defaults to $GEMINI_API_KEY)")
+    parser.add_argument("--base-url", default=None, help="generateContent URL, e.g. a local mock server")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int, default=None, help="Only analyze the first N screenshots")
+    parser.add_argument("--min-gold", type=int, default=300000)
+    parser.add_argument("--min-elixir", type=int, default=300000)
+    parser.add_argument("--min-dark", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger = Logger("batch_analyze.log")
+    # The batch paces itself, so the analyzer's own limiter only needs to match --rate
+    requests_per_minute = args.rate * 60 if args.rate > 0 else 1e9
+    analyzer = AIAnalyzer(api_key=args.api_key, logger=logger, base_url=args.base_url,
+                          rate_limiter=TokenBucket(requests_per_minute, burst=args.concurrency),
+                          max_wait=3600)
+    batch = BatchAnalyzer(analyzer, logger, concurrency=args.concurrency, requests_per_second=args.rate)
+
+    summary = batch.run(args.screenshot_dir, args.output, args.min_gold, args.min_elixir,
+                        args.min_dark, args.limit)
+
+    print("\n=== BATCH SUMMARY ===")
+    for key, value in summary.items():
+        if isinstance(value, float):
+            print(f"  {key}: {value:.2f}")
+        else:
+            print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main()
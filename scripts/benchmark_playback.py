@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark Playback - Measure how faithfully AttackPlayer reproduces recordings
+
+Plays synthetic recordings (and optionally real ones) into a virtual input
+sink - no screen, keyboard or mouse needed - and reports per-action timing
+error, total duration overshoot and CPU use for each speed and action
+density, plus the highest tap rate the player sustains. Use --max-p95-ms /
+--max-overshoot-ms to turn it into a pass/fail regression gate.
+--input-backend injects through a real backend as well (e.g. xtest under
+Xvfb), so injection cost is included in the timings. --vision-load keeps
+template matching and PNG encoding busy during the runs, either in a thread
+of this process or in a vision worker process, to show its effect on timing.
+--session-video publishes frames to a frame bus and records them with the
+session video recorder during the runs, and reports encoder throughput.
+
+Example:
+    python scripts/benchmark_playback.py --speeds 1 2 --densities 2 20 100
+    python scripts/benchmark_playback.py --recording recordings/my_attack.npz --json bench.json
+    xvfb-run -s "-screen 0 1280x720x24" python scripts/benchmark_playback.py --input-backend xtest
+    python scripts/benchmark_playback.py --vision-load process
+    python scripts/benchmark_playback.py --session-video
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import itertools
+import tempfile
+import threading
+import contextlib
+
+import cv2
+import numpy as np
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.attack_player import AttackPlayer
+from src.core.input_backend import VirtualInputSink, create_input_backend
+from src.core.playback_plan import compile_plan, OP_CLICK, OP_DRAG, OP_HOLD
+from src.core.recording_format import RecordingFile, encode_actions
+from src.core.vision_worker import VisionPool
+from src.core.frame_bus import FrameBus, FrameCapturer
+from src.core.session_video import SessionVideoRecorder
+
+class InjectingSink(VirtualInputSink):
+    """Sends every batch through a real backend, then records it - timestamps include the injection"""
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.name = backend.name
+
+    def send(self, commands) -> None:
+        self.backend.send(commands)
+        super().send(commands)
+
+class VisionLoad:
+    """Continuous template matching and PNG encoding of a 1280x720 frame, in a thread or a vision worker"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.requests = 0
+        self.workdir = tempfile.mkdtemp(prefix="vision_load_")
+        frame = np.random.default_rng(0).integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)
+        self.image_path = os.path.join(self.workdir, "frame.png")
+        self.template_path = os.path.join(self.workdir, "template.png")
+        self.output_path = os.path.join(self.workdir, "encoded.png")
+        cv2.imwrite(self.image_path, frame)
+        cv2.imwrite(self.template_path, frame[300:364, 500:564])
+        self.pool = VisionPool(workers=1) if mode == "process" else None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self.pool and not self.pool.start():
+            raise RuntimeError("Vision worker did not start")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.pool:
+                self.pool.match_template(self.template_path, image_path=self.image_path).result()
+                self.pool.save_region(self.output_path, image_path=self.image_path).result()
+            else:
+                image = cv2.imread(self.image_path)
+                cv2.minMaxLoc(cv2.matchTemplate(image, cv2.imread(self.template_path), cv2.TM_CCOEFF_NORMED))
+                cv2.imwrite(self.output_path, image)
+            self.requests += 2
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self.pool:
+            self.pool.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+class VideoLoad:
+    """A 1280x720 frame bus at 10 fps with the session video recorder encoding it"""
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix="session_video_")
+        frames = np.random.default_rng(0).integers(0, 256, size=(8, 720, 1280, 3), dtype=np.uint8)
+        self.frames = iter(frames[i % len(frames)] for i in itertools.count())
+        self.bus = FrameBus(1280, 720)
+        self.capturer = FrameCapturer(lambda region: next(self.frames), self.bus, fps=10, region=(0, 0, 1280, 720))
+        self.recorder = SessionVideoRecorder(self.bus.name, directory=self.workdir)
+        self.stats = {}
+
+    def start(self) -> None:
+        self.capturer.start()
+        if not self.recorder.start():
+            raise RuntimeError("Session video recorder did not start")
+        self.recorder.record("benchmark")
+
+    def stop(self) -> None:
+        self.recorder.pause()
+        self.recorder.close()
+        self.stats = self.recorder.get_stats()
+        self.capturer.stop()
+        self.bus.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+def synthetic_actions(density: float, duration: float, seed: int = 0) -> list:
+    """Taps at ~density per second with jittered gaps, plus a drag and a hold every few seconds"""
+    rng = random.Random(seed)
+    actions = []
+    t = 0.05
+    next_gesture = 1.0
+    while t < duration:
+        if t >= next_gesture:
+            if len(actions) % 2:
+                actions.append({'type': 'drag', 'timestamp': t, 'x': 600, 'y': 300, 'start_x': 400,
+                                'start_y': 300, 'duration': 0.2,
+                                'path': [[400 + 20 * k, 300, 0.02 * k] for k in range(11)]})
+            else:
+                actions.append({'type': 'hold', 'timestamp': t, 'x': 500, 'y': 500, 'duration': 0.15})
+            t += 0.25
+            next_gesture += 2.0
+            continue
+        actions.append({'type': 'click', 'timestamp': t, 'x': rng.randint(100, 1800),
+                        'y': rng.randint(100, 1000), 'hold': 0.03})
+        t += rng.uniform(0.5, 1.5) / density
+    return actions
+
+def plan_from_actions(name: str, actions: list, speed: float):
+    array, paths, type_names, extras = encode_actions(actions)
+    header = {'name': name, 'type_names': type_names, 'extras': extras,
+              'duration': actions[-1]['timestamp'] if actions else 0}
+    return compile_plan(name, header, array, paths, speed)
+
+def plan_from_file(filepath: str, speed: float):
+    with RecordingFile(filepath) as recording:
+        return compile_plan(os.path.basename(filepath), recording.header, recording.actions, recording.paths, speed)
+
+def expected_presses(plan) -> list:
+    """Scheduled time of every button press the plan should produce"""
+    presses = []
+    for i, op in enumerate(plan.ops):
+        if op == OP_CLICK and plan.paths[i]:
+            presses.extend(point[2] for point in plan.paths[i])  # Merged taps
+        elif op == OP_CLICK:
+            presses.append(plan.deadlines[i])
+        elif op == OP_HOLD:
+            presses.append(plan.deadlines[i])
+        elif op == OP_DRAG:
+            presses.append(plan.paths[i][0][2])
+    return sorted(presses)
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run_plan(player: AttackPlayer, sink: VirtualInputSink, plan) -> dict:
+    """Play one plan into the sink and measure it"""
+    sink.clear()
+    player.is_playing = True
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        player._playback_loop(plan)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    origin = player.scheduler.origin
+    presses = [timestamp - origin for timestamp, _ in sink.get_events('down')]
+    expected = expected_presses(plan)
+    errors = [(actual - scheduled) * 1000 for actual, scheduled in zip(presses, expected)]
+    abs_errors = [abs(error) for error in errors]
+    last_event = max((timestamp for timestamp, _ in sink.get_events()), default=origin) - origin
+
+    return {
+        'recording': plan.session_name,
+        'speed': plan.speed,
+        'actions': len(plan),
+        'presses_expected': len(expected),
+        'presses_sent': len(presses),
+        'mean_error_ms': sum(abs_errors) / len(abs_errors) if abs_errors else 0.0,
+        'p50_error_ms': percentile(abs_errors, 0.5),
+        'p95_error_ms': percentile(abs_errors, 0.95),
+        'max_error_ms': max(abs_errors, default=0.0),
+        'overshoot_ms': (last_event - plan.end_time) * 1000,
+        'wall_s': wall,
+        'cpu_percent': cpu / wall * 100 if wall else 0.0,
+        'batches': sink.batches
+    }
+
+RATES = (50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+def max_sustainable_rate(player: AttackPlayer, sink: VirtualInputSink, limit_ms: float) -> int:
+    """Highest tap rate (taps/s, evenly spaced for one second) whose p95 error stays under limit_ms"""
+    best = 0
+    for rate in RATES:
+        actions = [{'type': 'click', 'timestamp': i / rate, 'x': 100 + i % 500, 'y': 200}
+                   for i in range(rate)]
+        result = run_plan(player, sink, plan_from_actions(f"rate_{rate}", actions, 1.0))
+        if result['p95_error_ms'] > limit_ms or result['presses_sent'] != result['presses_expected']:
+            break
+        best = rate
+    return best
+
+def print_result(result: dict) -> None:
+    print(f"{result['recording']:<22} {result['speed']:>5.1f}x {result['actions']:>6} "
+          f"{result['mean_error_ms']:>8.2f} {result['p95_error_ms']:>8.2f} {result['max_error_ms']:>8.2f} "
+          f"{result['overshoot_ms']:>10.1f} {result['cpu_percent']:>6.1f}%")
+
+def main():
+    """Parse arguments and run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark playback timing fidelity")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[1.0, 2.0])
+    parser.add_argument("--densities", type=float, nargs="+", default=[2, 20, 100],
+                        help="Synthetic tap densities in actions per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="Length of each synthetic recording")
+    parser.add_argument("--recording", action="append", default=[], help="Real .npz recording (repeatable)")
+    parser.add_argument("--rate-limit-ms", type=float, default=5.0,
+                        help="p95 error allowed when searching the max sustainable rate")
+    parser.add_argument("--skip-rate", action="store_true", help="Skip the max sustainable rate search")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any run's p95 timing error exceeds this")
+    parser.add_argument("--max-overshoot-ms", type=float, help="Fail if any run overshoots by more than this")
+    parser.add_argument("--json", help="Write all results to this JSON file")
+    parser.add_argument("--input-backend", help="Also inject through this backend (e.g. xtest, pyautogui)")
+    parser.add_argument("--vision-load", choices=["thread", "process"],
+                        help="Keep vision work running during the benchmark, in this process or a worker process")
+    parser.add_argument("--session-video", action="store_true",
+                        help="Record a frame bus with the session video recorder during the benchmark")
+    args = parser.parse_args()
+
+    sink = InjectingSink(create_input_backend(args.input_backend)) if args.input_backend else VirtualInputSink()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        player = AttackPlayer(input_backend=sink, hotkeys=False)
+
+    plans = []
+    for speed in args.speeds:
+        for density in args.densities:
+            actions = synthetic_actions(density, args.duration, seed=int(density))
+            plans.append(plan_from_actions(f"synthetic_{density:g}/s", actions, speed))
+        for filepath in args.recording:
+            plans.append(plan_from_file(filepath, speed))
+
+    load = VisionLoad(args.vision_load) if args.vision_load else None
+    if load:
+        load.start()
+    video = VideoLoad() if args.session_video else None
+    if video:
+        video.start()
+
+    print(f"{'recording':<22} {'speed':>6} {'actions':>6} {'mean ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'overshoot':>10} {'cpu':>7}")
+    results = []
+    for plan in plans:
+        result = run_plan(player, sink, plan)
+        results.append(result)
+        print_result(result)
+
+    summary = {'runs': results}
+    if not args.skip_rate:
+        summary['max_sustainable_rate'] = max_sustainable_rate(player, sink, args.rate_limit_ms)
+        at_least = ">= " if summary['max_sustainable_rate'] == RATES[-1] else ""
+        print(f"\nMax sustainable tap rate: {at_least}{summary['max_sustainable_rate']} taps/s "
+              f"(p95 error <= {args.rate_limit_ms:g} ms)")
+
+    if load:
+        load.stop()
+        summary['vision_load'] = {'mode': load.mode, 'requests': load.requests}
+        print(f"\nVision load ({load.mode}): {load.requests} requests completed during the runs")
+    if video:
+        video.stop()
+        summary['session_video'] = video.stats
+        print(f"\nSession video: {video.stats.get('frames_written', 0)} frames at {video.stats['target_fps']:g} fps, "
+              f"{video.stats.get('dropped', 0)} dropped, {video.stats.get('repeated', 0)} repeated, "
+              f"encoder capacity {video.stats['encode_fps']:.0f} frames/s ({video.stats['mean_encode_ms']:.1f} ms mean)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    failures = []
+    for result in results:
+        if args.max_p95_ms is not None and result['p95_error_ms'] > args.max_p95_ms:
+            failures.append(f"{result['recording']} @ {result['speed']}x: p95 {result['p95_error_ms']:.2f} ms")
+        if args.max_overshoot_ms is not None and result['overshoot_ms'] > args.max_overshoot_ms:
+            failures.append(f"{result['recording']} @ {result['speed']}x: overshoot {result['overshoot_ms']:.1f} ms")
+        if result['presses_sent'] != result['presses_expected']:
+            failures.append(f"{result['recording']} @ {result['speed']}x: "
+                            f"{result['presses_sent']}/{result['presses_expected']} presses sent")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Build Town Hall Bank - Create the local Town Hall template bank from labelled screenshots
+
+Labels can be given as a JSON file:
+    [{"image": "screenshots/base_001.png", "level": 12, "box": [512, 288, 96, 90]}, ...]
+or as a folder of pre-cut Town Hall crops with one sub-folder per level (e.g. th_crops/12/*.png).
+
+Example:
+    python scripts/build_townhall_bank.py --labels th_labels.json --output templates/townhall_bank.npz
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.townhall_detector import TownHallDetector
+
+def load_crop_samples(crops_dir: str, source_width: int) -> list:
+    """Collect crops from <crops_dir>/<level>/*.png (folder names like '12' or 'th12')"""
+    samples = []
+    for folder in sorted(os.listdir(crops_dir)):
+        match = re.search(r'\d+', folder)
+        folder_path = os.path.join(crops_dir, folder)
+        if not match or not os.path.isdir(folder_path):
+            continue
+        for name in sorted(os.listdir(folder_path)):
+            if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                samples.append({
+                    'image': os.path.join(folder_path, name),
+                    'level': int(match.group()),
+                    'source_width': source_width
+                })
+    return samples
+
+def evaluate(bank_path: str, samples: list) -> None:
+    """Run the freshly built bank over the labelled screenshots"""
+    detector = TownHallDetector(bank_path)
+    correct = confident = 0
+    elapsed = []
+
+    for sample in samples:
+        result = detector.detect_file(sample['image'])
+        if not result:
+            continue
+        elapsed.append(result['elapsed_ms'])
+        correct += result['level'] == sample['level']
+        confident += result['confident']
+
+    if elapsed:
+        print(f"\nSelf-check on {len(samples)} labelled screenshots:")
+        print(f"  Accuracy: {correct / len(samples):.1%}")
+        print(f"  Confident: {confident / len(samples):.1%}")
+        print(f"  Mean time: {sum(elapsed) / len(elapsed):.1f} ms")
+        print("  (Training images - use held-out screenshots for a real estimate)")
+
+def main():
+    """Parse arguments and build the bank"""
+    parser = argparse.ArgumentParser(description="Build the Town Hall template bank")
+    parser.add_argument("--labels", help="JSON file with image/level/box entries")
+    parser.add_argument("--crops-dir", help="Folder with one sub-folder of Town Hall crops per level")
+    parser.add_argument("--source-width", type=int, default=1280,
+                        help="Screenshot width the crops in --crops-dir were cut from")
+    parser.add_argument("--reference-width", type=int, default=1280,
+                        help="Screenshot width templates are normalized to")
+    parser.add_argument("--output", default="templates/townhall_bank.npz")
+    args = parser.parse_args()
+
+    if not args.labels and not args.crops_dir:
+        parser.error("Provide --labels and/or --crops-dir")
+
+    labelled = []
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            labelled = json.load(f)
+
+    samples = list(labelled)
+    if args.crops_dir:
+        samples.extend(load_crop_samples(args.crops_dir, args.source_width))
+
+    if not samples:
+        print("No labelled samples found")
+        sys.exit(1)
+
+    count = TownHallDetector.build_bank(samples, args.output, args.reference_width)
+    if count and labelled:
+        evaluate(args.output, [s for s in labelled if s.get('box')])
+
+if __name__ == "__main__":
+    main()
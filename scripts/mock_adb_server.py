@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Mock ADB Server - Run a local ADB stand-in with fake devices for offline testing
+
+Example:
+    python scripts/mock_adb_server.py --port 5037 --devices emulator-5554 emulator-5556 --size 1280x720
+"""
+
+import os
+import sys
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.mock_adb_server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Mock Gemini Server - Run the local Gemini stand-in for offline testing
+
+Example:
+    python scripts/mock_gemini_server.py --port 8765 --latency uniform:0.2,0.8 --fault-429 0.05
+"""
+
+import os
+import sys
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.mock_gemini_server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Simulate Instances - Drive several fake emulator instances through the orchestrator
+
+Example:
+    python scripts/simulate_instances.py --instances 4 --duration 30
+"""
+
+import os
+import sys
+
+# Make the src package importable when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.simulated_instance import main
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,23 @@ Bot Controller - Main logic controller for COC Attack Bot
 import time
 import json
 from typing import Dict, List, Optional, Tuple
-from .core.screen_capture import ScreenCapture
+from .core.screen_capture import ScreenCapture, screen_size
 from .core.coordinate_mapper import CoordinateMapper
 from .core.attack_recorder import AttackRecorder
 from .core.attack_player import AttackPlayer
 from .core.auto_attacker import AutoAttacker
 from .core.ai_analyzer import AIAnalyzer
+from .core.rate_limiter import TokenBucket, QuotaTracker
+from .core.townhall_detector import TownHallDetector
+from .core.recording_optimizer import RecordingOptimizer
+from .core.input_backend import create_input_backend
+from .core.playback_verifier import PlaybackVerifier
+from .core.hotkey_service import default_hotkey_service
+from .core.orchestrator import Orchestrator, VisionService
+from .core.adb_backend import AdbDevice, AdbInputBackend
+from .core.frame_bus import FrameBus, FrameCapturer
+from .core.vision_worker import VisionPool
+from .core.session_video import SessionVideoRecorder
 from .utils.config import Config
 from .utils.logger import Logger
 
@@ -20,13 +31,44 @@ class BotController:
     def __init__(self):
         self.logger = Logger()
         self.config = Config()
-        self.screen_capture = ScreenCapture()
-        self.coordinate_mapper = CoordinateMapper()
-        self.attack_recorder = AttackRecorder()
-        self.attack_player = AttackPlayer()
+        self.adb_device = self._create_adb_device()
+        self.screen_capture = ScreenCapture(device=self.adb_device,
+                                            backend=self.config.get("capture.backend", "auto"))
+        self.frame_capturer = self._create_frame_capturer()
+        self.vision_pool = self._create_vision_pool()
+        self.session_video = self._create_session_video()
+        self.hotkeys = default_hotkey_service()
+        self.coordinate_mapper = CoordinateMapper(hotkey_service=self.hotkeys)
+        self.attack_recorder = AttackRecorder(screen_capture=self.screen_capture)
+        self.attack_recorder.recover_journals()  # Once per bot, not per player or instance
+        if self.adb_device:
+            self.input_backend = AdbInputBackend(self.adb_device, gestures=self.config.get("adb.gestures", "swipe"))
+        else:
+            self.input_backend = create_input_backend(self.config.get("input.backend", "auto"))
+        self.attack_player = AttackPlayer(
+            screen_capture=self.screen_capture,
+            input_backend=self.input_backend,
+            verifier=self._create_playback_verifier(),
+            hotkey_service=self.hotkeys,
+            attack_recorder=self.attack_recorder
+        )
         self.ai_analyzer = AIAnalyzer(
             api_key=self.config.get("ai_analyzer.google_gemini_api_key", ""),
-            logger=self.logger
+            logger=self.logger,
+            base_url=self.config.get("ai_analyzer.base_url") or None,
+            rate_limiter=TokenBucket(
+                requests_per_minute=self.config.get("ai_analyzer.rate_limit.requests_per_minute", 15),
+                burst=self.config.get("ai_analyzer.rate_limit.burst", 3)
+            ),
+            quota=QuotaTracker(
+                calls_per_hour=self.config.get("ai_analyzer.rate_limit.calls_per_hour", 0),
+                calls_per_day=self.config.get("ai_analyzer.rate_limit.calls_per_day", 1000),
+                tokens_per_hour=self.config.get("ai_analyzer.rate_limit.tokens_per_hour", 0),
+                tokens_per_day=self.config.get("ai_analyzer.rate_limit.tokens_per_day", 0)
+            ),
+            pressure_threshold=self.config.get("ai_analyzer.rate_limit.pressure_threshold", 0.8),
+            max_wait=self.config.get("ai_analyzer.rate_limit.max_wait_seconds", 20),
+            cooldown_on_429=self.config.get("ai_analyzer.rate_limit.cooldown_on_429", 30)
         )
         self.auto_attacker = AutoAttacker(
             attack_player=self.attack_player, 
@@ -34,14 +76,121 @@ class BotController:
             coordinate_mapper=self.coordinate_mapper, 
             logger=self.logger,
             ai_analyzer=self.ai_analyzer,
-            config=self.config  # Pass the single config instance
+            config=self.config,  # Pass the single config instance
+            townhall_detector=self.vision_pool if self.vision_pool else self._create_townhall_detector(),
+            input_backend=self.input_backend,
+            hotkey_service=self.hotkeys,
+            session_video=self.session_video
         )
         
+        self.orchestrator = None  # Multi-instance workers, created on first use
+        
         self.is_recording = False
         self.is_playing = False
         
+        capture_backend = "adb" if self.adb_device else self.screen_capture.backend
+        self.logger.info(f"Capture backend: {capture_backend}, input backend: {self.input_backend.name}")
         self.logger.info("Bot Controller initialized")
     
+    def _create_adb_device(self) -> Optional[AdbDevice]:
+        """ADB device for capture and input if enabled in config"""
+        if not self.config.get("adb.enabled", False):
+            return None
+        return AdbDevice(
+            serial=self.config.get("adb.serial", "") or None,
+            host=self.config.get("adb.host", "127.0.0.1"),
+            port=self.config.get("adb.port", 5037)
+        )
+    
+    def _create_frame_capturer(self) -> Optional[FrameCapturer]:
+        """Shared-memory frame bus and its capture thread if enabled in config"""
+        if not self.config.get("capture.frame_bus.enabled", False):
+            return None
+        region = self.config.get("capture.frame_bus.region")
+        if region:
+            width, height = region[2], region[3]
+        else:
+            # Room for the whole screen, so the game window can move or grow
+            width, height = self.adb_device.screen_size() if self.adb_device else screen_size()
+        slots = self.config.get("capture.frame_bus.slots", 4)
+        try:
+            bus = FrameBus(width, height, slots=slots, name=self.config.get("capture.frame_bus.name", "coc_frames"))
+        except FileExistsError as e:
+            # Another bot owns the name - everything here finds the bus by bus.name, so any name will do
+            self.logger.warning(f"{e} - using a unique frame bus name")
+            bus = FrameBus(width, height, slots=slots)
+        capturer = FrameCapturer(self.screen_capture.grab_region, bus,
+                                 fps=self.config.get("capture.frame_bus.fps", 10), region=region,
+                                 window_provider=lambda: self.screen_capture.game_window_bounds)
+        capturer.start()
+        self.screen_capture.attach_frame_bus(bus, max_age=self.config.get("capture.frame_bus.max_age", 0.5))
+        self.logger.info(f"Frame bus '{bus.name}' capturing at {capturer.fps} fps")
+        return capturer
+    
+    def _create_vision_pool(self) -> Optional[VisionPool]:
+        """Vision worker processes if enabled in config, reading frames from the frame bus when there is one"""
+        if not self.config.get("vision_workers.enabled", False):
+            return None
+        bank_path = self.config.get("townhall_detector.bank_path", "templates/townhall_bank.npz")
+        pool = VisionPool(
+            workers=self.config.get("vision_workers.workers", 1),
+            frame_bus=self.frame_capturer.bus.name if self.frame_capturer else None,
+            townhall_bank=bank_path if self.config.get("townhall_detector.enabled", True) else None,
+            min_score=self.config.get("townhall_detector.min_score", 0.55),
+            min_margin=self.config.get("townhall_detector.min_margin", 0.05),
+            nice=self.config.get("vision_workers.nice", 19),
+            max_frame_age=self.config.get("capture.frame_bus.max_age", 0.5)
+        )
+        if not pool.start():
+            self.logger.warning("Vision workers failed to start - vision runs in the bot process")
+            return None
+        self.screen_capture.attach_vision_pool(pool)
+        return pool
+    
+    def _create_session_video(self) -> Optional[SessionVideoRecorder]:
+        """Session video recorder process if enabled in config - it records from the frame bus"""
+        if not self.config.get("session_video.enabled", False):
+            return None
+        if not self.frame_capturer:
+            self.logger.warning("Session video needs capture.frame_bus.enabled - not recording")
+            return None
+        recorder = SessionVideoRecorder(
+            frame_bus=self.frame_capturer.bus.name,
+            directory=self.config.get("session_video.directory", "videos"),
+            fps=self.config.get("session_video.fps", 4),
+            scale=self.config.get("session_video.scale", 0.5),
+            segment_seconds=self.config.get("session_video.segment_seconds", 120),
+            max_disk_mb=self.config.get("session_video.max_disk_mb", 1000),
+            codec=self.config.get("session_video.codec", "MJPG")
+        )
+        if not recorder.start():
+            self.logger.warning("Session video recorder failed to start - not recording")
+            return None
+        return recorder
+    
+    def _create_townhall_detector(self) -> Optional[TownHallDetector]:
+        """Create the local Town Hall detector if enabled in config"""
+        if not self.config.get("townhall_detector.enabled", True):
+            return None
+        return TownHallDetector(
+            bank_path=self.config.get("townhall_detector.bank_path", "templates/townhall_bank.npz"),
+            min_score=self.config.get("townhall_detector.min_score", 0.55),
+            min_margin=self.config.get("townhall_detector.min_margin", 0.05)
+        )
+    
+    def _create_playback_verifier(self) -> Optional[PlaybackVerifier]:
+        """Create the closed-loop playback verifier if enabled in config"""
+        if not self.config.get("playback.verify.enabled", False):
+            return None
+        return PlaybackVerifier(
+            grab_region=self.screen_capture.grab_region,
+            troop_bar_fraction=self.config.get("playback.verify.troop_bar_fraction", 0.15),
+            change_threshold=self.config.get("playback.verify.change_threshold", 12.0),
+            empty_saturation=self.config.get("playback.verify.empty_saturation", 20.0),
+            budget=self.config.get("playback.verify.budget_ms", 40) / 1000,
+            max_retries=self.config.get("playback.verify.max_retries", 1)
+        )
+    
     def start_coordinate_mapping(self) -> None:
         """Start the coordinate mapping mode"""
         self.logger.info("Starting coordinate mapping mode")
@@ -98,6 +247,32 @@ class BotController:
         """Test the connection to the Gemini API."""
         return self.ai_analyzer.test_connection()
 
+    def get_orchestrator(self) -> Orchestrator:
+        """The multi-instance orchestrator, with workers for every configured instance"""
+        if self.orchestrator is None:
+            vision = VisionService(
+                self.ai_analyzer,
+                self.auto_attacker.townhall_detector,
+                max_concurrent_ai=self.config.get("orchestrator.max_concurrent_ai", 2)
+            )
+            self.orchestrator = Orchestrator(self.config, self.logger, vision, self.hotkeys,
+                                             attack_recorder=self.attack_recorder)
+        self.orchestrator.load_instances()
+        return self.orchestrator
+    
+    def start_instances(self) -> int:
+        """Start auto attacking on every configured emulator instance"""
+        return self.get_orchestrator().start_all()
+    
+    def stop_instances(self) -> None:
+        """Stop every multi-instance worker"""
+        if self.orchestrator:
+            self.orchestrator.stop_all()
+    
+    def get_instance_status(self) -> List[Dict]:
+        """Status of each multi-instance worker"""
+        return self.orchestrator.get_status() if self.orchestrator else []
+    
     def is_auto_attacking(self) -> bool:
         """Check if auto attack is running"""
         return self.auto_attacker.is_running
@@ -110,6 +285,20 @@ class BotController:
         """Get list of all recorded attack sessions"""
         return self.attack_recorder.list_sessions()
     
+    def optimize_recording(self, session_name: str) -> Optional[Dict]:
+        """Write an optimized copy of a recorded session and return the report"""
+        optimizer = RecordingOptimizer(
+            min_gaps=self.config.get("recording_optimizer.min_gaps", {}),
+            merge_radius=self.config.get("recording_optimizer.merge_radius", 8),
+            merge_window=self.config.get("recording_optimizer.merge_window", 0.3),
+            keep_delays=self.config.get("recording_optimizer.keep_delays", True)
+        )
+        report = optimizer.optimize_session(self.attack_recorder, session_name)
+        if report:
+            self.logger.info(f"Optimized {session_name}: {report['time_saved']:.1f}s saved "
+                             f"({report['reduction_percent']:.0f}%)")
+        return report
+    
     def get_mapped_coordinates(self) -> Dict:
         """Get all mapped button coordinates"""
         return self.coordinate_mapper.get_coordinates()
@@ -134,4 +323,17 @@ class BotController:
         if self.is_playing:
             self.is_playing = False
         if self.auto_attacker.is_running:
-            self.stop_auto_attack() 
\ No newline at end of file
+            self.stop_auto_attack()
+        self.stop_instances()
+        self.hotkeys.stop()
+        if self.session_video:
+            self.session_video.close()
+        if self.vision_pool:
+            self.screen_capture.attach_vision_pool(None)
+            self.vision_pool.close()
+        if self.frame_capturer:
+            self.screen_capture.detach_frame_bus()
+            self.frame_capturer.stop()
+            self.frame_capturer.bus.close()
+        if self.adb_device:
+            self.adb_device.close()
\ No newline at end of file
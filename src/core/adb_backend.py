@@ -0,0 +1,329 @@
+"""
+ADB Backend - Framebuffer capture and tap/swipe input through an ADB server, bypassing the desktop
+"""
+
+import re
+import socket
+import struct
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .input_backend import InputBackend, InputCommand
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5037
+ACK_MARKER = "__coc_ack_"
+ACK_PATTERN = re.compile(rb"__coc_ack_(\d+)")  # A whole output line - the echoed command line never matches
+
+class AdbError(Exception):
+    """The ADB server refused a request or the connection broke"""
+
+def _send_request(sock: socket.socket, payload: str) -> None:
+    """Send one smart-socket request (4 hex digit length prefix) and check for OKAY"""
+    data = payload.encode('utf-8')
+    sock.sendall(b"%04x" % len(data) + data)
+    status = _read_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        raise AdbError(_read_message(sock))
+    raise AdbError(f"Unexpected ADB reply {status!r} to {payload}")
+
+def _read_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise AdbError("ADB connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def _read_message(sock: socket.socket) -> str:
+    """A length-prefixed string reply"""
+    length = int(_read_exact(sock, 4), 16)
+    return _read_exact(sock, length).decode('utf-8', 'replace')
+
+def _read_all(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+def list_devices(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = 5.0) -> List[str]:
+    """Serials of the devices the ADB server has in the 'device' state"""
+    with socket.create_connection((host, port), timeout) as sock:
+        _send_request(sock, "host:devices")
+        listing = _read_message(sock)
+    return [line.split('\t')[0] for line in listing.splitlines() if line.endswith('\tdevice')]
+
+def decode_framebuffer(header: Tuple[int, ...], data: bytes) -> np.ndarray:
+    """
+    Raw framebuffer bytes to an RGB array
+
+    Args:
+        header: (bpp, width, height, red_offset, red_length, blue_offset, blue_length,
+            green_offset, green_length) from the framebuffer service
+        data: Pixel bytes
+    """
+    bpp, width, height, red_offset, red_length, blue_offset, blue_length, green_offset, green_length = header
+    if bpp == 32 and red_length == green_length == blue_length == 8:
+        pixels = np.frombuffer(data, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+        return pixels[..., [red_offset // 8, green_offset // 8, blue_offset // 8]]
+    if bpp == 16:
+        pixels = np.frombuffer(data, dtype='<u2', count=width * height).reshape(height, width)
+        channels = []
+        for offset, length in ((red_offset, red_length), (green_offset, green_length), (blue_offset, blue_length)):
+            channel = (pixels >> offset) & ((1 << length) - 1)
+            channels.append((channel * 255 // ((1 << length) - 1)).astype(np.uint8))
+        return np.stack(channels, axis=-1)
+    raise AdbError(f"Unsupported framebuffer format: {bpp} bpp")
+
+class AdbDevice:
+    """
+    One Android device or emulator reached through an ADB server
+
+    Screenshots come from the framebuffer service, so no window has to be
+    visible. Input goes through one persistent shell per device, so a tap
+    costs a line written to a socket rather than a new ADB connection.
+
+    That shell runs commands one after another, and on a real device every
+    'input' command starts a new app_process (~100-500 ms) - a swipe also
+    blocks it for its whole duration. Dense input therefore queues up in
+    the shell while input() returns at once. Each command is followed by an
+    echoed marker, so get_input_stats() reports how late commands actually
+    ran (lag from send to completion) and how many are still queued.
+    """
+
+    def __init__(self, serial: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 timeout: float = 5.0):
+        """
+        Args:
+            serial: Device serial (e.g. 'emulator-5554'); None uses the only connected device
+            host, port: ADB server address
+            timeout: Socket timeout in seconds
+        """
+        self.serial = serial or None
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.size = None
+        self._input_socket = None
+        self._input_lock = threading.Lock()
+        self._ack_ids = itertools.count(1)
+        self._ack_lock = threading.Lock()
+        self._pending_acks = {}  # marker id -> time its command was sent
+        self.reset_input_stats()
+
+    def __repr__(self) -> str:
+        return f"AdbDevice({self.serial or 'any'} @ {self.host}:{self.port})"
+
+    def _open(self, service: str) -> socket.socket:
+        """Connect to the server, select this device and start a service on it"""
+        sock = socket.create_connection((self.host, self.port), self.timeout)
+        try:
+            _send_request(sock, f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+            _send_request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def shell(self, command: str) -> str:
+        """Run a command and return its output"""
+        with self._open(f"shell:{command}") as sock:
+            return _read_all(sock).decode('utf-8', 'replace')
+
+    def screencap(self) -> np.ndarray:
+        """The current screen as an RGB array"""
+        with self._open("framebuffer:") as sock:
+            version = struct.unpack('<I', _read_exact(sock, 4))[0]
+            if version == 1:
+                fields = struct.unpack('<12I', _read_exact(sock, 48))
+            elif version == 2:
+                fields = struct.unpack('<13I', _read_exact(sock, 52))
+                fields = fields[:1] + fields[2:]  # Drop the color space
+            else:
+                raise AdbError(f"Unsupported framebuffer version {version}")
+            bpp, size, width, height = fields[:4]
+            frame = decode_framebuffer((bpp, width, height) + fields[4:10], _read_exact(sock, size))
+        self.size = (width, height)
+        return frame
+
+    def screen_size(self) -> Tuple[int, int]:
+        """Screen width and height in pixels (an override set with 'wm size' wins)"""
+        if self.size is None:
+            sizes = {}
+            for line in self.shell("wm size").splitlines():
+                label, _, value = line.partition(':')
+                if 'x' in value:
+                    width, height = value.strip().split('x')
+                    sizes[label.strip().lower()] = (int(width), int(height))
+            self.size = sizes.get('override size') or sizes.get('physical size')
+            if self.size is None:
+                height, width = self.screencap().shape[:2]
+                self.size = (width, height)
+        return self.size
+
+    def input(self, command: str) -> None:
+        """Queue a command (e.g. 'input tap 100 200') on the persistent input shell"""
+        ack = next(self._ack_ids)
+        line = f"{command}; echo {ACK_MARKER}{ack}\n".encode('utf-8')
+        with self._input_lock:
+            for attempt in range(2):
+                try:
+                    if self._input_socket is None:
+                        self._input_socket = self._open("shell:")
+                        threading.Thread(target=self._drain, args=(self._input_socket,), daemon=True).start()
+                    sent_at = time.perf_counter()
+                    self._input_socket.sendall(line)
+                    with self._ack_lock:
+                        self._pending_acks[ack] = sent_at
+                        self.input_stats['commands'] += 1
+                    return
+                except OSError as e:
+                    self._close_input()
+                    if attempt:
+                        raise AdbError(f"Input shell to {self} failed: {e}")
+
+    def _drain(self, sock: socket.socket) -> None:
+        """Read the shell's output so it never blocks on a full buffer, timing the ack markers"""
+        buffer = b""
+        try:
+            sock.settimeout(None)
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    return
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                buffer = buffer[-4096:]
+                for line in lines:
+                    match = ACK_PATTERN.fullmatch(line.strip())
+                    if match:
+                        self._acknowledge(int(match.group(1)))
+        except OSError:
+            pass
+
+    def _acknowledge(self, ack: int) -> None:
+        done = time.perf_counter()
+        with self._ack_lock:
+            sent_at = self._pending_acks.pop(ack, None)
+            if sent_at is None:
+                return
+            lag = (done - sent_at) * 1000
+            stats = self.input_stats
+            stats['acked'] += 1
+            stats['lag_total_ms'] += lag
+            stats['last_lag_ms'] = lag
+            stats['max_lag_ms'] = max(stats['max_lag_ms'], lag)
+
+    def reset_input_stats(self) -> None:
+        with self._ack_lock:
+            self.input_stats = {'commands': 0, 'acked': 0, 'lag_total_ms': 0.0, 'last_lag_ms': 0.0,
+                                'max_lag_ms': 0.0}
+
+    def get_input_stats(self) -> Dict:
+        """
+        How far input runs behind on the device
+
+        Returns:
+            commands/acked counts, backlog (commands sent but not yet run),
+            oldest_pending_ms, and the last/mean/max lag between sending a
+            command and the shell finishing it
+        """
+        now = time.perf_counter()
+        with self._ack_lock:
+            stats = dict(self.input_stats)
+            oldest = min(self._pending_acks.values()) if self._pending_acks else None
+            stats['backlog'] = len(self._pending_acks)
+        stats['oldest_pending_ms'] = (now - oldest) * 1000 if oldest is not None else 0.0
+        lag_total = stats.pop('lag_total_ms')
+        stats['mean_lag_ms'] = lag_total / stats['acked'] if stats['acked'] else 0.0
+        return stats
+
+    def _close_input(self) -> None:
+        if self._input_socket is not None:
+            try:
+                self._input_socket.close()
+            except OSError:
+                pass
+            self._input_socket = None
+            with self._ack_lock:
+                self._pending_acks.clear()  # That shell's queue is gone with it
+
+    def close(self) -> None:
+        with self._input_lock:
+            self._close_input()
+
+class AdbInputBackend(InputBackend):
+    """
+    Mouse commands turned into touch input on an ADB device
+
+    With gestures='swipe' (works on every Android version) a press and
+    release at one spot becomes 'input tap', and anything longer or moving
+    becomes one 'input swipe' sent on release - so holds and drags start
+    late by their own length. gestures='motionevent' (Android 10+) sends
+    DOWN/MOVE/UP as they happen, with moves thinned to move_interval.
+    Coordinates are device pixels: the device screen is the game window.
+
+    send() only queues commands on the device shell, so playback timing
+    measures when taps were queued; get_stats() has the device-side lag.
+    """
+
+    name = "adb"
+
+    def __init__(self, device: AdbDevice, gestures: str = "swipe", tap_threshold: float = 0.2,
+                 move_interval: float = 0.05):
+        if gestures not in ("swipe", "motionevent"):
+            raise ValueError(f"Unknown ADB gesture mode: {gestures}")
+        self.device = device
+        self.gestures = gestures
+        self.tap_threshold = tap_threshold
+        self.move_interval = move_interval
+        self._pressed = None  # (x, y, time) of the current press
+        self._last_move = 0.0
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        now = time.perf_counter()
+        lines = []
+        for command in commands:
+            x, y = command.x, command.y
+            if command.kind == 'down':
+                self._pressed = (x, y, now)
+                if self.gestures == "motionevent":
+                    lines.append(f"input motionevent DOWN {x} {y}")
+                    self._last_move = now
+            elif command.kind == 'move':
+                if self._pressed is None:
+                    continue  # Hover - touch screens have no cursor
+                if self.gestures == "motionevent" and now - self._last_move >= self.move_interval:
+                    lines.append(f"input motionevent MOVE {x} {y}")
+                    self._last_move = now
+            elif command.kind == 'up' and self._pressed is not None:
+                lines.append(self._release(x, y, now))
+                self._pressed = None
+
+        if lines:
+            self.device.input("; ".join(lines))
+
+    def get_stats(self) -> Dict:
+        """Device-side input lag and backlog (see AdbDevice.get_input_stats)"""
+        return self.device.get_input_stats()
+
+    def reset_stats(self) -> None:
+        self.device.reset_input_stats()
+
+    def _release(self, x: int, y: int, now: float) -> str:
+        start_x, start_y, pressed_at = self._pressed
+        if self.gestures == "motionevent":
+            return f"input motionevent UP {x} {y}"
+        held = now - pressed_at
+        if (x, y) == (start_x, start_y) and held < self.tap_threshold:
+            return f"input tap {x} {y}"
+        return f"input swipe {start_x} {start_y} {x} {y} {max(1, int(held * 1000))}"
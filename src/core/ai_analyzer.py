@@ -6,17 +6,67 @@ import os
 import base64
 import json
 import requests
+import threading
 from typing import Dict, Optional, Tuple
 from PIL import Image
 import io
 
+from .rate_limiter import TokenBucket, QuotaTracker
+from .response_parser import parse_analysis
+
 class AIAnalyzer:
     """Google Gemini AI analyzer for COC base evaluation"""
     
-    def __init__(self, api_key: str, logger):
+    DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite-preview-06-17:generateContent"
+    
+    # Structured output schema - the model is constrained to return exactly this shape
+    ANALYSIS_SCHEMA = {
+        "type": "OBJECT",
+        "properties": {
+            "loot": {
+                "type": "OBJECT",
+                "properties": {
+                    "gold": {"type": "INTEGER"},
+                    "elixir": {"type": "INTEGER"},
+                    "dark_elixir": {"type": "INTEGER"}
+                },
+                "required": ["gold", "elixir", "dark_elixir"],
+                "propertyOrdering": ["gold", "elixir", "dark_elixir"]
+            },
+            "townhall_level": {"type": "INTEGER"},
+            "difficulty": {"type": "STRING", "enum": ["Easy", "Medium", "Hard"]},
+            "recommendation": {"type": "STRING", "enum": ["ATTACK", "SKIP"]},
+            "reasoning": {"type": "STRING"}
+        },
+        "required": ["loot", "townhall_level", "difficulty", "recommendation", "reasoning"],
+        "propertyOrdering": ["loot", "townhall_level", "difficulty", "recommendation", "reasoning"]
+    }
+    
+    def __init__(self, api_key: str, logger, base_url: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None, quota: Optional[QuotaTracker] = None,
+                 pressure_threshold: float = 0.8, max_wait: float = 20.0, cooldown_on_429: float = 30.0):
         self.api_key = api_key
         self.logger = logger
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite-preview-06-17:generateContent"
+        # base_url can point at a local mock server for offline runs
+        self.base_url = base_url or self.DEFAULT_BASE_URL
+        
+        # Limiter and quota can be shared between analyzers that use the same key
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.quota = quota or QuotaTracker()
+        self.pressure_threshold = pressure_threshold
+        self.max_wait = max_wait
+        self.cooldown_on_429 = cooldown_on_429
+        
+        self._stats_lock = threading.Lock()
+        self.usage_stats = {
+            'requests': 0,
+            'budget_skips': 0,
+            'throttle_timeouts': 0,
+            'rate_limited': 0,
+            'parsed': 0,
+            'parse_repairs': 0,
+            'parse_failures': 0
+        }
         
         # Analysis prompt template
         self.analysis_prompt = """
@@ -49,7 +99,7 @@ Respond in this exact JSON format:
 """
     
     def analyze_base(self, screenshot_path: str, min_gold: int = 300000, 
-                    min_elixir: int = 300000, min_dark: int = 2000) -> Dict:
+                    min_elixir: int = 300000, min_dark: int = 2000, priority: float = 1.0) -> Dict:
         """
         Analyze enemy base screenshot using Google Gemini
         
@@ -58,6 +108,8 @@ Respond in this exact JSON format:
             min_gold: Minimum gold requirement
             min_elixir: Minimum elixir requirement  
             min_dark: Minimum dark elixir requirement
+            priority: How promising the base looks (0.0 - 1.0); under budget
+                pressure only bases with priority >= pressure are sent
             
         Returns:
             Dict with analysis results and attack recommendation
@@ -65,6 +117,11 @@ Respond in this exact JSON format:
         try:
             self.logger.info(f"🤖 Analyzing base with AI: {screenshot_path}")
             
+            budget_error = self._reserve_request(priority)
+            if budget_error:
+                self.logger.warning(f"⏸️ AI call skipped: {budget_error}")
+                return self._create_error_response(budget_error, budget_skip=True)
+            
             # Encode image to base64
             image_data = self._encode_image(screenshot_path)
             if not image_data:
@@ -86,6 +143,44 @@ Respond in this exact JSON format:
             self.logger.error(f"AI analysis error: {e}")
             return self._create_error_response(f"Analysis error: {e}")
     
+    def _reserve_request(self, priority: float) -> Optional[str]:
+        """Check the budget and take a rate-limit token; returns a reason if the call must be skipped"""
+        pressure = self.quota.pressure()
+        
+        if pressure >= 1.0:
+            self._count('budget_skips')
+            return f"API budget exhausted ({pressure:.0%} used)"
+        
+        if pressure >= self.pressure_threshold and priority < pressure:
+            self._count('budget_skips')
+            return f"Budget under pressure ({pressure:.0%} used), base priority {priority:.2f} too low"
+        
+        if not self.rate_limiter.acquire(timeout=self.max_wait):
+            self._count('throttle_timeouts')
+            return f"Rate limit: no request slot within {self.max_wait:g}s"
+        
+        return None
+    
+    def _count(self, key: str) -> None:
+        """Increment a usage counter"""
+        with self._stats_lock:
+            self.usage_stats[key] += 1
+    
+    def budget_pressure(self) -> float:
+        """Fraction of the tightest API budget already used"""
+        return self.quota.pressure()
+    
+    def get_usage_stats(self) -> Dict:
+        """Current call/token usage, budgets and limiter state"""
+        with self._stats_lock:
+            stats = dict(self.usage_stats)
+        # Every parse failure is a wasted round trip
+        parse_attempts = stats['parsed'] + stats['parse_failures']
+        stats['parse_failure_rate'] = stats['parse_failures'] / parse_attempts if parse_attempts else 0.0
+        stats['quota'] = self.quota.get_stats()
+        stats['rate_limiter'] = self.rate_limiter.get_stats()
+        return stats
+    
     def _encode_image(self, image_path: str) -> Optional[str]:
         """Encode image to base64 for Gemini API"""
         try:
@@ -169,6 +264,7 @@ Respond in this exact JSON format:
     
     def _send_gemini_request(self, image_data: str, prompt: str) -> Optional[Dict]:
         """Send request to Google Gemini API"""
+        recorded = False  # Every attempted call counts against the quota, whatever its outcome
         try:
             headers = {
                 'Content-Type': 'application/json',
@@ -191,6 +287,8 @@ Respond in this exact JSON format:
                     "topK": 1,
                     "topP": 1,
                     "maxOutputTokens": 1024,
+                    "responseMimeType": "application/json",
+                    "responseSchema": self.ANALYSIS_SCHEMA
                 }
             }
             
@@ -198,48 +296,59 @@ Respond in this exact JSON format:
             
             self.logger.info("🌐 Sending request to Gemini API...")
             response = requests.post(url, headers=headers, json=payload, timeout=30)
+            self._count('requests')
             
             if response.status_code == 200:
                 result = response.json()
+                self.quota.record(result.get('usageMetadata', {}).get('totalTokenCount', 0))
+                recorded = True
                 
                 # Extract text from response
                 if 'candidates' in result and len(result['candidates']) > 0:
                     content = result['candidates'][0]['content']['parts'][0]['text']
                     
-                    # Parse JSON response
-                    try:
-                        # Clean up response (remove markdown formatting if present)
-                        content = content.strip()
-                        if content.startswith('```json'):
-                            content = content[7:]
-                        if content.endswith('```'):
-                            content = content[:-3]
-                        content = content.strip()
-                        
-                        analysis = json.loads(content)
-                        return analysis
-                        
-                    except json.JSONDecodeError as e:
-                        self.logger.error(f"Failed to parse AI response as JSON: {e}")
+                    # Parse JSON response (tolerates fences, prose and grouped digits)
+                    analysis, repaired = parse_analysis(content)
+                    if analysis is None:
+                        self._count('parse_failures')
+                        self.logger.error("Failed to parse AI response as analysis JSON")
                         self.logger.error(f"Raw response: {content}")
                         return None
+                    
+                    self._count('parsed')
+                    if repaired:
+                        self._count('parse_repairs')
+                        self.logger.debug(f"Repaired non-standard AI response: {content}")
+                    
+                    analysis['usage'] = result.get('usageMetadata', {})
+                    return analysis
                 else:
                     self.logger.error("No candidates in Gemini response")
                     return None
             else:
+                self.quota.record(0)
+                recorded = True
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                    self.rate_limiter.penalize(self.cooldown_on_429)
+                    self.logger.warning(f"Gemini rate limit hit - pausing requests for {self.cooldown_on_429:.0f}s")
                 self.logger.error(f"Gemini API error: {response.status_code} - {response.text}")
                 return None
                 
         except requests.exceptions.Timeout:
+            if not recorded:
+                self.quota.record(0)
             self.logger.error("Gemini API request timeout")
             return None
         except Exception as e:
+            if not recorded:
+                self.quota.record(0)
             self.logger.error(f"Gemini API request error: {e}")
             return None
     
-    def _create_error_response(self, error_msg: str) -> Dict:
+    def _create_error_response(self, error_msg: str, budget_skip: bool = False) -> Dict:
         """Create error response with SKIP recommendation"""
-        return {
+        response = {
             "loot": {"gold": 0, "elixir": 0, "dark_elixir": 0},
             "townhall_level": 0,
             "difficulty": "Unknown",
@@ -247,6 +356,9 @@ Respond in this exact JSON format:
             "reasoning": f"Error: {error_msg}",
             "error": True
         }
+        if budget_skip:
+            response["budget_skip"] = True
+        return response
     
     def test_connection(self) -> bool:
         """Test connection to Gemini API"""
@@ -2,23 +2,52 @@
 Attack Player - Plays back recorded attack sessions
 """
 
+import os
 import json
 import time
-import pyautogui
-import keyboard
 import threading
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from .attack_recorder import AttackRecorder
+from .playback_scheduler import DeadlineScheduler
+from .input_backend import InputBackend, create_input_backend
+from .playback_verifier import PlaybackVerifier
+from .playback_telemetry import PlaybackRun, PlaybackTelemetry, ProgressReporter
+from .hotkey_service import HotkeyService, default_hotkey_service
+from .playback_plan import (
+    PlaybackPlan, PlanCache, compile_plan, OP_CLICK, OP_MOVE, OP_DELAY, OP_DRAG, OP_HOLD
+)
+from .recording_format import (
+    RECORDING_EXT, RecordingFile, encode_actions, load_recording_file, retarget_actions, window_transform
+)
 
 class AttackPlayer:
     """Plays back recorded attack sessions"""
     
-    def __init__(self):
-        self.attack_recorder = AttackRecorder()
+    def __init__(self, screen_capture=None, input_backend: Optional[InputBackend] = None,
+                 verifier: Optional[PlaybackVerifier] = None, hotkeys: bool = True,
+                 hotkey_service: Optional[HotkeyService] = None, attack_recorder: Optional[AttackRecorder] = None):
+        self._attack_recorder = attack_recorder  # The controller's recorder; one is made on first use otherwise
+        self.screen_capture = screen_capture
+        self.input_backend = input_backend or create_input_backend()
+        self.verifier = verifier
+        # F8/F9/ESC during playback (off for headless runs)
+        self.hotkeys = (hotkey_service or default_hotkey_service()) if hotkeys else None
+        self.last_verification_stats = None
         self.is_playing = False
+        self.is_paused = False
         self.current_playback = None
         self.playback_thread = None
         self.playback_speed = 1.0
+        self.scheduler = DeadlineScheduler()
+        self.last_playback_stats = None
+        
+        # Compiled plans, keyed by (file, speed, window) and invalidated by file mtime
+        self.plan_cache = PlanCache()
+        
+        # Per-action events of the current and recent playbacks
+        self.telemetry = PlaybackTelemetry()
+        self._reporter = None
         
         print("Attack Player initialized")
         print("Playback Controls:")
@@ -26,170 +55,402 @@ class AttackPlayer:
         print("  F9 - Stop playback")
         print("  ESC - Emergency stop")
     
+    @property
+    def attack_recorder(self) -> AttackRecorder:
+        """Recorder used to look recordings up by session name"""
+        if self._attack_recorder is None:
+            self._attack_recorder = AttackRecorder()
+        return self._attack_recorder
+    
     def play_attack(self, session_name: str, speed: float = 1.0) -> bool:
         """Play back a recorded attack session"""
         if self.is_playing:
             print("Already playing an attack")
             return False
         
-        # Load the recording
-        recording = self.attack_recorder.load_recording(session_name)
-        if not recording:
+        # Compiled for this speed and the current game window (cached across attacks)
+        plan = self.get_plan(session_name, speed)
+        if not plan:
             print(f"Could not load recording: {session_name}")
             return False
         
-        self.current_playback = recording
+        self.current_playback = plan
         self.playback_speed = speed
         self.is_playing = True
         
         print(f"\n=== PLAYING ATTACK SESSION: {session_name} ===")
-        print(f"Duration: {recording.get('duration', 0):.1f} seconds")
-        print(f"Actions: {len(recording.get('actions', []))}")
+        print(f"Duration: {plan.duration:.1f} seconds")
+        print(f"Actions: {len(plan)}")
         print(f"Speed: {speed}x")
         print("\nStarting playback in 3 seconds...")
         print("Press F8 to pause, F9 to stop, ESC for emergency stop")
         
         time.sleep(3)
         
+        # Progress is rendered from telemetry by its own thread, never by the playback thread
+        run = self.telemetry.begin(session_name, len(plan), speed)
+        self._reporter = ProgressReporter(run)
+        self._reporter.start()
+        
         # Start playback thread
         self.playback_thread = threading.Thread(
             target=self._playback_loop, 
-            args=(recording.get('actions', []),)
+            args=(plan, run)
         )
         self.playback_thread.daemon = True
         self.playback_thread.start()
         
         return True
     
+    def _current_window(self) -> Optional[Tuple[int, int, int, int]]:
+        """Bounds of the game window right now, or None if unknown"""
+        if not self.screen_capture:
+            return None
+        window = self.screen_capture.find_game_window()
+        return tuple(window) if window else None
+    
+    def _target_size(self) -> Tuple[int, int]:
+        """Size of the surface taps land on - the device screen when input goes to an ADB device"""
+        device = getattr(self.input_backend, 'device', None) or getattr(self.screen_capture, 'device', None)
+        if device is not None:
+            return device.screen_size()
+        from .screen_capture import screen_size
+        return screen_size()
+    
+    def get_plan(self, session_name: str, speed: float = 1.0) -> Optional[PlaybackPlan]:
+        """Compiled plan for a session at this speed, mapped onto the current game window"""
+        filepath = self.attack_recorder.get_recording_path(session_name)
+        if not filepath:
+            return None
+        
+        window = self._current_window()
+        
+        def compile_recording() -> Optional[PlaybackPlan]:
+            if filepath.endswith(RECORDING_EXT):
+                with RecordingFile(filepath) as recording:
+                    header, actions, paths = recording.header, recording.actions, recording.paths
+            else:
+                # A legacy JSON recording that couldn't be converted
+                data = load_recording_file(filepath)
+                actions, paths, type_names, extras = encode_actions(data.get('actions', []))
+                header = dict(data, type_names=type_names, extras=extras)
+            
+            if header.get('window') and window and tuple(header['window']) != window:
+                print(f"Mapping recording from window {tuple(header['window'])} to {window}")
+            elif not header.get('window'):
+                print("Recording has no window info - playing absolute screen coordinates")
+            return compile_plan(session_name, header, actions, paths, speed, window)
+        
+        try:
+            return self.plan_cache.get(filepath, speed, window, compile_recording)
+        except Exception as e:
+            print(f"Error loading recording: {e}")
+            return None
+    
     def stop_playback(self) -> None:
         """Stop the current playback"""
         if not self.is_playing:
             print("No playback active")
             return
         
-        print("Stopping playback")
-        self.is_playing = False
+        self.cancel_playback("Stopping playback")
         
         if self.playback_thread:
             self.playback_thread.join(timeout=2)
     
-    def _playback_loop(self, actions: List[Dict]) -> None:
-        """Main playback loop"""
+    def cancel_playback(self, message: Optional[str] = None) -> None:
+        """Ask the playback thread to stop without waiting for it (safe from hotkey callbacks)"""
+        if message and self.is_playing:
+            print(f"\n{message}")
+        self.is_playing = False
+        self.scheduler.cancel()
+    
+    def toggle_pause(self) -> None:
+        """Pause or resume playback; the schedule clock stops while paused"""
+        if not self.is_playing:
+            return
+        if self.is_paused:
+            self.is_paused = False
+            self.scheduler.resume()
+            print("\nPlayback resumed")
+        else:
+            self.is_paused = True
+            self.scheduler.pause()
+            print("\nPlayback paused")
+    
+    def _register_hotkeys(self) -> List[int]:
+        return [
+            self.hotkeys.register('esc', lambda: self.cancel_playback("Emergency stop activated")),
+            self.hotkeys.register('f9', lambda: self.cancel_playback("Playback stopped by user")),
+            self.hotkeys.register('f8', self.toggle_pause)
+        ]
+    
+    def _playback_loop(self, plan: PlaybackPlan, run: Optional[PlaybackRun] = None) -> None:
+        """Main playback loop - every action is scheduled against its precomputed deadline"""
+        scheduler = self.scheduler
+        ops, deadlines, single_taps = plan.ops, plan.deadlines, plan.single_taps
+        count = len(plan)
+        run = run or self.telemetry.begin(plan.session_name, count, plan.speed)
+        verifier = self._start_verification(plan)
+        outcome = 'completed'
+        handles = []
         try:
-            last_timestamp = 0
-            paused = False
+            next_index = 0
+            self.is_paused = False
+            if hasattr(self.input_backend, 'reset_stats'):
+                self.input_backend.reset_stats()
+            scheduler.start()
+            if self.hotkeys:
+                handles = self._register_hotkeys()
             
-            for i, action in enumerate(actions):
+            for i in range(count):
+                if i < next_index:
+                    continue  # Already sent as part of a batch
+                # Hotkeys (F8/F9/ESC) act through the scheduler, which wakes this thread
+                scheduler.wait_until(deadlines[i])
                 if not self.is_playing:
+                    outcome = 'stopped'
                     break
                 
-                # Check for control keys
-                if keyboard.is_pressed('esc'):
-                    print("\nEmergency stop activated")
-                    break
-                
-                if keyboard.is_pressed('f9'):
-                    print("\nPlayback stopped by user")
-                    break
-                
-                if keyboard.is_pressed('f8'):
-                    paused = not paused
-                    status = "paused" if paused else "resumed"
-                    print(f"\nPlayback {status}")
-                    
-                    # Wait for key release
-                    while keyboard.is_pressed('f8'):
-                        time.sleep(0.1)
-                
-                # Handle pause
-                while paused and self.is_playing:
-                    time.sleep(0.1)
-                    if keyboard.is_pressed('f8'):
-                        paused = False
-                        print("Playback resumed")
-                        while keyboard.is_pressed('f8'):
-                            time.sleep(0.1)
-                
-                if not self.is_playing:
-                    break
-                
-                # Calculate delay based on timestamps
-                current_timestamp = action.get('timestamp', 0)
-                if i > 0:
-                    delay = (current_timestamp - last_timestamp) / self.playback_speed
-                    if delay > 0:
-                        time.sleep(delay)
-                
-                # Execute the action
-                self._execute_action(action)
-                last_timestamp = current_timestamp
-                
-                # Progress indicator
-                progress = (i + 1) / len(actions) * 100
-                print(f"\rProgress: {progress:.1f}% ({i + 1}/{len(actions)})", end='', flush=True)
+                next_index = i + 1
+                if single_taps[i] and verifier:
+                    sent_at = scheduler.now()
+                    status = self._verified_tap(plan, i)
+                    run.record(i, deadlines[i], sent_at, ops[i], plan.xs[i], plan.ys[i], status)
+                elif single_taps[i]:
+                    # Send this tap plus any following taps that are already due in one batch
+                    now = scheduler.now()
+                    while next_index < count and single_taps[next_index] and deadlines[next_index] <= now:
+                        next_index += 1
+                    self._send_taps(plan, i, next_index, run)
+                else:
+                    sent_at = scheduler.now()
+                    if verifier and ops[i] in (OP_HOLD, OP_DRAG):
+                        status = self._verified_gesture(plan, i)
+                    else:
+                        status = self._execute_op(plan, i)
+                    run.record(i, deadlines[i], sent_at, ops[i], plan.xs[i], plan.ys[i], status)
         
         except Exception as e:
+            outcome = 'error'
             print(f"\nPlayback error: {e}")
         
         finally:
+            for handle in handles:
+                self.hotkeys.unregister(handle)
             self.is_playing = False
-            print(f"\nPlayback completed")
+            self.is_paused = False
+            self.last_playback_stats = scheduler.get_stats()
+            if hasattr(self.input_backend, 'get_stats'):
+                # Timing above is when input was queued; a device shell may run it later
+                self.last_playback_stats['input'] = self.input_backend.get_stats()
+            if verifier:
+                self.last_verification_stats = verifier.get_stats()
+            self.telemetry.end(run, outcome, self.last_playback_stats,
+                               self.last_verification_stats if verifier else None)
+            
+            if self._reporter and self._reporter.run is run:
+                self._reporter.join(timeout=1)
+                self._reporter = None
+            print(f"Playback {outcome}")
+            self._print_timing_stats(self.last_playback_stats)
+            if verifier:
+                self._print_verification_stats(self.last_verification_stats)
+    
+    def _start_verification(self, plan: PlaybackPlan) -> Optional[PlaybackVerifier]:
+        """Arm the verifier for this playback if it is enabled and the game window is known"""
+        if not self.verifier:
+            return None
+        window = plan.window or (self.screen_capture.game_window_bounds if self.screen_capture else None)
+        if not window:
+            print("Verification skipped - game window not found")
+            return None
+        self.verifier.begin(window)
+        return self.verifier
     
-    def _execute_action(self, action: Dict) -> None:
-        """Execute a single action"""
-        action_type = action.get('type', '')
-        x = action.get('x', 0)
-        y = action.get('y', 0)
+    def _verified_tap(self, plan: PlaybackPlan, i: int) -> str:
+        """Send one tap through the verifier (troop selections are checked, deploys gated); returns its status"""
+        x, y = plan.xs[i], plan.ys[i]
+        if self.verifier.should_skip(x, y):
+            return 'skipped'
         
+        next_deadline = plan.deadlines[i + 1] if i + 1 < len(plan) else float('inf')
+        time_available = next_deadline - self.scheduler.now()
         try:
-            if action_type == 'click':
-                pyautogui.click(x, y)
-                print(f" - Click at ({x}, {y})")
+            result = self.verifier.verify_tap(x, y, lambda: self.input_backend.send(plan.taps[i]), time_available)
+        except Exception as e:
+            print(f"Error executing tap at ({x}, {y}): {e}")
+            return 'error'
+        return 'ok' if result == 'sent' else result
+    
+    def _verified_gesture(self, plan: PlaybackPlan, i: int) -> str:
+        """Send a hold or drag through the verifier like a tap at its start point; returns its status"""
+        if plan.ops[i] == OP_DRAG:
+            x, y = plan.paths[i][0][:2]
+        else:
+            x, y = plan.xs[i], plan.ys[i]
+        # Continuous deploys are gated on the selected slot like deploy taps
+        if self.verifier.should_skip(x, y):
+            return 'skipped'
+        if not self.verifier.is_troop_slot(x, y):
+            return self._execute_op(plan, i)
+        
+        # A gesture on the troop bar selects a slot - probe and confirm it, leaving its own length out of the budget
+        next_deadline = plan.deadlines[i + 1] if i + 1 < len(plan) else float('inf')
+        time_available = next_deadline - self.scheduler.now() - plan.durations[i]
+        statuses = []
+        result = self.verifier.verify_tap(x, y, lambda: statuses.append(self._execute_op(plan, i)), time_available)
+        if 'error' in statuses:
+            return 'error'
+        return 'ok' if result == 'sent' else result
+    
+    def _print_verification_stats(self, stats: Dict) -> None:
+        """Report what the verifier saw"""
+        print(f"Verification: {stats['selections']} troop selections checked "
+              f"({stats['confirmed']} confirmed, {stats['retried']} retried, {stats['unconfirmed']} unconfirmed), "
+              f"{stats['empty_slots']} empty slots, {stats['deploys_skipped']} deploys skipped, "
+              f"mean check {stats['mean_check_ms']:.1f} ms")
+    
+    def _send_taps(self, plan: PlaybackPlan, start: int, end: int, run: PlaybackRun) -> None:
+        """Send the taps plan[start:end] in one backend call"""
+        commands = plan.taps[start] if end - start == 1 else [
+            command for i in range(start, end) for command in plan.taps[i]]
+        status = 'ok' if end - start == 1 else 'batched'
+        try:
+            self.input_backend.send(commands)
+        except Exception as e:
+            print(f"Error executing tap at ({plan.xs[start]}, {plan.ys[start]}): {e}")
+            status = 'error'
+        
+        now = self.scheduler.now()
+        for i in range(start, end):
+            # The first tap's lateness was counted while waiting for it
+            if i > start:
+                self.scheduler.record(plan.deadlines[i])
+            run.record(i, plan.deadlines[i], now, OP_CLICK, plan.xs[i], plan.ys[i], status)
+    
+    def _execute_op(self, plan: PlaybackPlan, i: int) -> str:
+        """Execute one compiled action that isn't a single tap; returns its status"""
+        op, x, y = plan.ops[i], plan.xs[i], plan.ys[i]
+        
+        try:
+            if op == OP_CLICK:
+                # Taps merged by the optimizer, each on its own deadline
+                for _, _, deadline in plan.paths[i]:
+                    self.scheduler.wait_until(deadline, record=False)
+                    if not self.is_playing:
+                        break
+                    self.input_backend.send(plan.taps[i])
+            
+            elif op == OP_MOVE:
+                self.input_backend.move(x, y)
             
-            elif action_type == 'move':
-                pyautogui.moveTo(x, y)
-                print(f" - Move to ({x}, {y})")
+            elif op == OP_DELAY:
+                pass  # Already folded into the deadlines of everything after it
             
-            elif action_type == 'delay':
-                duration = action.get('duration', 1.0) / self.playback_speed
-                time.sleep(duration)
-                print(f" - Delay {duration:.1f}s")
+            elif op == OP_HOLD:
+                self.input_backend.mouse_down(x, y)
+                self.scheduler.wait_until(plan.deadlines[i] + plan.durations[i], record=False)
+                self.input_backend.mouse_up(x, y)
             
-            elif action_type == 'drag':
-                start_x = action.get('start_x', x)
-                start_y = action.get('start_y', y)
-                pyautogui.drag(x - start_x, y - start_y, duration=0.5)
-                print(f" - Drag from ({start_x}, {start_y}) to ({x}, {y})")
+            elif op == OP_DRAG:
+                self._play_path(plan.paths[i])
             
             else:
-                print(f" - Unknown action: {action_type}")
+                return 'skipped'  # Unknown action type
         
         except Exception as e:
-            print(f" - Error executing action {action_type}: {e}")
+            print(f"Error executing action #{i + 1}: {e}")
+            return 'error'
+        
+        return 'ok'
+    
+    def _play_path(self, path: List[Tuple[int, int, float]]) -> None:
+        """Replay a timed drag path: press, move through each point on its deadline, release"""
+        x, y, _ = path[0]
+        self.input_backend.mouse_down(x, y)
+        try:
+            for x, y, deadline in path[1:]:
+                self.scheduler.wait_until(deadline, record=False)
+                if not self.is_playing:
+                    break  # Stopped mid-drag - release where we are
+                self.input_backend.move(x, y)
+        finally:
+            self.input_backend.mouse_up(x, y)
+    
+    def _print_timing_stats(self, stats: Dict) -> None:
+        """Report how closely actions hit their scheduled times"""
+        if not stats['count']:
+            return
+        print(f"Timing: {stats['count']} actions, mean {stats['mean_ms']:.1f} ms late, "
+              f"p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms, "
+              f"{stats['late']} more than 5 ms late")
+        device = stats.get('input')
+        if device and device['commands']:
+            print(f"Device input: mean {device['mean_lag_ms']:.0f} ms behind, max {device['max_lag_ms']:.0f} ms, "
+                  f"{device['backlog']} command(s) still queued")
+    
+    def get_playback_history(self) -> List[Dict]:
+        """Summaries of the most recent playbacks, oldest first"""
+        return [run.summary() for run in self.telemetry.get_runs()]
     
     def validate_recording(self, session_name: str) -> Dict[str, any]:
         """Validate a recording before playback"""
-        recording = self.attack_recorder.load_recording(session_name)
+        recording = self.attack_recorder.open_recording(session_name)
         if not recording:
             return {'valid': False, 'error': 'Recording not found'}
         
-        actions = recording.get('actions', [])
-        if not actions:
-            return {'valid': False, 'error': 'No actions in recording'}
-        
-        # Check screen bounds
-        screen_width, screen_height = pyautogui.size()
-        out_of_bounds = []
-        
-        for i, action in enumerate(actions):
-            x, y = action.get('x', 0), action.get('y', 0)
-            if not (0 <= x < screen_width and 0 <= y < screen_height):
-                out_of_bounds.append((i, x, y))
+        with recording:
+            header = recording.header
+            if not header.get('action_count'):
+                return {'valid': False, 'error': 'No actions in recording'}
+            
+            screen_width, screen_height = self._target_size()
+            out_of_bounds = []
+            
+            # Positions are checked where they will land: mapped onto the current window
+            bounds = header.get('bounds')
+            recorded_window = header.get('window')
+            window = self._current_window() if recorded_window else None
+            if bounds and window:
+                offset_x, offset_y, scale_x, scale_y = window_transform(recorded_window, window)
+                bounds = [round(offset_x + bounds[0] * scale_x), round(offset_y + bounds[1] * scale_y),
+                          round(offset_x + bounds[2] * scale_x), round(offset_y + bounds[3] * scale_y)]
+            
+            # The header bounds settle the common case without loading any actions
+            if bounds and not (bounds[0] >= 0 and bounds[1] >= 0 and
+                               bounds[2] < screen_width and bounds[3] < screen_height):
+                actions, paths = recording.actions, recording.paths
+                if window:
+                    actions, paths = retarget_actions(actions, paths, recording.type_names,
+                                                      recorded_window, window)
+                
+                def off_screen(xs, ys):
+                    return (xs < 0) | (xs >= screen_width) | (ys < 0) | (ys >= screen_height)
+                
+                positioned = actions['type'] != recording.type_names.index('delay')
+                outside = positioned & off_screen(actions['x'], actions['y'])
+                out_of_bounds = [(int(i), int(actions['x'][i]), int(actions['y'][i]))
+                                 for i in np.flatnonzero(outside)]
+                
+                # A drag can leave the screen along its path while its end point stays on it:
+                # report the first stray point of each such action
+                gestures = (actions['path_len'] > 0) | off_screen(actions['start_x'], actions['start_y'])
+                for i in np.flatnonzero(positioned & ~outside & gestures):
+                    start, length = int(actions['path_start'][i]), int(actions['path_len'][i])
+                    points = np.array([[actions['start_x'][i], actions['start_y'][i]]], dtype=np.float64)
+                    if length:
+                        points = np.concatenate([points, paths[start:start + length, :2]])
+                    stray = np.flatnonzero(off_screen(points[:, 0], points[:, 1]))
+                    if len(stray):
+                        x, y = points[stray[0]]
+                        out_of_bounds.append((int(i), int(x), int(y)))
+                out_of_bounds.sort()
         
         result = {
             'valid': len(out_of_bounds) == 0,
-            'total_actions': len(actions),
-            'duration': recording.get('duration', 0),
+            'total_actions': header.get('action_count', 0),
+            'duration': header.get('duration', 0),
             'out_of_bounds': out_of_bounds
         }
         
@@ -200,37 +461,33 @@ class AttackPlayer:
     
     def preview_recording(self, session_name: str) -> None:
         """Show a preview of the recording actions"""
-        recording = self.attack_recorder.load_recording(session_name)
+        recording = self.attack_recorder.open_recording(session_name)
         if not recording:
             print(f"Recording not found: {session_name}")
             return
         
-        actions = recording.get('actions', [])
-        
-        print(f"\n=== RECORDING PREVIEW: {session_name} ===")
-        print(f"Duration: {recording.get('duration', 0):.1f} seconds")
-        print(f"Total actions: {len(actions)}")
-        
-        # Show action summary
-        action_counts = {}
-        for action in actions:
-            action_type = action.get('type', 'unknown')
-            action_counts[action_type] = action_counts.get(action_type, 0) + 1
-        
-        print("\nAction breakdown:")
-        for action_type, count in action_counts.items():
-            print(f"  {action_type}: {count}")
-        
-        # Show first few actions
-        print(f"\nFirst 10 actions:")
-        for i, action in enumerate(actions[:10]):
-            timestamp = action.get('timestamp', 0)
-            action_type = action.get('type', 'unknown')
-            x, y = action.get('x', 0), action.get('y', 0)
-            print(f"  {i+1:2d}. {timestamp:6.1f}s - {action_type} at ({x}, {y})")
+        with recording:
+            header = recording.header
+            action_count = header.get('action_count', 0)
+            
+            print(f"\n=== RECORDING PREVIEW: {session_name} ===")
+            print(f"Duration: {header.get('duration', 0):.1f} seconds")
+            print(f"Total actions: {action_count}")
+            
+            # Show action summary
+            print("\nAction breakdown:")
+            for action_type, count in header.get('action_types', {}).items():
+                print(f"  {action_type}: {count}")
+            
+            # Show first few actions
+            print(f"\nFirst 10 actions:")
+            type_names = recording.type_names
+            for i, row in enumerate(recording.actions[:10].tolist()):
+                action_type, timestamp, x, y = type_names[row[0]], row[1], row[2], row[3]
+                print(f"  {i+1:2d}. {timestamp:6.1f}s - {action_type} at ({x}, {y})")
         
-        if len(actions) > 10:
-            print(f"  ... and {len(actions) - 10} more actions")
+        if action_count > 10:
+            print(f"  ... and {action_count - 10} more actions")
     
     def set_playback_speed(self, speed: float) -> None:
         """Set the playback speed multiplier"""
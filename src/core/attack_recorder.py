@@ -2,30 +2,57 @@
 Attack Recorder - Records user attack sessions for later playback
 """
 
-import json
 import os
 import time
-import pyautogui
-import keyboard
+import queue
 import threading
-from typing import Dict, List, Optional, Tuple
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
+from .input_events import InputEventSource, HookInputSource
+from .trajectory import compress_trajectory
+from .recording_format import (
+    RECORDING_EXT, LEGACY_EXT, RecordingFile, save_recording,
+    load_recording_file, convert_json_recording
+)
+from .recording_catalog import RecordingCatalog
+from .recording_journal import RecordingJournal, read_journal, find_journals, claim_journal, release_journal
+
 class AttackRecorder:
     """Records attack sessions including mouse movements, clicks, and timing"""
     
-    def __init__(self, auto_detect_clicks: bool = True):
+    # Gesture classification for a press/release pair
+    DRAG_THRESHOLD = 10     # pixels moved while pressed before it counts as a drag
+    HOLD_THRESHOLD = 0.35   # seconds held in place before a press counts as a hold
+    PATH_EPSILON = 3.0      # RDP tolerance for drag paths, in pixels
+    
+    # Journals being written by recorders in this process - never recovered from under them
+    _active_journals = set()
+    
+    def __init__(self, auto_detect_clicks: bool = True, input_source: Optional[InputEventSource] = None,
+                 screen_capture=None):
         self.recordings_dir = "recordings"
-        self.current_recording = []
+        self.journal_dir = os.path.join(self.recordings_dir, ".journal")
+        self.journal = None
+        self.action_count = 0
         self.recording_thread = None
         self.is_recording = False
         self.start_time = None
         self.session_name = None
         self.auto_detect_clicks = auto_detect_clicks
-        self._last_click_time = 0
+        self.input_source = input_source
+        self.screen_capture = screen_capture
+        
+        self._events = queue.Queue()
+        self._capturing = False
+        self._cancelled = False
+        self._pending_presses = {}
+        self._held_keys = set()
         
         # Create recordings directory
         os.makedirs(self.recordings_dir, exist_ok=True)
+        self.catalog = RecordingCatalog(self.recordings_dir)
         
         print("Attack Recorder initialized")
         print("Recording Controls:")
@@ -45,9 +72,25 @@ class AttackRecorder:
             return
         
         self.session_name = session_name
-        self.current_recording = []
+        self.action_count = 0
+        header = {'created': datetime.now().isoformat()}
+        
+        # Remember the game window so playback can map the clicks onto wherever it is later
+        window = self.screen_capture.find_game_window() if self.screen_capture else None
+        if window:
+            header['window'] = list(window)
+        else:
+            print("⚠️ Game window not found - coordinates will be recorded as absolute screen pixels")
+        
+        self.journal = RecordingJournal(self.journal_dir, session_name, header)
+        self._active_journals.add(self.journal.path)
         self.is_recording = True
-        self.start_time = time.time()
+        self._capturing = True
+        self._cancelled = False
+        self._pending_presses = {}
+        self._held_keys = set()
+        self._events = queue.Queue()
+        self.start_time = time.perf_counter()
         
         print(f"\n=== RECORDING ATTACK SESSION: {session_name} ===")
         print("Instructions:")
@@ -67,7 +110,11 @@ class AttackRecorder:
             print("\nRECORDING STARTED - Use F6 to record clicks...")
             print("(Auto-click detection is disabled)")
         
-        # Start the recording thread
+        # Hooks only enqueue events; the recording thread does all the work
+        if self.input_source is None:
+            self.input_source = HookInputSource()
+        self.input_source.start(self._events.put)
+        
         self.recording_thread = threading.Thread(target=self._recording_loop)
         self.recording_thread.daemon = True
         self.recording_thread.start()
@@ -78,102 +125,201 @@ class AttackRecorder:
             print("No recording session active")
             return None
         
+        self._end_capture()
         self.is_recording = False
         
         if self.recording_thread:
             self.recording_thread.join(timeout=1)
         
-        if self.current_recording:
-            filepath = self._save_recording(self.session_name, self.current_recording)
-            print(f"\nRecording saved: {filepath}")
-            print(f"Total actions recorded: {len(self.current_recording)}")
-            return filepath
-        else:
+        journal = self.journal
+        self.journal = None
+        self._active_journals.discard(journal.path)
+        
+        if self._cancelled:
+            if self.action_count:
+                kept_path = journal.keep_cancelled()
+                print(f"Recording was cancelled - nothing saved (actions kept in {kept_path})")
+            else:
+                journal.discard()
+                print("Recording was cancelled - nothing saved")
+            return None
+        
+        if not self.action_count:
+            journal.discard()
             print("No actions recorded")
             return None
+        
+        journal.close()
+        header, actions = read_journal(journal.path)
+        filepath = self._save_recording(self.session_name, actions, header)
+        if not filepath:
+            print(f"Journal kept for recovery: {journal.path}")
+            return None
+        
+        journal.discard()
+        print(f"\nRecording saved: {filepath}")
+        print(f"Total actions recorded: {self.action_count}")
+        return filepath
+    
+    def recover_journals(self) -> List[str]:
+        """
+        Finalize journals left behind by a crash into '<name>_recovered' recordings
+        
+        Call once at startup. Journals whose writing process is still alive
+        (another bot in the same folder) are skipped, and each abandoned one
+        is claimed before recovery so two processes never recover it twice.
+        """
+        recovered = []
+        for path in find_journals(self.journal_dir):
+            if path in self._active_journals:
+                continue
+            claimed = claim_journal(path)
+            if claimed is None:
+                continue
+            
+            try:
+                header, actions = read_journal(claimed)
+                first = next(actions, None)
+                if first is None:
+                    actions.close()
+                    os.remove(claimed)
+                    continue
+                
+                name = f"{header.get('name', os.path.basename(path).split('.')[0])}_recovered"
+                filepath = self._save_recording(name, chain([first], actions), header)
+                actions.close()
+                if filepath:
+                    os.remove(claimed)
+            except Exception as e:
+                print(f"Error recovering journal {path}: {e}")
+                filepath = ""
+            
+            if not filepath:
+                release_journal(claimed)
+                continue
+            recovered.append(filepath)
+            print(f"Recovered unfinished recording: {filepath}")
+        
+        return recovered
+    
+    def _end_capture(self) -> None:
+        """Detach from the input source and wake the recording thread"""
+        if not self._capturing:
+            return
+        self._capturing = False
+        if self.input_source:
+            self.input_source.stop()
+        self._events.put(None)
     
     def _recording_loop(self) -> None:
-        """Main recording loop that captures user input"""
-        last_mouse_pos = pyautogui.position()
+        """Main recording loop - consumes input events as they arrive"""
+        last_mouse_pos = self.input_source.position()
         
         try:
             while self.is_recording:
-                current_time = time.time() - self.start_time
-                
-                # Check for manual recording hotkeys
-                if keyboard.is_pressed('esc'):
-                    print("\nRecording cancelled")
-                    self.is_recording = False
+                try:
+                    event = self._events.get(timeout=self.journal.flush_interval)
+                except queue.Empty:
+                    # Quiet spell - make sure the last burst of actions is on disk
+                    self.journal.flush_if_due()
+                    continue
+                if event is None:
                     break
                 
-                if keyboard.is_pressed('f5'):
-                    print("\nStopping recording")
-                    self.is_recording = False
-                    break
+                current_time = event.time - self.start_time
                 
-                if keyboard.is_pressed('f6'):
-                    # Manual click recording (backup method)
-                    x, y = pyautogui.position()
-                    self._add_action('click', x, y, current_time)
-                    print(f"🖱️ Manual click recorded at ({x}, {y})")
-                    
-                    # Wait for key release to prevent spam
-                    while keyboard.is_pressed('f6'):
-                        time.sleep(0.1)
+                if event.kind == 'key_up':
+                    self._held_keys.discard(event.key)
+                    continue
                 
-                if keyboard.is_pressed('f7'):
-                    # Add delay marker
-                    delay = float(input("\nEnter delay in seconds: ") or "1.0")
-                    self._add_action('delay', 0, 0, current_time, {'duration': delay})
-                    print(f"Added {delay}s delay")
+                if event.kind == 'key_down':
+                    # Ignore auto-repeat while a key is held down
+                    if event.key in self._held_keys:
+                        continue
+                    self._held_keys.add(event.key)
+                    
+                    if event.key == 'esc':
+                        print("\nRecording cancelled")
+                        self._cancelled = True
+                        self._end_capture()
+                        break
+                    
+                    if event.key == 'f5':
+                        print("\nStopping recording - press Enter to save")
+                        self._end_capture()
+                        break
                     
-                    # Wait for key release
-                    while keyboard.is_pressed('f7'):
-                        time.sleep(0.1)
+                    if event.key == 'f6':
+                        # Manual click recording (backup method)
+                        x, y = self.input_source.position()
+                        self._add_action('click', x, y, current_time)
+                        print(f"🖱️ Manual click recorded at ({x}, {y})")
+                    
+                    elif event.key == 'f7':
+                        # Add delay marker
+                        delay = float(input("\nEnter delay in seconds: ") or "1.0")
+                        self._add_action('delay', 0, 0, current_time, {'duration': delay})
+                        print(f"Added {delay}s delay")
+                    continue
+                
+                if event.kind == 'mouse_down':
+                    if self.auto_detect_clicks and event.button in ('left', 'right'):
+                        self._pending_presses[event.button] = {
+                            'time': current_time,
+                            'path': [[event.x, event.y, 0.0]]
+                        }
+                    continue
                 
-                # Auto-click detection (enabled by default)
-                if self.auto_detect_clicks:
-                    try:
-                        # Method 1: Try win32 API for reliable mouse detection
-                        import win32api
-                        left_button_state = win32api.GetKeyState(0x01)  # VK_LBUTTON
-                        right_button_state = win32api.GetKeyState(0x02)  # VK_RBUTTON
-                        
-                        if left_button_state < 0 or right_button_state < 0:  # Button is pressed
-                            x, y = pyautogui.position()
-                            # Check if this is a new click (avoid duplicates)
-                            if (current_time - self._last_click_time) > 0.15:  # 150ms debounce
-                                self._add_action('click', x, y, current_time)
-                                print(f"🖱️ Auto-recorded click at ({x}, {y})")
-                                self._last_click_time = current_time
-                                
-                    except Exception as e:
-                        # Method 2: Fallback using pyautogui mouse detection
-                        try:
-                            # Check if mouse button is pressed using alternative method
-                            if hasattr(pyautogui, '_mouseDown') and pyautogui._mouseDown:
-                                x, y = pyautogui.position()
-                                if (current_time - self._last_click_time) > 0.15:
-                                    self._add_action('click', x, y, current_time)
-                                    print(f"🖱️ Auto-recorded click at ({x}, {y}) [fallback]")
-                                    self._last_click_time = current_time
-                        except:
-                            # If all auto-detection fails, inform user about manual mode
-                            if not hasattr(self, '_fallback_warned'):
-                                print("⚠️ Auto-click detection failed - use F6 to manually record clicks")
-                                self._fallback_warned = True
+                if event.kind == 'mouse_up':
+                    press = self._pending_presses.pop(event.button, None)
+                    if press and self.auto_detect_clicks:
+                        press['path'].append([event.x, event.y, current_time - press['time']])
+                        self._add_gesture(press['time'], press['path'])
+                        last_mouse_pos = (event.x, event.y)
+                    continue
                 
-                # Track significant mouse movements
-                current_mouse_pos = pyautogui.position()
-                if self._distance(last_mouse_pos, current_mouse_pos) > 50:
-                    self._add_action('move', current_mouse_pos[0], current_mouse_pos[1], current_time)
-                    last_mouse_pos = current_mouse_pos
+                if event.kind == 'mouse_move' and self._pending_presses:
+                    # Collect the path of every button being held
+                    for press in self._pending_presses.values():
+                        press['path'].append([event.x, event.y, current_time - press['time']])
+                    continue
                 
-                time.sleep(0.05)  # 20 FPS recording
+                if event.kind == 'mouse_move':
+                    # Track significant mouse movements
+                    current_mouse_pos = (event.x, event.y)
+                    if self._distance(last_mouse_pos, current_mouse_pos) > 50:
+                        self._add_action('move', event.x, event.y, current_time)
+                        last_mouse_pos = current_mouse_pos
         
         except Exception as e:
             print(f"Recording error: {e}")
-            self.is_recording = False
+            self._end_capture()
+    
+    def _add_gesture(self, press_time: float, path: List[List[float]]) -> None:
+        """Classify a press/move/release sequence as a click, hold or drag and record it"""
+        start_x, start_y, _ = path[0]
+        end_x, end_y, duration = path[-1]
+        max_offset = max(self._distance((start_x, start_y), (x, y)) for x, y, _ in path)
+        
+        # Timestamp every gesture at the press so rapid taps keep their spacing
+        if max_offset <= self.DRAG_THRESHOLD:
+            if duration >= self.HOLD_THRESHOLD:
+                self._add_action('hold', start_x, start_y, press_time, {'duration': duration})
+                print(f"🖱️ Auto-recorded hold at ({start_x}, {start_y}) for {duration:.2f}s")
+            else:
+                self._add_action('click', start_x, start_y, press_time, {'hold': duration})
+                print(f"🖱️ Auto-recorded click at ({start_x}, {start_y})")
+            return
+        
+        compressed = compress_trajectory(path, epsilon=self.PATH_EPSILON)
+        self._add_action('drag', end_x, end_y, press_time, {
+            'start_x': start_x,
+            'start_y': start_y,
+            'duration': duration,
+            'path': compressed
+        })
+        print(f"🖱️ Auto-recorded drag ({start_x}, {start_y}) -> ({end_x}, {end_y}), "
+              f"{len(path)} points compressed to {len(compressed)}")
     
     def toggle_auto_click_detection(self) -> bool:
         """Toggle auto-click detection on/off"""
@@ -195,28 +341,26 @@ class AttackRecorder:
         if extra_data:
             action.update(extra_data)
         
-        self.current_recording.append(action)
+        self.journal.append(action)
+        self.action_count += 1
     
     def _distance(self, pos1: Tuple[int, int], pos2: Tuple[int, int]) -> float:
         """Calculate distance between two points"""
         return ((pos1[0] - pos2[0]) ** 2 + (pos1[1] - pos2[1]) ** 2) ** 0.5
     
-    def _save_recording(self, name: str, recording: List[Dict]) -> str:
-        """Save a recording to file"""
+    def _save_recording(self, name: str, actions: Iterable[Dict], header: Optional[Dict] = None) -> str:
+        """Save a recording to file, encoding actions as they are streamed in"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{name}_{timestamp}.json"
+        filename = f"{name}_{timestamp}{RECORDING_EXT}"
         filepath = os.path.join(self.recordings_dir, filename)
         
-        recording_data = {
-            'name': name,
-            'created': datetime.now().isoformat(),
-            'duration': recording[-1]['timestamp'] if recording else 0,
-            'actions': recording
-        }
+        recording_data = dict(header or {})
+        recording_data['name'] = name
+        recording_data.setdefault('created', datetime.now().isoformat())
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump(recording_data, f, indent=2)
+            save_recording(filepath, recording_data, actions)
+            self.catalog.update(filename[:-len(RECORDING_EXT)], filepath)
             return filepath
         except Exception as e:
             print(f"Error saving recording: {e}")
@@ -224,41 +368,71 @@ class AttackRecorder:
     
     def list_sessions(self) -> List[str]:
         """Get list of all recorded sessions"""
-        if not os.path.exists(self.recordings_dir):
-            return []
+        return self.catalog.list_sessions()
+    
+    def get_recording_path(self, session_name: str) -> Optional[str]:
+        """Path of a recording's .npz file, converting a legacy JSON recording on first use"""
+        filepath = os.path.join(self.recordings_dir, f"{session_name}{RECORDING_EXT}")
+        if os.path.exists(filepath):
+            return filepath
         
-        sessions = []
-        for file in os.listdir(self.recordings_dir):
-            if file.endswith('.json'):
-                sessions.append(file[:-5])  # Remove .json extension
+        legacy_path = os.path.join(self.recordings_dir, f"{session_name}{LEGACY_EXT}")
+        if os.path.exists(legacy_path):
+            try:
+                filepath = convert_json_recording(legacy_path)
+                self.catalog.update(session_name, filepath)
+                print(f"Converted legacy recording to {filepath}")
+                return filepath
+            except Exception as e:
+                print(f"Error converting legacy recording: {e}")
+                return legacy_path
         
-        return sorted(sessions)
+        return None
     
     def load_recording(self, session_name: str) -> Optional[Dict]:
         """Load a recording by name"""
-        filepath = os.path.join(self.recordings_dir, f"{session_name}.json")
+        filepath = self.get_recording_path(session_name)
         
-        if not os.path.exists(filepath):
+        if not filepath:
             print(f"Recording not found: {session_name}")
             return None
         
         try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
+            return load_recording_file(filepath)
+        except Exception as e:
+            print(f"Error loading recording: {e}")
+            return None
+    
+    def open_recording(self, session_name: str) -> Optional[RecordingFile]:
+        """Open a recording lazily - header now, action arrays on first access"""
+        filepath = self.get_recording_path(session_name)
+        
+        if not filepath or not filepath.endswith(RECORDING_EXT):
+            print(f"Recording not found: {session_name}")
+            return None
+        
+        try:
+            return RecordingFile(filepath)
         except Exception as e:
             print(f"Error loading recording: {e}")
             return None
     
     def delete_recording(self, session_name: str) -> bool:
         """Delete a recording"""
-        filepath = os.path.join(self.recordings_dir, f"{session_name}.json")
+        filepaths = [
+            os.path.join(self.recordings_dir, f"{session_name}{ext}")
+            for ext in (RECORDING_EXT, LEGACY_EXT)
+        ]
+        filepaths = [path for path in filepaths if os.path.exists(path)]
         
-        if not os.path.exists(filepath):
+        if not filepaths:
             print(f"Recording not found: {session_name}")
             return False
         
         try:
-            os.remove(filepath)
+            for filepath in filepaths:
+                os.remove(filepath)
+            self.catalog.remove(session_name)
             print(f"Deleted recording: {session_name}")
             return True
         except Exception as e:
@@ -266,23 +440,23 @@ class AttackRecorder:
             return False
     
     def get_recording_info(self, session_name: str) -> Optional[Dict]:
-        """Get information about a recording"""
-        recording = self.load_recording(session_name)
-        if not recording:
-            return None
+        """Get information about a recording from the catalog index"""
+        entry = self.catalog.get(session_name)
+        if not entry:
+            # Legacy JSON recordings are indexed once converted
+            filepath = self.get_recording_path(session_name)
+            if not filepath or not filepath.endswith(RECORDING_EXT):
+                return None
+            entry = self.catalog.get(session_name)
+            if not entry:
+                return None
         
         return {
-            'name': recording.get('name', session_name),
-            'created': recording.get('created', 'Unknown'),
-            'duration': recording.get('duration', 0),
-            'action_count': len(recording.get('actions', [])),
-            'action_types': self._count_action_types(recording.get('actions', []))
+            'name': entry['name'],
+            'created': entry['created'],
+            'duration': entry['duration'],
+            'action_count': entry['action_count'],
+            'action_types': entry['action_types'],
+            'bounds': entry['bounds'],
+            'content_hash': entry['content_hash']
         }
-    
-    def _count_action_types(self, actions: List[Dict]) -> Dict[str, int]:
-        """Count the types of actions in a recording"""
-        counts = {}
-        for action in actions:
-            action_type = action.get('type', 'unknown')
-            counts[action_type] = counts.get(action_type, 0) + 1
-        return counts 
\ No newline at end of file
@@ -2,18 +2,21 @@
 Auto Attacker - Automated continuous attack system for COC
 """
 
-import time
 import random
 import threading
+from collections import deque
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import pyautogui
-import keyboard
+import numpy as np
+from PIL import Image, ImageChops, ImageStat
 
 from .attack_player import AttackPlayer
 from .screen_capture import ScreenCapture
 from .coordinate_mapper import CoordinateMapper
 from .ai_analyzer import AIAnalyzer
+from .townhall_detector import TownHallDetector
+from .input_backend import InputBackend
+from .hotkey_service import CancellationToken, HotkeyService, default_hotkey_service
 from ..utils.logger import Logger
 from ..utils.config import Config
 
@@ -21,13 +24,24 @@ class AutoAttacker:
     """Automated continuous attack system"""
     
     def __init__(self, attack_player: AttackPlayer, screen_capture: ScreenCapture, 
-                 coordinate_mapper: CoordinateMapper, logger: Logger, ai_analyzer: AIAnalyzer, config: Config):
+                 coordinate_mapper: CoordinateMapper, logger: Logger, ai_analyzer: AIAnalyzer, config: Config,
+                 townhall_detector: Optional[TownHallDetector] = None, input_backend: Optional[InputBackend] = None,
+                 hotkey_service: Optional[HotkeyService] = None, session_video=None):
         self.attack_player = attack_player
         self.screen_capture = screen_capture
         self.coordinate_mapper = coordinate_mapper
         self.logger = logger
         self.ai_analyzer = ai_analyzer
         self.config = config
+        self.townhall_detector = townhall_detector
+        self.input_backend = input_backend or attack_player.input_backend
+        self.hotkeys = hotkey_service or attack_player.hotkeys or default_hotkey_service()
+        self.session_video = session_video  # Optional SessionVideoRecorder for searches and battles
+        
+        # Cancelled by stop_auto_attack() or the ctrl+alt+s emergency stop; every wait sleeps on it
+        self._stop_token = CancellationToken()
+        self._hotkey_handle = None
+        self.wait_scale = 1.0  # Below 1 compresses every wait (simulated instances)
         
         self.is_running = False
         self.auto_thread = None
@@ -41,7 +55,11 @@ class AutoAttacker:
         
         self.attack_sessions = self.config.get('auto_attacker.attack_sessions', [])
         self.max_search_attempts = self.config.get('auto_attacker.max_search_attempts', 10)
+        self.max_townhall_level = self.config.get('auto_attacker.max_townhall_level', 12)
         self.current_session_index = 0
+        self._last_thumbnail = None
+        self._townhall_result = (None, None)  # (screenshot, detection) of the latest local TH check
+        self._loot_history = deque(maxlen=50)  # Loot counter ink of recent bases, for ranking
         
         print("Auto Attacker initialized")
         print("Emergency stop: Ctrl+Alt+S")
@@ -80,6 +98,8 @@ class AutoAttacker:
         
         self.is_running = True
         self.stats['start_time'] = datetime.now()
+        self._stop_token = CancellationToken()
+        self._hotkey_handle = self.hotkeys.register('ctrl+alt+s', self._emergency_stop)
         
         self.auto_thread = threading.Thread(target=self._auto_attack_loop)
         self.auto_thread.daemon = True
@@ -94,6 +114,7 @@ class AutoAttacker:
         
         self.logger.info("Auto attacker stopping...")
         self.is_running = False
+        self._stop_token.cancel("stopped")
         
         # Stop any playing attack
         self.attack_player.stop_playback()
@@ -103,15 +124,23 @@ class AutoAttacker:
         
         self.logger.info("Auto attacker stopped")
     
+    def _emergency_stop(self) -> None:
+        """ctrl+alt+s - runs on the hotkey thread, so only signal the loop and the player"""
+        if not self.is_running:
+            return
+        self.logger.warning("Emergency stop activated!")
+        self.is_running = False
+        self._stop_token.cancel("emergency stop")
+        self.attack_player.cancel_playback()
+    
+    def _wait(self, seconds: float) -> bool:
+        """Sleep, waking early on stop; returns False if the attacker was stopped"""
+        return not self._stop_token.wait(seconds * self.wait_scale)
+    
     def _auto_attack_loop(self) -> None:
         """Main automation loop"""
         try:
             while self.is_running:
-                # Check emergency stop
-                if keyboard.is_pressed('ctrl+alt+s'):
-                    self.logger.warning("Emergency stop activated!")
-                    break
-                
                 self.logger.info("🎯 Starting new attack cycle...")
                 
                 # Execute attack sequence
@@ -129,12 +158,15 @@ class AutoAttacker:
                 if self.is_running:
                     delay = random.randint(5, 15)
                     self.logger.info(f"⏳ Waiting {delay} seconds before next attack...")
-                    time.sleep(delay)
+                    self._wait(delay)
                     
         except Exception as e:
             self.logger.error(f"Auto attack loop error: {e}")
         finally:
             self.is_running = False
+            if self._hotkey_handle is not None:
+                self.hotkeys.unregister(self._hotkey_handle)
+                self._hotkey_handle = None
     
     def _execute_attack_sequence(self) -> bool:
         """Execute the complete attack sequence following your exact process"""
@@ -148,8 +180,9 @@ class AutoAttacker:
                 
             attack_coord = coords['attack']
             self.logger.info(f"1️⃣ Clicking attack button at ({attack_coord['x']}, {attack_coord['y']})")
-            pyautogui.click(attack_coord['x'], attack_coord['y'])
-            time.sleep(2)  # Wait for attack screen
+            self.input_backend.click(attack_coord['x'], attack_coord['y'])
+            self._record_video('search')
+            self._wait(2)  # Wait for attack screen
             
             # Step 2-6: Find good loot target
             if not self._find_good_loot_target():
@@ -159,6 +192,7 @@ class AutoAttacker:
             # Step 7: Start attack recording (only after good loot found)
             session_name = self._get_next_attack_session()
             self.logger.info(f"🎯 Starting attack with session: {session_name}")
+            self._record_video(f"battle_{session_name}")
             
             if not self.attack_player.play_attack(session_name, speed=1.0):
                 self.logger.error("Failed to start attack recording")
@@ -174,7 +208,7 @@ class AutoAttacker:
                 if not self.is_running:
                     break
                 self.logger.info(f"⏳ Battle in progress... {remaining//60}m {remaining%60}s remaining")
-                time.sleep(10)
+                self._wait(10)
             
             # Step 9: Return home
             self._return_home()
@@ -184,6 +218,14 @@ class AutoAttacker:
         except Exception as e:
             self.logger.error(f"Attack sequence failed: {e}")
             return False
+        finally:
+            if self.session_video:
+                self.session_video.pause()
+    
+    def _record_video(self, label: str) -> None:
+        """Point the session video at the current phase (a queue put - never waits on encoding)"""
+        if self.session_video:
+            self.session_video.record(label)
     
     def _find_good_loot_target(self) -> bool:
         """Find target with good loot following exact process"""
@@ -206,11 +248,11 @@ class AutoAttacker:
             # Step 2: Click find_a_match
             find_coord = coords['find_a_match']
             self.logger.info(f"2️⃣ Clicking find_a_match at ({find_coord['x']}, {find_coord['y']}) - Attempt {search_attempts}/{max_attempts}")
-            pyautogui.click(find_coord['x'], find_coord['y'])
+            self.input_backend.click(find_coord['x'], find_coord['y'])
             
             # Step 3: Wait 5 seconds
             self.logger.info("3️⃣ Waiting 5 seconds for base to load...")
-            time.sleep(5)
+            self._wait(5)
             
             # Step 4: Check loot
             screenshot_path = self.screen_capture.capture_game_screen()
@@ -222,7 +264,9 @@ class AutoAttacker:
             self.logger.info(f"AI Analysis is {'ENABLED' if use_ai else 'DISABLED'}.")
 
             decision_to_attack = False
-            if use_ai:
+            if self._townhall_too_strong(screenshot_path):
+                self.logger.info("4️⃣ Local Town Hall check rejected the base (no AI call)")
+            elif use_ai:
                 self.logger.info("4️⃣ Checking enemy loot with AI...")
                 decision_to_attack = self._check_loot_with_ai(screenshot_path)
             else:
@@ -237,8 +281,8 @@ class AutoAttacker:
                 self.logger.info("❌ Base not suitable. Clicking next...")
                 if 'next_button' in coords:
                     next_coord = coords['next_button']
-                    pyautogui.click(next_coord['x'], next_coord['y'])
-                    time.sleep(3)  # Wait before next search
+                    self.input_backend.click(next_coord['x'], next_coord['y'])
+                    self._wait(3)  # Wait before next search
                 else:
                     self.logger.error("next_button not mapped, cannot skip.")
                     return False
@@ -270,11 +314,11 @@ class AutoAttacker:
             # Click find_a_match
             find_coord = coords['find_a_match']
             self.logger.info(f"2️⃣ Clicking find_a_match at ({find_coord['x']}, {find_coord['y']}) - Attempt {search_attempts}/{max_attempts}")
-            pyautogui.click(find_coord['x'], find_coord['y'])
+            self.input_backend.click(find_coord['x'], find_coord['y'])
             
             # Wait for base to load
             self.logger.info("3️⃣ Waiting 5 seconds for base to load...")
-            time.sleep(5)
+            self._wait(5)
             
             # Check loot
             screenshot_path = self.screen_capture.capture_game_screen()
@@ -286,7 +330,9 @@ class AutoAttacker:
             self.logger.info(f"AI Analysis is {'ENABLED' if use_ai else 'DISABLED'}.")
             
             decision_to_attack = False
-            if use_ai:
+            if self._townhall_too_strong(screenshot_path):
+                self.logger.info("4️⃣ Local Town Hall check rejected the base (no AI call)")
+            elif use_ai:
                 self.logger.info("4️⃣ Checking enemy loot with AI...")
                 decision_to_attack = self._check_loot_with_ai(screenshot_path)
             else:
@@ -300,8 +346,8 @@ class AutoAttacker:
                 # Bad base, click next
                 self.logger.info("❌ Base not suitable. Clicking next...")
                 next_coord = coords['next_button']
-                pyautogui.click(next_coord['x'], next_coord['y'])
-                time.sleep(3)
+                self.input_backend.click(next_coord['x'], next_coord['y'])
+                self._wait(3)
         
         return False
     
@@ -311,7 +357,12 @@ class AutoAttacker:
         min_elixir = self.config.get('ai_analyzer.min_elixir', 300000)
         min_dark = self.config.get('ai_analyzer.min_dark_elixir', 5000)
 
-        analysis = self.ai_analyzer.analyze_base(screenshot_path, min_gold, min_elixir, min_dark)
+        priority = self._base_priority(screenshot_path)
+        analysis = self.ai_analyzer.analyze_base(screenshot_path, min_gold, min_elixir, min_dark, priority)
+
+        if analysis.get("budget_skip"):
+            self.logger.info(f"⏸️ Skipping base without AI call: {analysis['reasoning']}")
+            return False
 
         if analysis.get("error"):
             self.logger.error(f"AI analysis failed: {analysis['reasoning']}")
@@ -326,24 +377,109 @@ class AutoAttacker:
         
         self.logger.info(f"🔍 AI Extracted Loot: Gold={extracted_gold:,}, Elixir={extracted_elixir:,}, Dark={extracted_dark:,}")
         self.logger.info(f"🏰 Town Hall Level: {townhall_level}")
-        self.logger.info(f"📋 Requirements: Gold={min_gold:,}, Elixir={min_elixir:,}, Dark={min_dark:,}, Max TH=12")
+        self.logger.info(f"📋 Requirements: Gold={min_gold:,}, Elixir={min_elixir:,}, Dark={min_dark:,}, Max TH={self.max_townhall_level}")
         
         # Check loot requirements
         gold_ok = extracted_gold >= min_gold
         elixir_ok = extracted_elixir >= min_elixir
         dark_ok = extracted_dark >= min_dark
-        th_ok = townhall_level <= 12
+        th_ok = townhall_level <= self.max_townhall_level
         
         self.logger.info(f"✅/❌ Meets Requirements: Gold={gold_ok}, Elixir={elixir_ok}, Dark={dark_ok}, TH_Level={th_ok}")
         
         # Override AI decision if Town Hall is too high
-        if townhall_level > 12:
-            self.logger.info(f"❌ Overriding AI: Town Hall {townhall_level} is too strong (max allowed: 12)")
+        if townhall_level > self.max_townhall_level:
+            self.logger.info(f"❌ Overriding AI: Town Hall {townhall_level} is too strong (max allowed: {self.max_townhall_level})")
             return False
 
         recommendation = analysis.get("recommendation", "SKIP").upper()
         return recommendation == "ATTACK"
 
+    def _townhall_too_strong(self, screenshot_path: str) -> bool:
+        """Reject the base locally if the Town Hall detector is confident it is above the max level"""
+        if not self.townhall_detector or not self.townhall_detector.is_available():
+            return False
+        
+        result = self.townhall_detector.detect_file(screenshot_path)
+        self._townhall_result = (screenshot_path, result)
+        if not result:
+            return False
+        
+        self.logger.info(f"🏰 Local TH check: level {result['level']} (score {result['score']:.2f}, "
+                         f"margin {result['margin']:.2f}, {result['elapsed_ms']:.0f} ms)")
+        
+        if result['confident'] and result['level'] > self.max_townhall_level:
+            self.logger.info(f"❌ Town Hall {result['level']} is too strong (max allowed: {self.max_townhall_level})")
+            return True
+        return False
+
+    def _base_priority(self, screenshot_path: str) -> float:
+        """Cheap local estimate (0.0 - 1.0) of how worthwhile an AI call is for this base.
+        
+        Only consulted by the analyzer once the API budget is under pressure, when
+        only bases with priority >= pressure are sent. Combines the cascade's local
+        evidence: how the base's loot counters rank against recent bases (so a
+        pressure of 0.8 sends roughly the top 20%), the Town Hall level headroom
+        from the local detector, and whether the screen changed since the last base.
+        """
+        try:
+            with Image.open(screenshot_path) as img:
+                image = img.convert('RGB')
+        except Exception as e:
+            self.logger.debug(f"Could not read screenshot for priority: {e}")
+            return 1.0
+        
+        loot = self._loot_rank(image)
+        townhall = self._townhall_headroom(screenshot_path)
+        change = self._screen_change(image)
+        priority = loot * townhall * change
+        self.logger.debug(f"Base priority {priority:.2f} (loot rank {loot:.2f}, TH {townhall:.2f}, "
+                          f"screen change {change:.2f})")
+        return priority
+    
+    def _loot_rank(self, image: Image.Image) -> float:
+        """Fraction of recent bases whose loot counters showed no more digits than this one"""
+        pixels = np.asarray(image)
+        bounds = self.screen_capture.game_window_bounds
+        origin_x, origin_y = bounds[:2] if bounds else (0, 0)
+        coords = self.coordinate_mapper.get_coordinates()
+        
+        ink = None
+        for name in ('enemy_gold', 'enemy_elixir', 'enemy_dark_elixir'):
+            if name not in coords:
+                continue
+            x, y = coords[name]['x'] - origin_x, coords[name]['y'] - origin_y
+            strip = pixels[max(0, y - 12):max(0, y + 12), max(0, x - 100):max(0, x + 100)]
+            if not strip.size:
+                continue
+            # Loot counters are bright digits - a bigger amount lights up more columns
+            ink = (ink or 0) + int((strip.min(axis=2) >= 200).any(axis=0).sum())
+        
+        if ink is None:
+            return 1.0  # No loot counters mapped - nothing to rank by
+        self._loot_history.append(ink)
+        return sum(1 for value in self._loot_history if value <= ink) / len(self._loot_history)
+    
+    def _townhall_headroom(self, screenshot_path: str) -> float:
+        """1.0 for a Town Hall well below max_townhall_level, down to 0.7 at the max"""
+        path, result = self._townhall_result
+        if path != screenshot_path or not result:
+            return 1.0
+        factor = max(0.4, min(1.0, 0.7 + 0.15 * (self.max_townhall_level - result['level'])))
+        weight = 1.0 if result['confident'] else 0.5  # A guess only counts half
+        return 1.0 - weight * (1.0 - factor)
+    
+    def _screen_change(self, image: Image.Image) -> float:
+        """Near 0 when next didn't load a new base yet (the screen barely changed)"""
+        thumbnail = image.convert('L').resize((64, 36))
+        previous, self._last_thumbnail = self._last_thumbnail, thumbnail
+        if previous is None:
+            return 1.0
+        
+        # Mean absolute difference of ~20 grey levels is a completely different base
+        difference = ImageStat.Stat(ImageChops.difference(previous, thumbnail)).mean[0]
+        return min(1.0, difference / 20.0)
+    
     def _check_loot(self) -> bool:
         """Check if enemy base has good loot"""
         coords = self.coordinate_mapper.get_coordinates()
@@ -389,8 +525,8 @@ class AutoAttacker:
         if 'end_button' in coords:
             end_coord = coords['end_button']
             self.logger.info(f"🔄 Clicking end_button at ({end_coord['x']}, {end_coord['y']})")
-            pyautogui.click(end_coord['x'], end_coord['y'])
-            time.sleep(3)  # Wait for end action to complete
+            self.input_backend.click(end_coord['x'], end_coord['y'])
+            self._wait(3)  # Wait for end action to complete
         else:
             self.logger.warning("end_button not mapped - cannot retry automatically")
     
@@ -404,8 +540,8 @@ class AutoAttacker:
         if 'return_home' in coords:
             home_coord = coords['return_home']
             self.logger.info(f"Clicking return_home at ({home_coord['x']}, {home_coord['y']})")
-            pyautogui.click(home_coord['x'], home_coord['y'])
-            time.sleep(5)  # Wait to return home
+            self.input_backend.click(home_coord['x'], home_coord['y'])
+            self._wait(5)  # Wait to return home
         else:
             self.logger.warning("return_home button not mapped")
         
@@ -437,7 +573,9 @@ class AutoAttacker:
             'runtime_hours': runtime_hours,
             'attacks_per_hour': self.stats['total_attacks'] / max(runtime_hours, 1),
             'last_attack': self.stats['last_attack_time'].strftime("%H:%M:%S") if self.stats['last_attack_time'] else "None",
-            'configured_sessions': self.attack_sessions.copy()
+            'configured_sessions': self.attack_sessions.copy(),
+            'ai_usage': self.ai_analyzer.get_usage_stats(),
+            'session_video': self.session_video.get_stats() if self.session_video else None
         }
     
     def update_loot_requirements(self, min_gold: int = None, min_elixir: int = None, min_dark_elixir: int = None):
@@ -0,0 +1,174 @@
+"""
+Batch Analyzer - Offline evaluation of saved screenshots through the AI analyzer
+"""
+
+import os
+import csv
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .ai_analyzer import AIAnalyzer
+
+class BatchAnalyzer:
+    """Pushes a folder of screenshots through AIAnalyzer with bounded concurrency"""
+
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+    CSV_FIELDS = [
+        'file', 'recommendation', 'gold', 'elixir', 'dark_elixir', 'townhall_level',
+        'error', 'latency_ms', 'prompt_tokens', 'output_tokens', 'total_tokens', 'reasoning'
+    ]
+
+    def __init__(self, ai_analyzer: AIAnalyzer, logger, concurrency: int = 4,
+                 requests_per_second: float = 2.0):
+        self.ai_analyzer = ai_analyzer
+        self.logger = logger
+        self.concurrency = max(1, concurrency)
+        self.requests_per_second = requests_per_second
+
+        self._rate_lock = None
+        self._next_slot = 0.0
+
+    def run(self, screenshot_dir: str, output_path: str, min_gold: int = 300000,
+            min_elixir: int = 300000, min_dark: int = 2000, limit: Optional[int] = None) -> Dict:
+        """Analyze every screenshot in a directory and write results to JSONL or CSV"""
+        return asyncio.run(self.run_async(screenshot_dir, output_path, min_gold,
+                                          min_elixir, min_dark, limit))
+
+    async def run_async(self, screenshot_dir: str, output_path: str, min_gold: int = 300000,
+                        min_elixir: int = 300000, min_dark: int = 2000,
+                        limit: Optional[int] = None) -> Dict:
+        """Async entry point - results are written as soon as each request completes"""
+        files = self._list_screenshots(screenshot_dir)
+        if limit is not None:
+            files = files[:limit]
+
+        if not files:
+            self.logger.warning(f"No screenshots found in {screenshot_dir}")
+            return self._summarize([], 0.0)
+
+        self.logger.info(f"📂 Batch analyzing {len(files)} screenshots "
+                         f"(concurrency={self.concurrency}, rate={self.requests_per_second}/s)")
+
+        self._rate_lock = asyncio.Lock()
+        self._next_slot = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = []
+
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                open(output_path, 'w', newline='', encoding='utf-8') as out_file:
+            writer = self._create_writer(output_path, out_file)
+
+            async def worker(path: str) -> None:
+                async with semaphore:
+                    await self._wait_for_slot()
+                    row = await self._analyze_one(executor, path, min_gold, min_elixir, min_dark)
+                results.append(row)
+                writer(row)
+                self.logger.info(f"[{len(results)}/{len(files)}] {row['file']}: "
+                                 f"{row['recommendation']} ({row['latency_ms']:.0f} ms)")
+
+            await asyncio.gather(*(worker(path) for path in files))
+
+        summary = self._summarize(results, time.perf_counter() - started)
+        self.logger.info(f"✅ Batch complete: {summary['total']} images, "
+                         f"{summary['errors']} errors, p50={summary['latency_p50_ms']:.0f} ms, "
+                         f"{summary['total_tokens']} tokens, {summary['throughput_per_s']:.2f} img/s")
+        return summary
+
+    def _list_screenshots(self, screenshot_dir: str) -> List[str]:
+        """List image files in a directory, sorted for reproducible runs"""
+        if not os.path.isdir(screenshot_dir):
+            return []
+        return [
+            os.path.join(screenshot_dir, name)
+            for name in sorted(os.listdir(screenshot_dir))
+            if name.lower().endswith(self.IMAGE_EXTENSIONS)
+        ]
+
+    async def _wait_for_slot(self) -> None:
+        """Space request starts evenly so the configured rate is never exceeded"""
+        if self.requests_per_second <= 0:
+            return
+
+        async with self._rate_lock:
+            now = time.perf_counter()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + 1.0 / self.requests_per_second
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _analyze_one(self, executor: ThreadPoolExecutor, path: str, min_gold: int,
+                           min_elixir: int, min_dark: int) -> Dict:
+        """Run one blocking analysis in the thread pool and time it"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        analysis = await loop.run_in_executor(
+            executor, self.ai_analyzer.analyze_base, path, min_gold, min_elixir, min_dark
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        loot = analysis.get('loot', {}) or {}
+        usage = analysis.get('usage', {}) or {}
+        return {
+            'file': os.path.basename(path),
+            'recommendation': analysis.get('recommendation', 'SKIP'),
+            'gold': loot.get('gold', 0),
+            'elixir': loot.get('elixir', 0),
+            'dark_elixir': loot.get('dark_elixir', 0),
+            'townhall_level': analysis.get('townhall_level', 0),
+            'error': bool(analysis.get('error', False)),
+            'latency_ms': latency_ms,
+            'prompt_tokens': usage.get('promptTokenCount', 0),
+            'output_tokens': usage.get('candidatesTokenCount', 0),
+            'total_tokens': usage.get('totalTokenCount', 0),
+            'reasoning': analysis.get('reasoning', '')
+        }
+
+    def _create_writer(self, output_path: str, out_file):
+        """Return a row writer for the output format chosen by file extension"""
+        if output_path.lower().endswith('.csv'):
+            csv_writer = csv.DictWriter(out_file, fieldnames=self.CSV_FIELDS)
+            csv_writer.writeheader()
+
+            def write_csv(row: Dict) -> None:
+                csv_writer.writerow(row)
+                out_file.flush()
+            return write_csv
+
+        def write_jsonl(row: Dict) -> None:
+            out_file.write(json.dumps(row) + '\n')
+            out_file.flush()
+        return write_jsonl
+
+    def _summarize(self, results: List[Dict], elapsed: float) -> Dict:
+        """Aggregate latency, token and decision counts for a finished batch"""
+        latencies = sorted(row['latency_ms'] for row in results)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return latencies[index]
+
+        return {
+            'total': len(results),
+            'attack': sum(1 for row in results if row['recommendation'].upper() == 'ATTACK'),
+            'skip': sum(1 for row in results if row['recommendation'].upper() != 'ATTACK'),
+            'errors': sum(1 for row in results if row['error']),
+            'latency_mean_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p50_ms': percentile(50),
+            'latency_p95_ms': percentile(95),
+            'latency_max_ms': latencies[-1] if latencies else 0.0,
+            'total_tokens': sum(row['total_tokens'] for row in results),
+            'elapsed_s': elapsed,
+            'throughput_per_s': len(results) / elapsed if elapsed > 0 else 0.0
+        }
@@ -5,17 +5,21 @@ Coordinate Mapper - Records and manages button coordinates for the COC bot
 import json
 import os
 import time
-import pyautogui
-import keyboard
+import queue
+import functools
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
+from .hotkey_service import HotkeyService, default_hotkey_service
+from .screen_capture import cursor_position, screen_size
 
 class CoordinateMapper:
     """Records and manages button coordinates for automated clicking"""
     
-    def __init__(self):
-        self.coordinates_dir = "coordinates"
-        self.coordinates_file = os.path.join(self.coordinates_dir, "button_coordinates.json")
+    def __init__(self, hotkey_service: Optional[HotkeyService] = None, coordinates_file: Optional[str] = None):
+        self.hotkeys = hotkey_service or default_hotkey_service()
+        # Each emulator instance can keep its own coordinate set (multi-instance)
+        self.coordinates_file = coordinates_file or os.path.join("coordinates", "button_coordinates.json")
+        self.coordinates_dir = os.path.dirname(self.coordinates_file) or "."
         self.coordinates = {}
         self.is_mapping = False
         
@@ -83,27 +87,37 @@ class CoordinateMapper:
         print("\nStarting in 3 seconds...")
         time.sleep(3)
         
+        # Hotkeys arrive as events; this thread only wakes when one is pressed
+        presses = queue.Queue()
+        handles = [self.hotkeys.register(key, functools.partial(presses.put, key))
+                   for key in ('esc', 'f1', 'f2', 'f3')]
+        
         try:
+            if not self.hotkeys.running:
+                print("Mapping needs keyboard hotkeys, which are unavailable")
+                return
+            
             while self.is_mapping:
-                if keyboard.is_pressed('esc'):
+                try:
+                    key = presses.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                
+                if key == 'esc':
                     print("\nMapping cancelled")
                     break
                 
-                if keyboard.is_pressed('f2'):
+                if key == 'f2':
                     # Record current mouse position
-                    x, y = pyautogui.position()
+                    x, y = cursor_position()
                     button_name = input(f"\nMouse at ({x}, {y}). Enter button name: ").strip()
                     
                     if button_name:
                         current_session[button_name] = {"x": x, "y": y}
                         print(f"Recorded '{button_name}' at ({x}, {y})")
                         print(f"Session mappings: {len(current_session)}")
-                    
-                    # Wait for key release
-                    while keyboard.is_pressed('f2'):
-                        time.sleep(0.1)
                 
-                if keyboard.is_pressed('f3'):
+                elif key == 'f3':
                     # Save current session
                     if current_session:
                         self.coordinates.update(current_session)
@@ -112,22 +126,18 @@ class CoordinateMapper:
                         current_session.clear()
                     else:
                         print("\nNo mappings to save")
-                    
-                    # Wait for key release
-                    while keyboard.is_pressed('f3'):
-                        time.sleep(0.1)
                 
-                if keyboard.is_pressed('f1'):
+                elif key == 'f1':
                     # Toggle mapping mode
                     print("\nExiting mapping mode")
                     break
-                
-                time.sleep(0.1)
         
         except KeyboardInterrupt:
             print("\nMapping interrupted")
         
         finally:
+            for handle in handles:
+                self.hotkeys.unregister(handle)
             self.is_mapping = False
             print("Coordinate mapping stopped")
             
@@ -172,7 +182,7 @@ class CoordinateMapper:
     
     def validate_coordinates(self) -> Dict[str, bool]:
         """Validate that all coordinates are within screen bounds"""
-        screen_width, screen_height = pyautogui.size()
+        screen_width, screen_height = screen_size()
         validation = {}
         
         for name, coords in self.coordinates.items():
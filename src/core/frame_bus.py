@@ -0,0 +1,363 @@
+"""
+Frame Bus - One capture thread publishing frames into a shared-memory ring buffer
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .recording_journal import pid_alive
+
+MAGIC = 0x31425246  # 'FRB1'
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'u4'),
+    ('slots', 'u4'),
+    ('width', 'u4'),       # capacity of each slot
+    ('height', 'u4'),
+    ('channels', 'u4'),
+    ('closed', 'u4'),
+    ('latest', 'u8'),      # sequence number of the newest complete frame, 0 before the first
+    ('writer', 'u8'),      # pid of the process that created the bus
+    ('pad', 'u8', 4),
+])
+
+SLOT_DTYPE = np.dtype([
+    ('seq', 'u8'),         # 0 while the slot is being written
+    ('timestamp', 'f8'),   # time.perf_counter() at capture - comparable across processes on one machine
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('width', 'u4'),
+    ('height', 'u4'),
+    ('pad', 'u8', 2),
+])
+
+class Frame(NamedTuple):
+    """One published frame; pixels may be a read-only view into shared memory"""
+    seq: int
+    timestamp: float
+    region: Tuple[int, int, int, int]  # (x, y, width, height) on screen
+    pixels: np.ndarray
+
+    @property
+    def age(self) -> float:
+        return time.perf_counter() - self.timestamp
+
+    def crop(self, region: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+        """The part of this frame showing a screen region, or None if the frame doesn't cover it"""
+        x, y, width, height = region
+        left, top = x - self.region[0], y - self.region[1]
+        if left < 0 or top < 0 or left + width > self.region[2] or top + height > self.region[3]:
+            return None
+        return self.pixels[top:top + height, left:left + width]
+
+def _attach(name: str, track: bool = False) -> shared_memory.SharedMemory:
+    """Open an existing segment; unless tracked, this process's resource tracker won't unlink it on exit"""
+    if track:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 always tracks
+        memory = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, 'shared_memory')
+        except Exception:
+            pass
+        return memory
+
+class FrameBusReader:
+    """
+    Read access to a frame bus, from this or any other process
+
+    The writer fills a slot, then stamps it with its sequence number, then
+    bumps `latest`, so a reader never sees a half-written frame as current.
+    latest(copy=False) returns a zero-copy view into the slot; it stays
+    valid until the writer wraps around to that slot again (slots - 1 frames
+    later), which is_current() checks.
+    """
+
+    def __init__(self, name: str, track: bool = False):
+        """
+        Args:
+            name: Shared memory name of the bus
+            track: True in multiprocessing children, which share the owner's resource tracker
+                (untracking there would drop the owner's registration)
+        """
+        self._attach(_attach(name, track))
+
+    def _attach(self, memory: shared_memory.SharedMemory) -> None:
+        self.memory = memory
+        self.name = memory.name
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        if int(self.header['magic']) != MAGIC:
+            raise ValueError(f"Shared memory '{self.name}' is not a frame bus")
+        self.slots = int(self.header['slots'])
+        self.capacity = (int(self.header['width']), int(self.header['height']), int(self.header['channels']))
+        self.slot_table = np.ndarray((self.slots,), dtype=SLOT_DTYPE, buffer=memory.buf,
+                                     offset=HEADER_DTYPE.itemsize)
+        self.frame_bytes = self.capacity[0] * self.capacity[1] * self.capacity[2]
+        self.data_offset = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * self.slots
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self.header['latest'])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.header['closed'])
+
+    def latest(self, copy: bool = False) -> Optional[Frame]:
+        """The newest complete frame, or None before the first one"""
+        for _ in range(self.slots):
+            seq = self.latest_seq
+            if not seq:
+                return None
+            frame = self._read(seq)
+            if frame is None:
+                continue  # The writer reused the slot since we read `latest` - take the newer frame
+            if not copy:
+                return frame
+            frame = frame._replace(pixels=frame.pixels.copy())
+            if self.is_current(frame):
+                return frame
+        return None
+
+    def wait_for_frame(self, after_seq: int = 0, timeout: float = 1.0, poll: float = 0.002) -> Optional[Frame]:
+        """Wait for a frame newer than after_seq (polls - works across processes without extra handles)"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            if self.latest_seq > after_seq:
+                frame = self.latest()
+                if frame is not None and frame.seq > after_seq:
+                    return frame
+            if time.perf_counter() >= deadline or self.closed:
+                return None
+            time.sleep(poll)
+
+    def is_current(self, frame: Frame) -> bool:
+        """Whether a zero-copy frame still holds its pixels (its slot hasn't been overwritten)"""
+        return int(self.slot_table[frame.seq % self.slots]['seq']) == frame.seq
+
+    def _read(self, seq: int) -> Optional[Frame]:
+        slot = self.slot_table[seq % self.slots]
+        if int(slot['seq']) != seq:
+            return None
+        timestamp, x, y = float(slot['timestamp']), int(slot['x']), int(slot['y'])
+        width, height = int(slot['width']), int(slot['height'])
+        if int(slot['seq']) != seq:
+            return None
+        pixels = np.ndarray((height, width, self.capacity[2]), dtype=np.uint8, buffer=self.memory.buf,
+                            offset=self.data_offset + (seq % self.slots) * self.frame_bytes)
+        pixels.flags.writeable = False
+        return Frame(seq, timestamp, (x, y, width, height), pixels)
+
+    def close(self) -> None:
+        """Detach from the segment (the writer owns and removes it)"""
+        self.header = self.slot_table = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass  # Zero-copy frames still reference the buffer; it is released when they are
+
+def _remove_stale(name: str) -> None:
+    """
+    Unlink a segment left behind by a crashed run
+
+    Raises FileExistsError if the segment isn't a frame bus, or is one
+    another live process is still writing to.
+    """
+    existing = _attach(name)  # Untracked: exiting must not unlink a bus that turns out to be live
+    try:
+        fields = (np.ndarray((), dtype=HEADER_DTYPE, buffer=existing.buf).tolist()
+                  if existing.size >= HEADER_DTYPE.itemsize else None)
+    finally:
+        existing.close()
+    header = dict(zip(HEADER_DTYPE.names, fields)) if fields else {}
+    if header.get('magic') != MAGIC:
+        raise FileExistsError(f"Shared memory '{name}' exists and is not a frame bus")
+    if not header['closed'] and pid_alive(header['writer']):
+        raise FileExistsError(f"Frame bus '{name}' is in use by process {header['writer']}")
+
+    stale = shared_memory.SharedMemory(name=name)
+    stale.close()
+    stale.unlink()
+
+class FrameBus(FrameBusReader):
+    """The writing side: creates the segment and publishes frames into it"""
+
+    def __init__(self, width: int, height: int, channels: int = 3, slots: int = 4, name: Optional[str] = None):
+        """
+        Args:
+            width, height: Largest frame the bus can hold
+            channels: 3 for RGB
+            slots: Frames kept - a zero-copy reader has slots - 1 frame periods to use a frame
+            name: Shared memory name other processes attach with; None picks a unique one
+        """
+        if slots < 2:
+            raise ValueError("A frame bus needs at least 2 slots")
+        size = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots + width * height * channels * slots
+        try:
+            memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        header['slots'], header['width'], header['height'], header['channels'] = slots, width, height, channels
+        header['latest'], header['closed'], header['writer'] = 0, 0, os.getpid()
+        header['magic'] = MAGIC
+        self._attach(memory)
+        self.lock = threading.Lock()  # One writer at a time
+
+    def publish(self, pixels: np.ndarray, region: Tuple[int, int, int, int],
+                timestamp: Optional[float] = None) -> int:
+        """
+        Copy a frame into the next slot and make it the latest
+
+        Args:
+            pixels: (height, width, channels) uint8 array, at most the bus capacity
+            region: Screen position of the frame, (x, y, width, height)
+            timestamp: Capture time (time.perf_counter()); defaults to now
+
+        Returns:
+            The frame's sequence number
+        """
+        height, width = pixels.shape[:2]
+        if width > self.capacity[0] or height > self.capacity[1]:
+            raise ValueError(f"Frame {width}x{height} exceeds the bus capacity {self.capacity[0]}x{self.capacity[1]}")
+        with self.lock:
+            seq = self.latest_seq + 1
+            index = seq % self.slots
+            slot = self.slot_table[index]
+            slot['seq'] = 0
+            target = np.ndarray((height, width, self.capacity[2]), dtype=np.uint8, buffer=self.memory.buf,
+                                offset=self.data_offset + index * self.frame_bytes)
+            target[...] = pixels
+            slot['timestamp'] = time.perf_counter() if timestamp is None else timestamp
+            slot['x'], slot['y'], slot['width'], slot['height'] = region[0], region[1], width, height
+            slot['seq'] = seq
+            self.header['latest'] = seq
+        return seq
+
+    def close(self) -> None:
+        """Mark the bus closed and remove the segment (readers keep their mapping until they close)"""
+        if self.header is not None:
+            self.header['closed'] = 1
+        super().close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+class FrameCapturer:
+    """
+    The one thread that captures the screen, at a fixed rate, into a FrameBus
+
+    Everything else reads frames from the bus instead of taking its own
+    screenshots. With no fixed region it follows the game window.
+    """
+
+    def __init__(self, grab_region: Callable[[Tuple[int, int, int, int]], np.ndarray], bus: FrameBus,
+                 fps: float = 10.0, region: Optional[Tuple[int, int, int, int]] = None,
+                 window_provider: Optional[Callable[[], Optional[Tuple[int, int, int, int]]]] = None):
+        """
+        Args:
+            grab_region: Function capturing a screen region as an RGB array (e.g. ScreenCapture.grab_region)
+            bus: Where frames are published
+            fps: Capture rate
+            region: Fixed capture region (x, y, width, height)
+            window_provider: Returns the current game window, used when no region is set
+        """
+        self.grab_region = grab_region
+        self.bus = bus
+        self.fps = fps
+        self.region = tuple(region) if region else None
+        self.window_provider = window_provider
+        self._stop = threading.Event()
+        self._thread = None
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {'frames': 0, 'errors': 0, 'overruns': 0, 'capture_time': 0.0, 'max_capture_ms': 0.0,
+                      'started': time.perf_counter()}
+
+    def set_fps(self, fps: float) -> None:
+        self.fps = max(0.1, fps)
+
+    def set_region(self, region: Optional[Tuple[int, int, int, int]]) -> None:
+        """Capture a fixed region from the next frame on (None follows the game window)"""
+        self.region = tuple(region) if region else None
+
+    def current_region(self) -> Tuple[int, int, int, int]:
+        """The region to capture, trimmed to the bus capacity"""
+        region = self.region or (self.window_provider() if self.window_provider else None)
+        x, y, width, height = region or (0, 0, self.bus.capacity[0], self.bus.capacity[1])
+        return (x, y, min(width, self.bus.capacity[0]), min(height, self.bus.capacity[1]))
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self.reset_stats()
+        self._thread = threading.Thread(target=self._run, name="FrameCapturer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def capture_once(self) -> Optional[int]:
+        """Capture and publish one frame now; returns its sequence number"""
+        started = time.perf_counter()
+        region = self.current_region()
+        try:
+            pixels = np.asarray(self.grab_region(region))[..., :3]
+            seq = self.bus.publish(pixels, region, timestamp=started)
+        except Exception as e:
+            with self.lock:
+                self.stats['errors'] += 1
+            if self.stats['errors'] == 1:
+                print(f"Frame capture failed: {e}")
+            return None
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.stats['frames'] += 1
+            self.stats['capture_time'] += elapsed
+            self.stats['max_capture_ms'] = max(self.stats['max_capture_ms'], elapsed * 1000)
+        return seq
+
+    def _run(self) -> None:
+        next_frame = time.perf_counter()
+        while not self._stop.is_set():
+            self.capture_once()
+            next_frame += 1.0 / self.fps
+            now = time.perf_counter()
+            if now > next_frame:
+                # Capture is slower than the frame rate - skip ahead rather than fall further behind
+                with self.lock:
+                    self.stats['overruns'] += 1
+                next_frame = now
+            self._stop.wait(next_frame - now)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = time.perf_counter() - stats.pop('started')
+        frames = stats['frames']
+        stats['mean_capture_ms'] = stats.pop('capture_time') / frames * 1000 if frames else 0.0
+        stats['actual_fps'] = frames / elapsed if elapsed > 0 else 0.0
+        stats['target_fps'] = self.fps
+        stats['region'] = self.current_region()
+        stats['bus'] = self.bus.name
+        return stats
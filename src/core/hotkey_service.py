@@ -0,0 +1,144 @@
+"""
+Hotkey Service - One keyboard hook dispatching hotkeys to callbacks and cancellation tokens
+"""
+
+import threading
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional
+
+from .input_events import HookInputSource, InputEvent, InputEventSource
+
+# keyboard package key names folded onto the names used in hotkey strings
+KEY_ALIASES = {'control': 'ctrl', 'alt gr': 'alt', 'escape': 'esc', 'left windows': 'windows',
+               'right windows': 'windows'}
+
+def normalize_key(name: str) -> str:
+    """Lower-case key name with left/right variants folded together"""
+    name = (name or '').lower().strip()
+    if name in KEY_ALIASES:
+        return KEY_ALIASES[name]
+    for side in ('left ', 'right '):
+        if name.startswith(side):
+            name = name[len(side):]
+    return KEY_ALIASES.get(name, name)
+
+class Hotkey(NamedTuple):
+    modifiers: FrozenSet[str]
+    key: str
+
+def parse_hotkey(hotkey: str) -> Hotkey:
+    """Parse 'ctrl+alt+s' style strings; the last non-modifier key is the trigger"""
+    keys = [normalize_key(part) for part in hotkey.split('+') if part.strip()]
+    if not keys:
+        raise ValueError(f"Empty hotkey: {hotkey!r}")
+    return Hotkey(frozenset(keys[:-1]), keys[-1])
+
+class CancellationToken:
+    """Set once to ask a running task to stop; waiting on it doubles as an interruptible sleep"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: Optional[str] = None) -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to timeout seconds; returns True as soon as the token is cancelled"""
+        return self._event.wait(timeout)
+
+class HotkeyService:
+    """
+    Dispatches hotkeys from a single keyboard hook
+
+    Components register callbacks (or cancellation tokens) for hotkeys
+    instead of polling keyboard.is_pressed in their loops. Callbacks run on
+    the hook thread, so they should only flip flags, cancel tokens or queue
+    work. Holding a key down fires its hotkey once - auto-repeat is ignored.
+    """
+
+    def __init__(self, source: Optional[InputEventSource] = None):
+        self.source = source or HookInputSource(mouse=False)
+        self.lock = threading.Lock()
+        self._bindings: Dict[int, tuple] = {}
+        self._next_handle = 1
+        self._held = set()
+        self.running = False
+        self.available = True
+
+    def start(self) -> bool:
+        """Install the keyboard hook; returns False if hotkeys can't be used here"""
+        with self.lock:
+            if self.running or not self.available:
+                return self.running
+            try:
+                self.source.start(self._on_event)
+                self.running = True
+            except Exception as e:
+                self.available = False
+                print(f"Hotkeys unavailable: {e}")
+            return self.running
+
+    def stop(self) -> None:
+        with self.lock:
+            if self.running:
+                self.source.stop()
+                self.running = False
+            self._held.clear()
+
+    def register(self, hotkey: str, callback: Callable[[], None]) -> int:
+        """Call callback whenever hotkey is pressed; returns a handle for unregister()"""
+        binding = parse_hotkey(hotkey)
+        with self.lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self._bindings[handle] = (binding, callback)
+        self.start()
+        return handle
+
+    def cancel_on(self, hotkey: str, token: CancellationToken, reason: Optional[str] = None) -> int:
+        """Cancel token when hotkey is pressed"""
+        return self.register(hotkey, lambda: token.cancel(reason or hotkey))
+
+    def unregister(self, handle: int) -> None:
+        with self.lock:
+            self._bindings.pop(handle, None)
+
+    def _on_event(self, event: InputEvent) -> None:
+        """Hook callback - track held keys and fire bindings on fresh key presses"""
+        if event.kind not in ('key_down', 'key_up'):
+            return
+        key = normalize_key(event.key)
+
+        with self.lock:
+            if event.kind == 'key_up':
+                self._held.discard(key)
+                return
+            if key in self._held:
+                return  # Auto-repeat
+            self._held.add(key)
+            held = set(self._held)
+            callbacks = [callback for binding, callback in self._bindings.values()
+                         if binding.key == key and binding.modifiers <= held]
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Hotkey callback error: {e}")
+
+_default_service = None
+_default_lock = threading.Lock()
+
+def default_hotkey_service() -> HotkeyService:
+    """The process-wide hotkey service (one OS hook shared by every component)"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = HotkeyService()
+        return _default_service
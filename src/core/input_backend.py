@@ -0,0 +1,267 @@
+"""
+Input Backend - Mouse injection used by playback and the auto attacker
+"""
+
+import sys
+import time
+import threading
+from typing import List, NamedTuple, Optional, Sequence
+
+class InputCommand(NamedTuple):
+    """One low-level mouse event"""
+    kind: str  # 'move', 'down', 'up'
+    x: int
+    y: int
+    button: str = 'left'
+
+class InputBackend:
+    """Interface for injecting mouse input"""
+
+    name = "base"
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        """Inject a batch of events back to back, as close to one call as the backend allows"""
+        raise NotImplementedError
+
+    def click(self, x: int, y: int, clicks: int = 1, interval: float = 0.0, button: str = 'left') -> None:
+        """Tap a point one or more times"""
+        tap = [InputCommand('move', x, y, button), InputCommand('down', x, y, button),
+               InputCommand('up', x, y, button)]
+        if interval <= 0:
+            self.send(tap * clicks)
+            return
+        for i in range(clicks):
+            if i:
+                time.sleep(interval)
+            self.send(tap)
+
+    def move(self, x: int, y: int) -> None:
+        self.send([InputCommand('move', x, y)])
+
+    def mouse_down(self, x: int, y: int, button: str = 'left') -> None:
+        self.send([InputCommand('move', x, y, button), InputCommand('down', x, y, button)])
+
+    def mouse_up(self, x: int, y: int, button: str = 'left') -> None:
+        self.send([InputCommand('move', x, y, button), InputCommand('up', x, y, button)])
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui without its global PAUSE after every call"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        pyautogui = self._pyautogui
+        for command in commands:
+            if command.kind == 'move':
+                pyautogui.moveTo(command.x, command.y, _pause=False)
+            elif command.kind == 'down':
+                pyautogui.mouseDown(command.x, command.y, button=command.button, _pause=False)
+            elif command.kind == 'up':
+                pyautogui.mouseUp(command.x, command.y, button=command.button, _pause=False)
+
+class SendInputBackend(InputBackend):
+    """Win32 SendInput via ctypes - a whole batch is injected in a single system call"""
+
+    name = "sendinput"
+
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_LEFTDOWN = 0x0002
+    MOUSEEVENTF_LEFTUP = 0x0004
+    MOUSEEVENTF_RIGHTDOWN = 0x0008
+    MOUSEEVENTF_RIGHTUP = 0x0010
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    INPUT_MOUSE = 0
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                        ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD),
+                        ('dwExtraInfo', ctypes.c_size_t)]
+
+        class _INPUTUNION(ctypes.Union):
+            # MOUSEINPUT is the largest member, so it alone gives INPUT the right size
+            _fields_ = [('mi', MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('union', _INPUTUNION)]
+
+        self._ctypes = ctypes
+        self._INPUT = INPUT
+        self._user32 = ctypes.windll.user32
+        self._user32.SetProcessDPIAware()  # Work in physical pixels, like pyautogui
+        self._user32.SendInput.argtypes = [wintypes.UINT, ctypes.c_void_p, ctypes.c_int]
+
+        self._buttons = {
+            'left': (self.MOUSEEVENTF_LEFTDOWN, self.MOUSEEVENTF_LEFTUP),
+            'right': (self.MOUSEEVENTF_RIGHTDOWN, self.MOUSEEVENTF_RIGHTUP)
+        }
+        self._refresh_screen()
+
+    def _refresh_screen(self) -> None:
+        """Cache the virtual desktop geometry used to normalize absolute coordinates"""
+        metrics = self._user32.GetSystemMetrics
+        self._screen_x, self._screen_y = metrics(76), metrics(77)
+        self._screen_width, self._screen_height = max(metrics(78), 2), max(metrics(79), 2)
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        if not commands:
+            return
+        inputs = (self._INPUT * len(commands))()
+        base_flags = self.MOUSEEVENTF_MOVE | self.MOUSEEVENTF_ABSOLUTE | self.MOUSEEVENTF_VIRTUALDESK
+
+        for item, command in zip(inputs, commands):
+            item.type = self.INPUT_MOUSE
+            mouse = item.union.mi
+            mouse.dx = (command.x - self._screen_x) * 65535 // (self._screen_width - 1)
+            mouse.dy = (command.y - self._screen_y) * 65535 // (self._screen_height - 1)
+            flags = base_flags
+            if command.kind == 'down':
+                flags |= self._buttons.get(command.button, self._buttons['left'])[0]
+            elif command.kind == 'up':
+                flags |= self._buttons.get(command.button, self._buttons['left'])[1]
+            mouse.dwFlags = flags
+
+        sent = self._user32.SendInput(len(commands), inputs, self._ctypes.sizeof(self._INPUT))
+        if sent != len(commands):
+            raise OSError(f"SendInput injected {sent} of {len(commands)} events")
+
+class WindowMessageBackend(InputBackend):
+    """
+    Posts mouse messages straight to one window instead of moving the real cursor
+
+    Several emulator instances can be driven at once this way, and the user
+    keeps the mouse. Commands use screen coordinates; each is delivered to the
+    child window under that point (emulators render into a child window) in
+    its client coordinates.
+    """
+
+    name = "window"
+
+    WM_MOUSEMOVE = 0x0200
+    WM_LBUTTONDOWN = 0x0201
+    WM_LBUTTONUP = 0x0202
+    WM_RBUTTONDOWN = 0x0204
+    WM_RBUTTONUP = 0x0205
+    MK_LBUTTON = 0x0001
+    MK_RBUTTON = 0x0002
+    CWP_SKIPINVISIBLE = 0x0001
+    CWP_SKIPDISABLED = 0x0002
+
+    def __init__(self, window_handle: int):
+        import ctypes
+        from ctypes import wintypes
+
+        if not window_handle:
+            raise ValueError("WindowMessageBackend needs a window handle")
+        self.window_handle = window_handle
+        self._ctypes = ctypes
+        self._POINT = wintypes.POINT
+        self._user32 = ctypes.windll.user32
+        self._user32.SetProcessDPIAware()
+        self._user32.ScreenToClient.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.POINT)]
+        self._user32.ChildWindowFromPointEx.restype = wintypes.HWND
+        self._user32.ChildWindowFromPointEx.argtypes = [wintypes.HWND, wintypes.POINT, wintypes.UINT]
+        self._user32.PostMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+
+        self._messages = {
+            'left': (self.WM_LBUTTONDOWN, self.WM_LBUTTONUP, self.MK_LBUTTON),
+            'right': (self.WM_RBUTTONDOWN, self.WM_RBUTTONUP, self.MK_RBUTTON)
+        }
+        self._held = 0  # MK_* flags of buttons currently down, sent with moves (drags)
+
+    def _target(self, x: int, y: int):
+        """Child window under a screen point and the point in its client coordinates"""
+        user32 = self._user32
+        point = self._POINT(x, y)
+        user32.ScreenToClient(self.window_handle, self._ctypes.byref(point))
+        target = user32.ChildWindowFromPointEx(self.window_handle, point,
+                                               self.CWP_SKIPINVISIBLE | self.CWP_SKIPDISABLED) or self.window_handle
+        point = self._POINT(x, y)
+        user32.ScreenToClient(target, self._ctypes.byref(point))
+        return target, (point.y & 0xFFFF) << 16 | (point.x & 0xFFFF)
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        for command in commands:
+            target, position = self._target(command.x, command.y)
+            down, up, flag = self._messages.get(command.button, self._messages['left'])
+            if command.kind == 'move':
+                message, state = self.WM_MOUSEMOVE, self._held
+            elif command.kind == 'down':
+                self._held |= flag
+                message, state = down, self._held
+            else:
+                self._held &= ~flag
+                message, state = up, self._held
+            if not self._user32.PostMessageW(target, message, state, position):
+                raise OSError(f"PostMessage to window {target} failed")
+
+class VirtualInputSink(InputBackend):
+    """Records events with perf_counter timestamps instead of injecting them (tests, benchmarks)"""
+
+    name = "virtual"
+
+    def __init__(self):
+        self.events = []
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        now = time.perf_counter()
+        with self.lock:
+            self.batches += 1
+            self.events.extend((now, command) for command in commands)
+
+    def get_events(self, kind: Optional[str] = None) -> List:
+        """(timestamp, InputCommand) pairs, optionally only one kind"""
+        with self.lock:
+            return [event for event in self.events if kind is None or event[1].kind == kind]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.events = []
+            self.batches = 0
+
+def create_input_backend(name: str = "auto", window_handle: Optional[int] = None, device=None) -> InputBackend:
+    """
+    Create an input backend by name
+
+    Args:
+        name: 'auto' (SendInput on Windows, XTest under X11, otherwise pyautogui), 'sendinput', 'xtest',
+            'pyautogui', 'window' (messages to one window, needs window_handle), 'adb' (needs device) or 'virtual'
+        window_handle: Target window for the 'window' backend
+        device: AdbDevice for the 'adb' backend
+    """
+    if name == "virtual":
+        return VirtualInputSink()
+    if name == "window":
+        return WindowMessageBackend(window_handle)
+    if name == "adb":
+        from .adb_backend import AdbInputBackend
+        if device is None:
+            raise ValueError("The adb input backend needs a device")
+        return AdbInputBackend(device)
+    if name in ("auto", "sendinput") and sys.platform == "win32":
+        try:
+            return SendInputBackend()
+        except Exception as e:
+            if name == "sendinput":
+                raise
+            print(f"SendInput backend unavailable ({e}) - falling back to pyautogui")
+    if name == "xtest" or (name == "auto" and sys.platform.startswith("linux")):
+        from .x11_backend import XTestInputBackend, x11_available
+        if name == "xtest" or x11_available():
+            try:
+                return XTestInputBackend()
+            except Exception as e:
+                if name == "xtest":
+                    raise
+                print(f"XTest backend unavailable ({e}) - falling back to pyautogui")
+    return PyAutoGUIBackend()
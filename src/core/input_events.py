@@ -0,0 +1,147 @@
+"""
+Input Events - Event sources for recording user input without polling
+"""
+
+import time
+import threading
+from typing import Callable, NamedTuple, Optional, Tuple
+
+class InputEvent(NamedTuple):
+    """A single keyboard or mouse event timestamped with time.perf_counter()"""
+    kind: str  # 'mouse_down', 'mouse_up', 'mouse_move', 'key_down', 'key_up'
+    time: float
+    x: int = 0
+    y: int = 0
+    button: str = ''
+    key: str = ''
+
+EventCallback = Callable[[InputEvent], None]
+
+class InputEventSource:
+    """Interface for anything that delivers InputEvents to a callback"""
+
+    def start(self, callback: EventCallback) -> None:
+        """Begin delivering events to callback (called from the source's own thread)"""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Stop delivering events"""
+        raise NotImplementedError
+
+    def position(self) -> Tuple[int, int]:
+        """Last known mouse position"""
+        raise NotImplementedError
+
+class HookInputSource(InputEventSource):
+    """OS-level keyboard and mouse hooks (keyboard + mouse packages)"""
+
+    def __init__(self, mouse: bool = True):
+        self._callback = None
+        self._keyboard_hook = None
+        self._position = (0, 0)
+        self.hook_mouse = mouse  # Keyboard-only sources (hotkeys) skip the mouse hook
+
+    def start(self, callback: EventCallback) -> None:
+        import keyboard
+
+        self._callback = callback
+        self._keyboard_hook = keyboard.hook(self._on_key)
+        if self.hook_mouse:
+            import mouse
+            self._position = mouse.get_position()
+            mouse.hook(self._on_mouse)
+
+    def stop(self) -> None:
+        import keyboard
+
+        if self._keyboard_hook is not None:
+            keyboard.unhook(self._keyboard_hook)
+            self._keyboard_hook = None
+        if self.hook_mouse:
+            import mouse
+            try:
+                mouse.unhook(self._on_mouse)
+            except ValueError:
+                pass  # Already unhooked
+        self._callback = None
+
+    def position(self) -> Tuple[int, int]:
+        return self._position
+
+    def _on_key(self, event) -> None:
+        """Keyboard hook callback - runs on the hook thread, so keep it cheap"""
+        callback = self._callback
+        if callback is None:
+            return
+        kind = 'key_down' if event.event_type == 'down' else 'key_up'
+        callback(InputEvent(kind, time.perf_counter(), key=(event.name or '').lower()))
+
+    def _on_mouse(self, event) -> None:
+        """Mouse hook callback - button events carry no position, so track it from moves"""
+        import mouse
+
+        callback = self._callback
+        if callback is None:
+            return
+        now = time.perf_counter()
+
+        if isinstance(event, mouse.MoveEvent):
+            self._position = (event.x, event.y)
+            callback(InputEvent('mouse_move', now, event.x, event.y))
+        elif isinstance(event, mouse.ButtonEvent):
+            x, y = self._position
+            if event.event_type in (mouse.DOWN, mouse.DOUBLE):
+                callback(InputEvent('mouse_down', now, x, y, button=event.button))
+            elif event.event_type == mouse.UP:
+                callback(InputEvent('mouse_up', now, x, y, button=event.button))
+
+class SyntheticInputSource(InputEventSource):
+    """Scriptable event source for tests and benchmarks"""
+
+    def __init__(self):
+        self._callback = None
+        self._position = (0, 0)
+        self.lock = threading.Lock()
+
+    def start(self, callback: EventCallback) -> None:
+        self._callback = callback
+
+    def stop(self) -> None:
+        self._callback = None
+
+    def position(self) -> Tuple[int, int]:
+        return self._position
+
+    def emit(self, event: InputEvent) -> None:
+        """Deliver an event as if it came from the OS"""
+        with self.lock:
+            if event.kind.startswith('mouse'):
+                self._position = (event.x, event.y)
+            callback = self._callback
+        if callback:
+            callback(event)
+
+    def move(self, x: int, y: int, at: Optional[float] = None) -> None:
+        self.emit(InputEvent('mouse_move', at if at is not None else time.perf_counter(), x, y))
+
+    def press(self, x: int, y: int, button: str = 'left', at: Optional[float] = None) -> None:
+        self.emit(InputEvent('mouse_down', at if at is not None else time.perf_counter(), x, y, button=button))
+
+    def release(self, x: int, y: int, button: str = 'left', at: Optional[float] = None) -> None:
+        self.emit(InputEvent('mouse_up', at if at is not None else time.perf_counter(), x, y, button=button))
+
+    def click(self, x: int, y: int, hold: float = 0.03, button: str = 'left', at: Optional[float] = None) -> None:
+        """Press and release at one point; with 'at', both timestamps are synthetic"""
+        start = at if at is not None else time.perf_counter()
+        self.press(x, y, button, start)
+        if at is None:
+            time.sleep(hold)
+            self.release(x, y, button)
+        else:
+            self.release(x, y, button, start + hold)
+
+    def key(self, name: str, at: Optional[float] = None) -> None:
+        """Press and release a key"""
+        start = at if at is not None else time.perf_counter()
+        self.emit(InputEvent('key_down', start, key=name))
+        self.emit(InputEvent('key_up', start, key=name))
@@ -0,0 +1,261 @@
+"""
+Orchestrator - Drives several emulator instances concurrently, one auto attacker each
+"""
+
+import os
+import time
+import threading
+import contextlib
+from typing import Dict, List, Optional
+
+from .attack_player import AttackPlayer
+from .attack_recorder import AttackRecorder
+from .auto_attacker import AutoAttacker
+from .coordinate_mapper import CoordinateMapper
+from .hotkey_service import HotkeyService
+from .input_backend import InputBackend, create_input_backend
+from .adb_backend import DEFAULT_PORT, AdbDevice, AdbInputBackend
+
+# Backends that drive the one real cursor - two instances using them would fight over it
+GLOBAL_CURSOR_BACKENDS = ('auto', 'sendinput', 'xtest', 'pyautogui')
+
+class VisionService:
+    """
+    Process-wide AI analysis and Town Hall detection shared by every instance
+
+    Each AutoAttacker gets this object as both its ai_analyzer and its
+    townhall_detector. Sharing one analyzer gives all instances a single API
+    rate limit and quota; a semaphore caps concurrent AI calls, and detector
+    calls (whose template cache isn't thread-safe) are serialized unless the
+    detector is a thread-safe VisionPool.
+    """
+
+    def __init__(self, ai_analyzer=None, townhall_detector=None, max_concurrent_ai: int = 2):
+        self.ai_analyzer = ai_analyzer
+        self.townhall_detector = townhall_detector
+        self._ai_slots = threading.Semaphore(max(1, max_concurrent_ai))
+        self._detector_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'ai_calls': 0, 'ai_wait': 0.0, 'detector_calls': 0, 'detector_wait': 0.0}
+
+    def analyze_base(self, *args, **kwargs) -> Dict:
+        """AIAnalyzer.analyze_base, limited to max_concurrent_ai calls at a time"""
+        queued = time.perf_counter()
+        with self._ai_slots:
+            self._count('ai', time.perf_counter() - queued)
+            return self.ai_analyzer.analyze_base(*args, **kwargs)
+
+    def get_usage_stats(self) -> Dict:
+        """The shared analyzer's API usage"""
+        return self.ai_analyzer.get_usage_stats() if self.ai_analyzer else {}
+
+    def is_available(self) -> bool:
+        """Whether local Town Hall detection can be used"""
+        return bool(self.townhall_detector and self.townhall_detector.is_available())
+
+    def detect_file(self, image_path: str) -> Optional[Dict]:
+        """TownHallDetector.detect_file, one call at a time"""
+        queued = time.perf_counter()
+        thread_safe = getattr(self.townhall_detector, 'thread_safe', False)
+        with contextlib.nullcontext() if thread_safe else self._detector_lock:
+            self._count('detector', time.perf_counter() - queued)
+            return self.townhall_detector.detect_file(image_path)
+
+    def _count(self, kind: str, waited: float) -> None:
+        with self._stats_lock:
+            self.stats[f'{kind}_calls'] += 1
+            self.stats[f'{kind}_wait'] += waited
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        for kind in ('ai', 'detector'):
+            calls = stats[f'{kind}_calls']
+            stats[f'{kind}_mean_wait_ms'] = stats.pop(f'{kind}_wait') / calls * 1000 if calls else 0.0
+        return stats
+
+class InstanceLogger:
+    """Prefixes every message with the instance name so interleaved logs stay readable"""
+
+    def __init__(self, logger, name: str):
+        self.logger = logger
+        self.prefix = f"[{name}] "
+
+    def debug(self, message: str) -> None:
+        self.logger.debug(self.prefix + message)
+
+    def info(self, message: str) -> None:
+        self.logger.info(self.prefix + message)
+
+    def warning(self, message: str) -> None:
+        self.logger.warning(self.prefix + message)
+
+    def error(self, message: str) -> None:
+        self.logger.error(self.prefix + message)
+
+    def critical(self, message: str) -> None:
+        self.logger.critical(self.prefix + message)
+
+class InstanceWorker:
+    """One emulator instance with its own capture region, coordinates, input backend and auto attacker"""
+
+    def __init__(self, name: str, screen_capture, coordinate_mapper: CoordinateMapper,
+                 input_backend: InputBackend, attack_player: AttackPlayer, auto_attacker: AutoAttacker):
+        self.name = name
+        self.screen_capture = screen_capture
+        self.coordinate_mapper = coordinate_mapper
+        self.input_backend = input_backend
+        self.attack_player = attack_player
+        self.auto_attacker = auto_attacker
+
+    @property
+    def is_running(self) -> bool:
+        return self.auto_attacker.is_running
+
+    def start(self) -> bool:
+        self.auto_attacker.start_auto_attack()
+        return self.auto_attacker.is_running
+
+    def stop(self) -> None:
+        self.auto_attacker.stop_auto_attack()
+
+    def get_status(self) -> Dict:
+        stats = self.auto_attacker.get_stats()
+        stats.update({
+            'name': self.name,
+            'window': self.screen_capture.game_window_bounds,
+            'input_backend': self.input_backend.name,
+            'mapped_buttons': len(self.coordinate_mapper.get_coordinates())
+        })
+        return stats
+
+class Orchestrator:
+    """Runs one InstanceWorker per configured emulator instance, all sharing one VisionService"""
+
+    def __init__(self, config, logger, vision: VisionService, hotkey_service: Optional[HotkeyService] = None,
+                 attack_recorder: Optional[AttackRecorder] = None):
+        self.config = config
+        self.logger = logger
+        self.vision = vision
+        self.hotkeys = hotkey_service
+        self.attack_recorder = attack_recorder  # Shared by every instance's player to find recordings
+        self.workers: Dict[str, InstanceWorker] = {}
+
+    def add_worker(self, worker: InstanceWorker) -> None:
+        if worker.name in self.workers:
+            raise ValueError(f"Instance '{worker.name}' already exists")
+        self.workers[worker.name] = worker
+
+    def create_worker(self, spec: Dict) -> Optional[InstanceWorker]:
+        """
+        Build a worker for one real emulator window
+
+        Args:
+            spec: Instance settings - 'name', then either 'adb_serial' (capture and input over ADB)
+                or 'window_title' and/or 'window' [x, y, w, h]; optional 'coordinates' file,
+                'input_backend' and 'attack_sessions'
+        """
+        from .screen_capture import ScreenCapture
+
+        name = spec['name']
+        device = None
+        if spec.get('adb_serial'):
+            device = AdbDevice(spec['adb_serial'], host=self.config.get('adb.host', '127.0.0.1'),
+                               port=self.config.get('adb.port', DEFAULT_PORT))
+        capture = ScreenCapture(window_title=spec.get('window_title'), window_bounds=spec.get('window'),
+                                screenshot_dir=os.path.join("screenshots", name), device=device)
+        if not capture.find_game_window():
+            self.logger.error(f"Instance {name}: window not found")
+            return None
+
+        if device:
+            backend = AdbInputBackend(device, gestures=self.config.get('adb.gestures', 'swipe'))
+        else:
+            backend_name = spec.get('input_backend', 'window')
+            if backend_name == 'window' and not capture.game_window_handle:
+                self.logger.error(f"Instance {name}: the window backend needs 'window_title' to find the window")
+                return None
+            backend = create_input_backend(backend_name, window_handle=capture.game_window_handle)
+
+        mapper = CoordinateMapper(hotkey_service=self.hotkeys, coordinates_file=spec.get(
+            'coordinates', os.path.join("coordinates", f"{name}.json")))
+        if not mapper.get_coordinates():
+            self.logger.warning(f"Instance {name}: no buttons mapped in {mapper.coordinates_file}")
+
+        player = AttackPlayer(screen_capture=capture, input_backend=backend, hotkey_service=self.hotkeys,
+                              attack_recorder=self.attack_recorder)
+        return self.build_worker(name, capture, mapper, backend, player, spec.get('attack_sessions'))
+
+    def build_worker(self, name: str, screen_capture, coordinate_mapper: CoordinateMapper,
+                     input_backend: InputBackend, attack_player: AttackPlayer,
+                     attack_sessions: Optional[List[str]] = None) -> InstanceWorker:
+        """Wire an auto attacker to the instance's components and the shared vision service"""
+        attacker = AutoAttacker(
+            attack_player=attack_player,
+            screen_capture=screen_capture,
+            coordinate_mapper=coordinate_mapper,
+            logger=InstanceLogger(self.logger, name),
+            ai_analyzer=self.vision,
+            config=self.config,
+            townhall_detector=self.vision if self.vision.townhall_detector else None,
+            input_backend=input_backend,
+            hotkey_service=self.hotkeys
+        )
+        if attack_sessions:
+            attacker.attack_sessions = list(attack_sessions)
+        return InstanceWorker(name, screen_capture, coordinate_mapper, input_backend, attack_player, attacker)
+
+    def load_instances(self) -> int:
+        """Create workers for every instance in config 'orchestrator.instances'; returns how many were added"""
+        specs = self.config.get('orchestrator.instances', [])
+        cursor_users = [spec['name'] for spec in specs if not spec.get('adb_serial')
+                        and spec.get('input_backend', 'window') in GLOBAL_CURSOR_BACKENDS]
+        if len(cursor_users) > 1:
+            self.logger.warning(f"Instances {', '.join(cursor_users)} all use the real mouse and will "
+                                f"interfere - use the 'window' input backend for concurrent instances")
+
+        added = 0
+        for spec in specs:
+            if spec.get('name') in self.workers:
+                continue
+            try:
+                worker = self.create_worker(spec)
+            except Exception as e:
+                self.logger.error(f"Instance {spec.get('name')}: {e}")
+                continue
+            if worker:
+                self.add_worker(worker)
+                added += 1
+        return added
+
+    def start_all(self, stagger: Optional[float] = None) -> int:
+        """Start every idle worker, a few seconds apart so AI calls don't arrive in bursts"""
+        stagger = self.config.get('orchestrator.start_stagger_seconds', 5) if stagger is None else stagger
+        started = 0
+        for worker in self.workers.values():
+            if worker.is_running:
+                continue
+            if started and stagger:
+                time.sleep(stagger)
+            if worker.start():
+                started += 1
+        self.logger.info(f"Orchestrator started {started} instance(s)")
+        return started
+
+    def stop_all(self) -> None:
+        """Signal every worker, then wait for them"""
+        workers = [worker for worker in self.workers.values() if worker.is_running]
+        threads = [threading.Thread(target=worker.stop) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if workers:
+            self.logger.info(f"Orchestrator stopped {len(workers)} instance(s)")
+
+    @property
+    def is_running(self) -> bool:
+        return any(worker.is_running for worker in self.workers.values())
+
+    def get_status(self) -> List[Dict]:
+        return [worker.get_status() for worker in self.workers.values()]
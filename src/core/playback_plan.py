@@ -0,0 +1,177 @@
+"""
+Playback Plan - Recordings compiled into flat arrays ready for the playback thread
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .input_backend import InputCommand
+from .recording_format import DEFAULT_TYPE_NAMES, retarget_actions, sort_by_time
+
+# Opcodes match the fixed type codes of the recording format
+OP_CLICK, OP_MOVE, OP_DELAY, OP_DRAG, OP_HOLD = range(len(DEFAULT_TYPE_NAMES))
+OP_UNKNOWN = 255
+
+# Durations used when an action doesn't carry its own (seconds at 1x)
+DEFAULT_DURATIONS = {OP_DELAY: 1.0, OP_HOLD: 0.5, OP_DRAG: 0.5}
+
+class PlaybackPlan:
+    """
+    A recording compiled for one playback speed and game window
+
+    Everything the playback thread needs is precomputed into parallel lists:
+    absolute deadlines (seconds after playback starts, delay markers and
+    speed already applied), mapped coordinates, scaled durations, the input
+    commands for each tap and timed points for each drag.
+    """
+
+    def __init__(self, session_name: str, header: Dict, speed: float, window: Optional[Tuple[int, int, int, int]],
+                 ops: List[int], deadlines: List[float], xs: List[int], ys: List[int], durations: List[float],
+                 type_names: List[str], taps: List[Optional[List[InputCommand]]],
+                 paths: List[Optional[List[Tuple[int, int, float]]]], single_taps: List[bool]):
+        self.session_name = session_name
+        self.header = header
+        self.speed = speed
+        self.window = window
+        self.ops = ops
+        self.deadlines = deadlines
+        self.xs = xs
+        self.ys = ys
+        self.durations = durations
+        self.type_names = type_names
+        self.taps = taps
+        self.paths = paths
+        self.single_taps = single_taps
+        self.end_time = max((deadline + (duration if op != OP_DELAY else 0.0)
+                             for op, deadline, duration in zip(ops, deadlines, durations)), default=0.0)
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    @property
+    def duration(self) -> float:
+        """Recorded duration (at 1x)"""
+        return self.header.get('duration', 0)
+
+def compile_plan(session_name: str, header: Dict, actions: np.ndarray, paths: np.ndarray,
+                 speed: float = 1.0, window: Optional[Sequence[int]] = None) -> PlaybackPlan:
+    """
+    Compile a recording's arrays into a PlaybackPlan
+
+    Args:
+        session_name: Name shown while playing
+        header: Recording header (window, extras, type_names, duration)
+        actions: Structured action array from the recording file
+        paths: Drag path points from the recording file
+        speed: Playback speed multiplier
+        window: Current game window bounds, to map the recording onto
+    """
+    type_names = header.get('type_names', DEFAULT_TYPE_NAMES)
+    recorded_window = header.get('window')
+    if recorded_window and window and tuple(recorded_window) != tuple(window):
+        actions, paths = retarget_actions(actions, paths, type_names, recorded_window, window)
+
+    # Recordings saved before actions were sorted on save can hold gestures out of order
+    actions, extras = sort_by_time(actions, header.get('extras', {}))
+
+    op_table = np.array([DEFAULT_TYPE_NAMES.index(name) if name in DEFAULT_TYPE_NAMES else OP_UNKNOWN
+                         for name in type_names], dtype=np.uint8)
+    ops = op_table[actions['type']] if len(actions) else np.zeros(0, dtype=np.uint8)
+
+    durations = actions['duration'].astype(np.float64)
+    for op, default in DEFAULT_DURATIONS.items():
+        durations[(ops == op) & np.isnan(durations)] = default
+    durations = np.nan_to_num(durations) / speed
+
+    # Delay markers pause on top of the recorded timeline, pushing back everything after them
+    delay_time = np.where(ops == OP_DELAY, durations, 0.0)
+    deadlines = actions['t'] / speed + np.cumsum(delay_time) - delay_time
+
+    ops_list = ops.tolist()
+    deadline_list = deadlines.tolist()
+    xs, ys = actions['x'].tolist(), actions['y'].tolist()
+    taps, timed_paths, single_taps = [], [], []
+
+    for i, op in enumerate(ops_list):
+        tap, path, single = None, None, False
+        x, y = xs[i], ys[i]
+
+        if op == OP_CLICK:
+            extra = extras.get(str(i), {})
+            repeat = int(extra.get('repeat', 1))
+            tap = [InputCommand('move', x, y), InputCommand('down', x, y), InputCommand('up', x, y)]
+            single = repeat == 1
+            if repeat > 1:
+                # Merged taps: spread the repeats over their interval as timed points
+                interval = extra.get('interval', 0.0) / speed
+                path = [(x, y, deadline_list[i] + k * interval) for k in range(repeat)]
+
+        elif op == OP_DRAG:
+            start, length = int(actions['path_start'][i]), int(actions['path_len'][i])
+            if length:
+                points = paths[start:start + length]
+                path = list(zip(points[:, 0].astype(int).tolist(), points[:, 1].astype(int).tolist(),
+                                (deadline_list[i] + points[:, 2] / speed).tolist()))
+            else:
+                # No recorded path - glide in a straight line
+                start_x, start_y = int(actions['start_x'][i]), int(actions['start_y'][i])
+                steps = 10
+                path = [(start_x + (x - start_x) * k // steps, start_y + (y - start_y) * k // steps,
+                         deadline_list[i] + durations[i] * k / steps) for k in range(steps + 1)]
+
+        taps.append(tap)
+        timed_paths.append(path)
+        single_taps.append(single)
+
+    return PlaybackPlan(session_name, header, speed, tuple(window) if window else None, ops_list, deadline_list,
+                        xs, ys, durations.tolist(), type_names, taps, timed_paths, single_taps)
+
+class PlanCache:
+    """Compiled plans keyed by file, speed and window; a changed file mtime invalidates its plans"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filepath: str, speed: float, window: Optional[Sequence[int]],
+            compile_func: Callable[[], Optional[PlaybackPlan]]) -> Optional[PlaybackPlan]:
+        """Return the cached plan, or compile, cache and return a new one"""
+        mtime = os.stat(filepath).st_mtime_ns
+        key = (filepath, speed, tuple(window) if window else None)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == mtime:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        plan = compile_func()
+        if plan is None:
+            return None
+
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = (mtime, plan)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return plan
+
+    def invalidate(self, filepath: Optional[str] = None) -> None:
+        """Drop the plans for one file, or everything"""
+        with self.lock:
+            for key in list(self.entries):
+                if filepath is None or key[0] == filepath:
+                    del self.entries[key]
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,127 @@
+"""
+Playback Scheduler - Runs actions against absolute deadlines instead of chained sleeps
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional
+
+class DeadlineScheduler:
+    """
+    Waits for deadlines measured from a fixed origin on time.perf_counter()
+
+    Because every deadline is absolute, time spent executing one action never
+    pushes back the next one. Waiting sleeps until spin_threshold before the
+    deadline and busy-waits the rest, trading a little CPU for sub-millisecond
+    accuracy.
+    """
+
+    def __init__(self, spin_threshold: float = 0.002, wake_margin: float = 0.02):
+        self.spin_threshold = spin_threshold
+        self.wake_margin = wake_margin
+        self.origin = None
+        self.lateness = []
+        self._paused_at = None
+        self._cancelled = False
+        self._wake = threading.Event()
+
+    def start(self, origin: Optional[float] = None) -> None:
+        """Set deadline zero (defaults to now) and clear the stats"""
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.lateness = []
+        self._paused_at = None
+        self._cancelled = False
+        self._wake.clear()
+
+    def now(self) -> float:
+        """Seconds elapsed on the schedule"""
+        return time.perf_counter() - self.origin
+
+    def wait_until(self, deadline: float, record: bool = True) -> float:
+        """
+        Block until the deadline (seconds after the origin)
+
+        Long waits sleep on an event so pause() and cancel() from another
+        thread take effect right away; the last wake_margin is slept with
+        time.sleep, whose timer is finer than an event wait on Windows.
+
+        Args:
+            deadline: Target time relative to the origin
+            record: Count this wait in the lateness stats
+
+        Returns:
+            How late the deadline was reached, in seconds (0 if on time or cancelled)
+        """
+        while True:
+            if self._cancelled:
+                return 0.0
+            if self._paused_at is not None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            target = self.origin + deadline
+            remaining = target - time.perf_counter()
+            if remaining > self.spin_threshold + self.wake_margin:
+                if self._wake.wait(remaining - self.spin_threshold - self.wake_margin):
+                    self._wake.clear()
+                continue  # Re-check: paused, cancelled, or close enough to finish below
+            break
+
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+        while time.perf_counter() < target:
+            pass
+
+        late = max(0.0, time.perf_counter() - target)
+        if record:
+            self.lateness.append(late)
+        return late
+
+    def record(self, deadline: float) -> float:
+        """Count a deadline that was served without waiting (e.g. as part of a batch)"""
+        late = max(0.0, self.now() - deadline)
+        self.lateness.append(late)
+        return late
+
+    def pause(self) -> None:
+        """Stop the clock (e.g. while playback is paused); a waiting thread blocks until resume()"""
+        if self._paused_at is None:
+            self._paused_at = time.perf_counter()
+            self._wake.set()
+
+    def resume(self) -> None:
+        """Restart the clock, pushing every remaining deadline back by the paused time"""
+        if self._paused_at is not None:
+            self.origin += time.perf_counter() - self._paused_at
+            self._paused_at = None
+            self._wake.set()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused_at is not None
+
+    def cancel(self) -> None:
+        """Make the current and every later wait return immediately, until the next start()"""
+        self._cancelled = True
+        self._wake.set()
+
+    def get_stats(self) -> Dict:
+        """Lateness summary in milliseconds"""
+        return summarize_lateness(self.lateness)
+
+def summarize_lateness(lateness: List[float], late_threshold: float = 0.005) -> Dict:
+    """Summarize per-action lateness (seconds) as count/mean/p50/p95/max in ms"""
+    if not lateness:
+        return {'count': 0, 'late': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+    ordered = sorted(lateness)
+    count = len(ordered)
+    return {
+        'count': count,
+        'late': sum(1 for value in ordered if value > late_threshold),
+        'mean_ms': sum(ordered) / count * 1000,
+        'p50_ms': ordered[count // 2] * 1000,
+        'p95_ms': ordered[min(count - 1, int(count * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
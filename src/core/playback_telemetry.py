@@ -0,0 +1,145 @@
+"""
+Playback Telemetry - Per-action playback events kept in memory instead of printed
+"""
+
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ('index', 'i4'),
+    ('scheduled', 'f8'),   # deadline, seconds after playback start
+    ('actual', 'f8'),      # when the action was sent
+    ('op', 'u1'),
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('status', 'u1'),
+])
+
+STATUS_NAMES = ['ok', 'batched', 'skipped', 'error', 'confirmed', 'retried', 'unconfirmed', 'empty', 'no_time']
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+class PlaybackRun:
+    """
+    Events of one playback in a fixed-size ring buffer
+
+    Only the playback thread writes, and it publishes each event by bumping
+    `count` after the row is filled, so readers never need a lock: they read
+    `count` first and then copy rows that are already complete. When more
+    events arrive than fit, the oldest are overwritten.
+    """
+
+    def __init__(self, session_name: str, total_actions: int, speed: float, capacity: int = 4096):
+        self.session_name = session_name
+        self.total_actions = total_actions
+        self.speed = speed
+        self.started = datetime.now().isoformat()
+        self.capacity = capacity
+        self.events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.count = 0
+        self.last_index = -1
+        self.finished = False
+        self.outcome = None
+        self.timing = None
+        self.verification = None
+
+    def record(self, index: int, scheduled: float, actual: float, op: int, x: int, y: int,
+               status: str = 'ok') -> None:
+        """Append one event (playback thread only)"""
+        self.events[self.count % self.capacity] = (index, scheduled, actual, op, x, y, STATUS_CODES[status])
+        self.last_index = index
+        self.count += 1
+
+    def get_events(self) -> np.ndarray:
+        """Copy of the retained events, oldest first"""
+        count = self.count
+        if count <= self.capacity:
+            return self.events[:count].copy()
+        start = count % self.capacity
+        return np.concatenate([self.events[start:], self.events[:start]])
+
+    @property
+    def progress(self) -> float:
+        """Fraction of actions played so far"""
+        return (self.last_index + 1) / self.total_actions if self.total_actions else 1.0
+
+    def summary(self) -> Dict:
+        """Plain-dict overview of the run"""
+        events = self.get_events()
+        statuses = {}
+        for code in events['status'].tolist():
+            statuses[STATUS_NAMES[code]] = statuses.get(STATUS_NAMES[code], 0) + 1
+        lateness = (events['actual'] - events['scheduled']) * 1000 if len(events) else np.zeros(0)
+        return {
+            'session_name': self.session_name,
+            'started': self.started,
+            'speed': self.speed,
+            'actions_played': self.last_index + 1,
+            'total_actions': self.total_actions,
+            'outcome': self.outcome or ('running' if not self.finished else 'completed'),
+            'statuses': statuses,
+            'max_lateness_ms': float(lateness.max()) if len(lateness) else 0.0,
+            'timing': self.timing,
+            'verification': self.verification
+        }
+
+class PlaybackTelemetry:
+    """Holds the current playback run and the last few finished ones"""
+
+    def __init__(self, capacity: int = 4096, history: int = 10):
+        self.capacity = capacity
+        self.current = None
+        self.history = deque(maxlen=history)
+
+    def begin(self, session_name: str, total_actions: int, speed: float) -> PlaybackRun:
+        self.current = PlaybackRun(session_name, total_actions, speed, self.capacity)
+        return self.current
+
+    def end(self, run: PlaybackRun, outcome: str, timing: Optional[Dict] = None,
+            verification: Optional[Dict] = None) -> None:
+        run.outcome = outcome
+        run.timing = timing
+        run.verification = verification
+        run.finished = True
+        self.history.append(run)
+
+    def get_runs(self) -> List[PlaybackRun]:
+        """Finished runs, most recent last"""
+        return list(self.history)
+
+    def last_run(self) -> Optional[PlaybackRun]:
+        return self.history[-1] if self.history else None
+
+class ProgressReporter:
+    """Renders progress of the current run a few times a second, off the playback thread"""
+
+    def __init__(self, run: PlaybackRun, interval: float = 0.5):
+        self.run = run
+        self.interval = interval
+        self.thread = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._report_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _report_loop(self) -> None:
+        run = self.run
+        while not run.finished:
+            self._render()
+            time.sleep(self.interval)
+        self._render()
+        print()
+
+    def _render(self) -> None:
+        run = self.run
+        played = run.last_index + 1
+        print(f"\rProgress: {run.progress * 100:.1f}% ({played}/{run.total_actions})", end='', flush=True)
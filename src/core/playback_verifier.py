@@ -0,0 +1,173 @@
+"""
+Playback Verifier - Cheap on-screen checks that troop selection and deployment registered
+"""
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Grabs a screen region (x, y, width, height) as an RGB array
+RegionGrabber = Callable[[Tuple[int, int, int, int]], np.ndarray]
+
+class PlaybackVerifier:
+    """
+    Verifies key taps during playback by probing small regions of the screen
+
+    Taps in the troop bar (the bottom strip of the game window) are troop
+    selections: the slot is probed before the tap - a greyed-out slot is
+    empty, so the deploy taps, holds and drags that follow are skipped until
+    the next selection - and watched after it for the highlight; a selection that
+    doesn't register is tapped again. Deploy taps are never repeated, since
+    a retry could place an extra troop.
+
+    Every check is bounded by a latency budget, further capped by the time
+    left before the next scheduled action, so verification never pushes
+    playback off its schedule.
+    """
+
+    def __init__(self, grab_region: RegionGrabber, troop_bar_fraction: float = 0.15, roi_size: int = 24,
+                 change_threshold: float = 12.0, empty_saturation: float = 20.0, budget: float = 0.04,
+                 poll_interval: float = 0.008, max_retries: int = 1):
+        """
+        Args:
+            grab_region: Function returning an RGB array for a screen region
+            troop_bar_fraction: Height of the troop bar as a fraction of the window height
+            roi_size: Side of the square probed around a tap, in pixels
+            change_threshold: Mean absolute pixel change that counts as the tap registering
+            empty_saturation: Mean saturation below which a troop slot counts as empty (greyed out)
+            budget: Maximum seconds spent verifying one tap
+            poll_interval: Seconds between probes while waiting for a change
+            max_retries: How many times an unregistered troop selection is tapped again
+        """
+        self.grab_region = grab_region
+        self.troop_bar_fraction = troop_bar_fraction
+        self.roi_size = roi_size
+        self.change_threshold = change_threshold
+        self.empty_saturation = empty_saturation
+        self.budget = budget
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+
+        self.window = None
+        self.slot_empty = False
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {
+            'selections': 0,
+            'confirmed': 0,
+            'retried': 0,
+            'unconfirmed': 0,
+            'empty_slots': 0,
+            'deploys_skipped': 0,
+            'skipped_no_time': 0,
+            'check_time': 0.0
+        }
+
+    def begin(self, window: Tuple[int, int, int, int]) -> None:
+        """Start verifying a playback inside this game window"""
+        self.window = tuple(window)
+        self.slot_empty = False
+        self.reset_stats()
+
+    def is_troop_slot(self, x: int, y: int) -> bool:
+        """Whether a tap lands in the troop bar"""
+        if not self.window:
+            return False
+        window_x, window_y, width, height = self.window
+        return (window_x <= x < window_x + width and
+                window_y + height * (1 - self.troop_bar_fraction) <= y < window_y + height)
+
+    def should_skip(self, x: int, y: int) -> bool:
+        """Deploy taps are skipped while the selected troop slot is empty"""
+        if self.slot_empty and not self.is_troop_slot(x, y):
+            self.stats['deploys_skipped'] += 1
+            return True
+        return False
+
+    def verify_tap(self, x: int, y: int, send_tap: Callable[[], None], time_available: float) -> str:
+        """
+        Send a tap and, for troop selections, verify it registered
+
+        Args:
+            x, y: Tap position
+            send_tap: Sends the tap (called again for a retry)
+            time_available: Seconds until the next scheduled action
+
+        Returns:
+            'sent' (not a selection, or the screen couldn't be read), 'confirmed', 'retried', 'unconfirmed',
+            'empty' (slot greyed out) or 'no_time' (sent unverified)
+        """
+        if not self.is_troop_slot(x, y):
+            send_tap()
+            return 'sent'
+
+        budget = min(self.budget, time_available)
+        if budget < self.poll_interval * 2:
+            send_tap()
+            self.stats['skipped_no_time'] += 1
+            return 'no_time'
+
+        started = time.perf_counter()
+        region = self._roi(x, y)
+        before = self._grab(region)
+        if before is None:
+            send_tap()
+            return 'sent'
+        self.stats['selections'] += 1
+
+        self.slot_empty = self._saturation(before) < self.empty_saturation
+        if self.slot_empty:
+            self.stats['empty_slots'] += 1
+            self.stats['check_time'] += time.perf_counter() - started
+            return 'empty'
+
+        result = 'unconfirmed'
+        attempt_deadline = started + budget
+        for attempt in range(self.max_retries + 1):
+            send_tap()
+            if self._wait_for_change(region, before, attempt_deadline):
+                result = 'confirmed' if attempt == 0 else 'retried'
+                break
+            # A retry gets a fresh budget, still bounded by the next action
+            remaining = time_available - (time.perf_counter() - started)
+            if remaining < self.poll_interval * 2:
+                break
+            attempt_deadline = time.perf_counter() + min(self.budget, remaining)
+
+        self.stats[result] += 1
+        self.stats['check_time'] += time.perf_counter() - started
+        return result
+
+    def _wait_for_change(self, region: Tuple[int, int, int, int], before: np.ndarray, deadline: float) -> bool:
+        """Probe the region until it changes or the deadline passes"""
+        while True:
+            time.sleep(self.poll_interval)
+            after = self._grab(region)
+            if after is not None and after.shape == before.shape and \
+                    np.abs(after.astype(np.int16) - before).mean() >= self.change_threshold:
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+
+    def _roi(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        half = self.roi_size // 2
+        return (x - half, y - half, self.roi_size, self.roi_size)
+
+    def _grab(self, region: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+        try:
+            return np.asarray(self.grab_region(region))[..., :3].astype(np.int16)
+        except Exception:
+            return None
+
+    def _saturation(self, pixels: np.ndarray) -> float:
+        """Mean per-pixel channel spread - near zero for grey"""
+        return float((pixels.max(axis=-1) - pixels.min(axis=-1)).mean())
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        checks = stats['selections']
+        stats['mean_check_ms'] = stats['check_time'] / checks * 1000 if checks else 0.0
+        return stats
@@ -0,0 +1,146 @@
+"""
+Rate Limiter - Client-side request throttling and quota accounting for Gemini calls
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+class TokenBucket:
+    """Thread-safe token bucket limiting request starts per minute"""
+
+    def __init__(self, requests_per_minute: float = 15, burst: int = 3):
+        self.rate = max(requests_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+        self.waits = 0
+        self.total_wait_time = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add tokens for the time elapsed since the last update"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = 0) -> bool:
+        """Block until a token is available or the timeout expires"""
+        deadline = time.monotonic() + timeout
+        waited = False
+        start = time.monotonic()
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    if waited:
+                        self.waits += 1
+                        self.total_wait_time += now - start
+                    return True
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+
+            if now + wait > deadline:
+                return False
+            waited = True
+            time.sleep(wait)
+
+    def penalize(self, cooldown: float) -> None:
+        """Empty the bucket and block new requests after the server rate-limited us"""
+        with self.lock:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + cooldown)
+
+    def get_stats(self) -> Dict:
+        """Current bucket state"""
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                'requests_per_minute': self.rate * 60,
+                'available': round(self.tokens, 2),
+                'blocked_for': max(0.0, self.blocked_until - time.monotonic()),
+                'waits': self.waits,
+                'total_wait_time': self.total_wait_time
+            }
+
+class QuotaTracker:
+    """Rolling hourly/daily call and token budgets (0 means unlimited)"""
+
+    HOUR = 3600
+    DAY = 86400
+
+    def __init__(self, calls_per_hour: int = 0, calls_per_day: int = 0,
+                 tokens_per_hour: int = 0, tokens_per_day: int = 0):
+        self.limits = {
+            'calls_per_hour': calls_per_hour,
+            'calls_per_day': calls_per_day,
+            'tokens_per_hour': tokens_per_hour,
+            'tokens_per_day': tokens_per_day
+        }
+        self.history = deque()  # (timestamp, tokens) per call within the last day
+        self.lock = threading.Lock()
+
+        self.total_calls = 0
+        self.total_tokens = 0
+
+    def record(self, tokens: int = 0, timestamp: Optional[float] = None) -> None:
+        """Record one API call and the tokens it used"""
+        with self.lock:
+            self.history.append((timestamp or time.time(), tokens))
+            self.total_calls += 1
+            self.total_tokens += tokens
+
+    def _usage(self, now: float) -> Dict[str, int]:
+        """Usage inside each rolling window (caller holds the lock)"""
+        while self.history and now - self.history[0][0] > self.DAY:
+            self.history.popleft()
+
+        calls_hour = tokens_hour = 0
+        for timestamp, tokens in reversed(self.history):
+            if now - timestamp > self.HOUR:
+                break
+            calls_hour += 1
+            tokens_hour += tokens
+
+        return {
+            'calls_per_hour': calls_hour,
+            'calls_per_day': len(self.history),
+            'tokens_per_hour': tokens_hour,
+            'tokens_per_day': sum(tokens for _, tokens in self.history)
+        }
+
+    def pressure(self) -> float:
+        """Fraction of the tightest budget already used (0.0 - 1.0+)"""
+        with self.lock:
+            usage = self._usage(time.time())
+        fractions = [usage[key] / limit for key, limit in self.limits.items() if limit > 0]
+        return max(fractions) if fractions else 0.0
+
+    def has_budget(self) -> bool:
+        """True while every budget has room for another call"""
+        return self.pressure() < 1.0
+
+    def get_stats(self) -> Dict:
+        """Usage per window alongside the configured limits"""
+        with self.lock:
+            usage = self._usage(time.time())
+        stats = {key: {'used': usage[key], 'limit': limit} for key, limit in self.limits.items()}
+        fractions = [usage[key] / limit for key, limit in self.limits.items() if limit > 0]
+        stats['pressure'] = max(fractions) if fractions else 0.0
+        stats['total_calls'] = self.total_calls
+        stats['total_tokens'] = self.total_tokens
+        return stats
@@ -0,0 +1,171 @@
+"""
+Recording Catalog - Index of recorded sessions for fast listing and info queries
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from .recording_format import RECORDING_EXT, LEGACY_EXT, read_header, convert_json_recording
+
+class RecordingCatalog:
+    """JSON index of every recording's summary, kept in sync with the recordings folder"""
+
+    INDEX_VERSION = 1
+
+    def __init__(self, recordings_dir: str, index_name: str = "catalog.json"):
+        self.recordings_dir = recordings_dir
+        self.index_path = os.path.join(recordings_dir, index_name)
+        self.entries = {}
+        self.lock = threading.RLock()
+        self._dir_mtime = None
+
+        self._load()
+
+    def list_sessions(self) -> List[str]:
+        """Sorted session names"""
+        with self.lock:
+            self._refresh()
+            return sorted(self.entries)
+
+    def get(self, session_name: str) -> Optional[Dict]:
+        """Catalog entry for a session, or None if it doesn't exist"""
+        with self.lock:
+            self._refresh()
+            entry = self.entries.get(session_name)
+            return dict(entry) if entry else None
+
+    def update(self, session_name: str, filepath: str) -> Optional[Dict]:
+        """Index (or re-index) one recording and persist the catalog"""
+        with self.lock:
+            entry = self._build_entry(session_name, filepath)
+            if entry:
+                self.entries[session_name] = entry
+                self._save()
+            return entry
+
+    def remove(self, session_name: str) -> None:
+        """Drop a session from the catalog"""
+        with self.lock:
+            if self.entries.pop(session_name, None) is not None:
+                self._save()
+
+    def rebuild(self) -> int:
+        """Re-index every recording from scratch"""
+        with self.lock:
+            self.entries = {}
+            self._sync()
+            return len(self.entries)
+
+    def _load(self) -> None:
+        """Load the index file, rebuilding it if missing or unreadable"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.INDEX_VERSION:
+                raise ValueError("catalog version mismatch")
+            self.entries = data.get('entries', {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            print(f"Recording catalog unreadable ({e}) - rebuilding")
+            self.entries = {}
+        self._sync()
+
+    def _refresh(self) -> None:
+        """Re-sync only if something in the folder changed since we last looked"""
+        try:
+            dir_mtime = os.stat(self.recordings_dir).st_mtime_ns
+        except FileNotFoundError:
+            self.entries = {}
+            return
+        if dir_mtime != self._dir_mtime:
+            self._sync()
+
+    def _sync(self) -> None:
+        """Bring entries in line with the files on disk, re-indexing only changed files"""
+        if not os.path.isdir(self.recordings_dir):
+            self.entries = {}
+            return
+
+        changed = False
+        files = os.listdir(self.recordings_dir)
+
+        # Legacy JSON recordings are converted once so everything can be indexed from headers
+        for file in files:
+            if file.endswith(LEGACY_EXT) and file != os.path.basename(self.index_path):
+                npz_name = file[:-len(LEGACY_EXT)] + RECORDING_EXT
+                if npz_name not in files:
+                    try:
+                        convert_json_recording(os.path.join(self.recordings_dir, file))
+                    except Exception as e:
+                        print(f"Error converting legacy recording {file}: {e}")
+        files = os.listdir(self.recordings_dir)
+
+        on_disk = {file[:-len(RECORDING_EXT)] for file in files if file.endswith(RECORDING_EXT)}
+
+        for session_name in list(self.entries):
+            if session_name not in on_disk:
+                del self.entries[session_name]
+                changed = True
+
+        for session_name in on_disk:
+            filepath = os.path.join(self.recordings_dir, session_name + RECORDING_EXT)
+            entry = self.entries.get(session_name)
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                continue
+            if entry and entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size:
+                continue
+
+            entry = self._build_entry(session_name, filepath)
+            if entry:
+                self.entries[session_name] = entry
+                changed = True
+
+        if changed or not os.path.exists(self.index_path):
+            self._save()
+        else:
+            self._dir_mtime = os.stat(self.recordings_dir).st_mtime_ns
+
+    def _build_entry(self, session_name: str, filepath: str) -> Optional[Dict]:
+        """Summarize one recording from its header plus a content hash"""
+        try:
+            header = read_header(filepath)
+            stat = os.stat(filepath)
+            digest = hashlib.sha256()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except Exception as e:
+            print(f"Error indexing recording {session_name}: {e}")
+            return None
+
+        return {
+            'name': header.get('name', session_name),
+            'file': os.path.basename(filepath),
+            'created': header.get('created', 'Unknown'),
+            'duration': header.get('duration', 0),
+            'action_count': header.get('action_count', 0),
+            'action_types': header.get('action_types', {}),
+            'bounds': header.get('bounds'),
+            'window': header.get('window'),
+            'content_hash': digest.hexdigest(),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+
+    def _save(self) -> None:
+        """Write the index atomically and remember the folder state it reflects"""
+        os.makedirs(self.recordings_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.INDEX_VERSION, 'entries': self.entries}, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"Error saving recording catalog: {e}")
+        self._dir_mtime = os.stat(self.recordings_dir).st_mtime_ns
@@ -0,0 +1,323 @@
+"""
+Recording Format - Compact columnar storage for attack recordings
+
+Recordings are stored as .npz archives with three members:
+  header  - small JSON document (name, created, duration, counts, bounds)
+  actions - NumPy structured array, one row per action
+  paths   - float32 (N, 3) array of drag path points referenced by the actions
+
+np.load() only reads a member when it is accessed, so the header can be
+read without loading the actions.
+
+Positions are screen pixels. When the game window was found at record time
+its bounds are kept in the header ('window'), which makes every position
+window-relative: playback maps them onto the current window in one pass.
+"""
+
+import os
+import json
+import numpy as np
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+FORMAT_VERSION = 1
+RECORDING_EXT = '.npz'
+LEGACY_EXT = '.json'
+
+ACTION_DTYPE = np.dtype([
+    ('type', 'u1'),
+    ('t', 'f8'),
+    ('x', 'i4'),
+    ('y', 'i4'),
+    ('duration', 'f4'),    # delay/hold/drag length, NaN if absent
+    ('hold', 'f4'),        # click press length, NaN if absent
+    ('start_x', 'i4'),
+    ('start_y', 'i4'),
+    ('path_start', 'u4'),
+    ('path_len', 'u4'),
+])
+
+# Codes are fixed for known types; unknown types are appended per file
+DEFAULT_TYPE_NAMES = ['click', 'move', 'delay', 'drag', 'hold']
+
+# Keys with a dedicated column - anything else is kept in the header's extras
+_COLUMN_KEYS = {'type', 'timestamp', 'relative_time', 'x', 'y', 'duration', 'hold',
+                'start_x', 'start_y', 'path'}
+
+def encode_actions(actions: List[Dict], type_names: Optional[List[str]] = None, index_offset: int = 0,
+                   path_offset: int = 0) -> Tuple[np.ndarray, np.ndarray, List[str], Dict[str, Dict]]:
+    """
+    Convert action dicts into (actions array, paths array, type names, extras)
+
+    Args:
+        actions: Action dicts in recording order
+        type_names: Type table to extend in place (for encoding in chunks)
+        index_offset: Index of the first action within the whole recording
+        path_offset: Number of path points already encoded before this chunk
+    """
+    type_names = type_names if type_names is not None else list(DEFAULT_TYPE_NAMES)
+    array = np.zeros(len(actions), dtype=ACTION_DTYPE)
+    array['duration'] = np.nan
+    array['hold'] = np.nan
+    paths = []
+    extras = {}
+
+    for i, action in enumerate(actions):
+        action_type = action.get('type', 'unknown')
+        if action_type not in type_names:
+            type_names.append(action_type)
+
+        row = array[i]
+        row['type'] = type_names.index(action_type)
+        row['t'] = action.get('timestamp', action.get('relative_time', 0.0))
+        row['x'] = action.get('x', 0)
+        row['y'] = action.get('y', 0)
+        row['start_x'] = action.get('start_x', action.get('x', 0))
+        row['start_y'] = action.get('start_y', action.get('y', 0))
+        if 'duration' in action:
+            row['duration'] = action['duration']
+        if 'hold' in action:
+            row['hold'] = action['hold']
+
+        path = action.get('path')
+        if path:
+            row['path_start'] = path_offset
+            row['path_len'] = len(path)
+            path_offset += len(path)
+            paths.append(path)
+
+        extra = {key: value for key, value in action.items() if key not in _COLUMN_KEYS}
+        if extra:
+            extras[str(index_offset + i)] = extra
+
+    path_array = (np.asarray([point for path in paths for point in path], dtype=np.float32).reshape(-1, 3)
+                  if paths else np.zeros((0, 3), dtype=np.float32))
+    return array, path_array, type_names, extras
+
+def encode_action_stream(actions: Iterable[Dict], chunk_size: int = 4096
+                         ) -> Tuple[np.ndarray, np.ndarray, List[str], Dict[str, Dict]]:
+    """Encode any iterable of actions a chunk at a time, so only the compact arrays stay in memory"""
+    type_names = list(DEFAULT_TYPE_NAMES)
+    arrays, path_arrays, extras = [], [], {}
+    count = path_count = 0
+    iterator = iter(actions)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        array, paths, _, chunk_extras = encode_actions(chunk, type_names, count, path_count)
+        arrays.append(array)
+        path_arrays.append(paths)
+        extras.update(chunk_extras)
+        count += len(array)
+        path_count += len(paths)
+
+    array = np.concatenate(arrays) if arrays else np.zeros(0, dtype=ACTION_DTYPE)
+    paths = np.concatenate(path_arrays) if path_arrays else np.zeros((0, 3), dtype=np.float32)
+    return array, paths, type_names, extras
+
+def decode_actions(array: np.ndarray, paths: np.ndarray, type_names: List[str],
+                   extras: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """Convert stored arrays back into the action dicts used by playback"""
+    extras = extras or {}
+    actions = []
+
+    for i, row in enumerate(array.tolist()):
+        action_type, t, x, y, duration, hold, start_x, start_y, path_start, path_len = row
+        action = {
+            'type': type_names[action_type],
+            'x': x,
+            'y': y,
+            'timestamp': t,
+            'relative_time': t
+        }
+        if duration == duration:  # not NaN
+            action['duration'] = round(duration, 4)
+        if hold == hold:
+            action['hold'] = round(hold, 4)
+        if action['type'] == 'drag':
+            action['start_x'] = start_x
+            action['start_y'] = start_y
+        if path_len:
+            points = paths[path_start:path_start + path_len].tolist()
+            action['path'] = [[int(px), int(py), round(pt, 4)] for px, py, pt in points]
+        action.update(extras.get(str(i), {}))
+        actions.append(action)
+
+    return actions
+
+def sort_by_time(array: np.ndarray, extras: Dict[str, Dict]) -> Tuple[np.ndarray, Dict[str, Dict]]:
+    """
+    Stable-sort actions by timestamp, re-keying extras to the new indices
+
+    Gestures are stamped at the press but journaled at the release, so an
+    action that happens during a hold or drag is written before it.
+    """
+    if len(array) < 2 or not (np.diff(array['t']) < 0).any():
+        return array, extras
+    order = np.argsort(array['t'], kind='stable')
+    moved = {str(new): extras[str(old)] for new, old in enumerate(order.tolist()) if str(old) in extras}
+    return array[order], moved
+
+def actions_end(array: np.ndarray) -> float:
+    """When the last action finishes - a hold, drag or delay lasts past its timestamp"""
+    if not len(array):
+        return 0.0
+    span = np.fmax(np.nan_to_num(array['duration']), np.nan_to_num(array['hold']))
+    return round(float((array['t'] + span).max()), 3)  # Durations are float32
+
+def compute_bounds(array: np.ndarray, paths: np.ndarray, type_names: List[str]) -> Optional[List[int]]:
+    """Bounding box [min_x, min_y, max_x, max_y] of every positioned action and path point"""
+    positioned = array[array['type'] != type_names.index('delay')] if 'delay' in type_names else array
+    xs = [positioned['x'], positioned['start_x']]
+    ys = [positioned['y'], positioned['start_y']]
+    if len(paths):
+        xs.append(paths[:, 0])
+        ys.append(paths[:, 1])
+
+    all_x = np.concatenate(xs) if xs else np.zeros(0)
+    all_y = np.concatenate(ys) if ys else np.zeros(0)
+    if not len(all_x):
+        return None
+    return [int(all_x.min()), int(all_y.min()), int(all_x.max()), int(all_y.max())]
+
+def window_transform(source_window: Sequence[int], target_window: Sequence[int]
+                     ) -> Tuple[float, float, float, float]:
+    """
+    Affine map between two game windows (x, y, width, height)
+
+    A point is normalized against the window it was recorded in and scaled
+    back out to the target window: target = offset + point * scale.
+
+    Returns:
+        (offset_x, offset_y, scale_x, scale_y)
+    """
+    source_x, source_y, source_width, source_height = source_window
+    target_x, target_y, target_width, target_height = target_window
+    scale_x = target_width / source_width
+    scale_y = target_height / source_height
+    return target_x - source_x * scale_x, target_y - source_y * scale_y, scale_x, scale_y
+
+def retarget_actions(array: np.ndarray, paths: np.ndarray, type_names: List[str],
+                     source_window: Sequence[int], target_window: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Map every position in a recording from the recorded window onto the target window"""
+    offset_x, offset_y, scale_x, scale_y = window_transform(source_window, target_window)
+    array = array.copy()
+    positioned = array['type'] != type_names.index('delay') if 'delay' in type_names else slice(None)
+
+    for column, offset, scale in (('x', offset_x, scale_x), ('start_x', offset_x, scale_x),
+                                  ('y', offset_y, scale_y), ('start_y', offset_y, scale_y)):
+        array[column][positioned] = np.rint(offset + array[column][positioned] * scale)
+
+    paths = paths.copy()
+    if len(paths):
+        paths[:, 0] = np.rint(offset_x + paths[:, 0] * scale_x)
+        paths[:, 1] = np.rint(offset_y + paths[:, 1] * scale_y)
+    return array, paths
+
+def save_recording(filepath: str, recording_data: Dict, actions: Optional[Iterable[Dict]] = None) -> None:
+    """
+    Write a recording dict ({'name', 'created', 'actions', ...}) as .npz
+
+    Args:
+        filepath: Destination .npz path
+        recording_data: Header fields, plus 'actions' unless given separately
+        actions: Optional iterable of actions (e.g. streamed from a journal)
+    """
+    if actions is None:
+        actions = recording_data.get('actions', [])
+    array, paths, type_names, extras = encode_action_stream(actions)
+    array, extras = sort_by_time(array, extras)
+
+    counts = {}
+    for code in array['type'].tolist():
+        counts[type_names[code]] = counts.get(type_names[code], 0) + 1
+
+    header = {key: value for key, value in recording_data.items() if key != 'actions'}
+    header.update({
+        'format_version': FORMAT_VERSION,
+        'duration': max(recording_data.get('duration', 0), actions_end(array)),
+        'action_count': len(array),
+        'action_types': counts,
+        'bounds': compute_bounds(array, paths, type_names),
+        'type_names': type_names,
+        'extras': extras
+    })
+
+    header_bytes = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+
+    # Write to a temp file then swap, so a crash never leaves a half-written recording
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, header=header_bytes, actions=array, paths=paths)
+    os.replace(tmp_path, filepath)
+
+class RecordingFile:
+    """Lazily loaded recording - the header is read on open, actions on first access"""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._npz = np.load(filepath)
+        self.header = json.loads(self._npz['header'].tobytes().decode('utf-8'))
+        self._actions = None
+        self._paths = None
+
+    @property
+    def actions(self) -> np.ndarray:
+        """Structured action array (loaded on first access)"""
+        if self._actions is None:
+            self._actions = self._npz['actions']
+        return self._actions
+
+    @property
+    def paths(self) -> np.ndarray:
+        """Drag path points (loaded on first access)"""
+        if self._paths is None:
+            self._paths = self._npz['paths']
+        return self._paths
+
+    @property
+    def type_names(self) -> List[str]:
+        return self.header.get('type_names', DEFAULT_TYPE_NAMES)
+
+    def to_dict(self) -> Dict:
+        """Materialize the recording in the legacy JSON shape"""
+        data = {key: value for key, value in self.header.items()
+                if key not in ('format_version', 'type_names', 'extras', 'action_count',
+                               'action_types', 'bounds')}
+        data['actions'] = decode_actions(self.actions, self.paths, self.type_names,
+                                         self.header.get('extras'))
+        return data
+
+    def close(self) -> None:
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def read_header(filepath: str) -> Dict:
+    """Read only the header of a .npz recording"""
+    with RecordingFile(filepath) as recording:
+        return recording.header
+
+def load_recording_file(filepath: str) -> Dict:
+    """Load a .npz or legacy .json recording as a dict"""
+    if filepath.endswith(LEGACY_EXT):
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    with RecordingFile(filepath) as recording:
+        return recording.to_dict()
+
+def convert_json_recording(json_path: str) -> str:
+    """Convert a legacy JSON recording to .npz; the JSON is kept as .json.bak"""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    npz_path = json_path[:-len(LEGACY_EXT)] + RECORDING_EXT
+    save_recording(npz_path, data)
+    os.replace(json_path, json_path + '.bak')
+    return npz_path
@@ -0,0 +1,179 @@
+"""
+Recording Journal - Append-only on-disk log of actions while a session is recorded
+"""
+
+import os
+import json
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JOURNAL_EXT = '.jsonl'
+CANCELLED_EXT = '.cancelled'
+CLAIM_EXT = '.recovering'
+
+class RecordingJournal:
+    """
+    Streams actions to a JSON Lines file as they are recorded
+
+    The first line is a header ({'name', 'pid', 'created', ...}); every
+    following line is one action. The writer's pid lets other processes tell
+    a live journal from one left behind by a crash. Writes are buffered and flushed + fsynced at most every
+    flush_interval seconds, so a crash loses at most that much of the session.
+    """
+
+    def __init__(self, journal_dir: str, session_name: str, header: Optional[Dict] = None,
+                 flush_interval: float = 1.0):
+        os.makedirs(journal_dir, exist_ok=True)
+        self.session_name = session_name
+        self.path = os.path.join(journal_dir, f"{session_name}{JOURNAL_EXT}")
+        self.flush_interval = flush_interval
+        self.action_count = 0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(dict(header or {}, name=session_name, pid=os.getpid())) + '\n')
+        self.flush()
+
+    def append(self, action: Dict) -> None:
+        """Write one action; flushes to disk if the flush interval has passed"""
+        self._file.write(json.dumps(action, separators=(',', ':')) + '\n')
+        self.action_count += 1
+        self._dirty = True
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Flush if there are unsaved actions older than the flush interval"""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Push buffered actions all the way to disk"""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def keep_cancelled(self) -> str:
+        """Close and set the journal aside so a cancelled session can still be recovered by hand"""
+        self.close()
+        cancelled_path = self.path + CANCELLED_EXT
+        os.replace(self.path, cancelled_path)
+        return cancelled_path
+
+def read_journal(path: str) -> Tuple[Dict, Iterator[Dict]]:
+    """
+    Open a journal for reading
+
+    Returns:
+        (header, iterator over actions). A truncated or corrupt trailing line -
+        what a crash mid-write leaves behind - ends the iteration quietly.
+    """
+    f = open(path, 'r', encoding='utf-8')
+    try:
+        header = json.loads(f.readline() or '{}')
+    except ValueError:
+        header = {}
+
+    def actions() -> Iterator[Dict]:
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break
+
+    return header, actions()
+
+def find_journals(journal_dir: str, include_cancelled: bool = False) -> List[str]:
+    """Journals left behind by sessions that never finished (and recovery claims, see claim_journal)"""
+    if not os.path.isdir(journal_dir):
+        return []
+    suffixes = (JOURNAL_EXT, JOURNAL_EXT + CLAIM_EXT)
+    if include_cancelled:
+        suffixes += (JOURNAL_EXT + CANCELLED_EXT,)
+    return sorted(os.path.join(journal_dir, name) for name in os.listdir(journal_dir)
+                  if name.endswith(suffixes))
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process with this pid is running (without signalling it)"""
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Someone else's process
+    return True
+
+def _owner_pid(path: str) -> int:
+    """Pid holding a journal: the claiming process for a claim, else the writer from the header"""
+    if path.endswith(CLAIM_EXT):
+        try:
+            return int(path[:-len(CLAIM_EXT)].rsplit('.', 1)[1])
+        except (IndexError, ValueError):
+            return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(json.loads(f.readline() or '{}').get('pid', 0))
+    except (OSError, ValueError, TypeError):
+        return 0
+
+def claim_journal(path: str) -> Optional[str]:
+    """
+    Take an abandoned journal for recovery, safely across processes
+
+    Journals whose writer (or a recovering process) is still alive are left
+    alone. Otherwise the journal is atomically renamed to
+    '<name>.jsonl.<pid>.recovering' - only one process can win the rename, and
+    an open journal can't be renamed on Windows at all.
+
+    Returns:
+        The claimed path, or None if the journal is in use or was taken first
+    """
+    owner = _owner_pid(path)
+    if owner and owner != os.getpid() and pid_alive(owner):
+        return None
+    base = path[:-len(CLAIM_EXT)].rsplit('.', 1)[0] if path.endswith(CLAIM_EXT) else path
+    claimed = f"{base}.{os.getpid()}{CLAIM_EXT}"
+    if claimed == path:
+        return path
+    try:
+        os.rename(path, claimed)
+    except OSError:
+        return None
+    return claimed
+
+def release_journal(claimed: str) -> str:
+    """Hand a claimed journal back (recovery failed) so a later run can retry it"""
+    original = claimed[:-len(CLAIM_EXT)].rsplit('.', 1)[0]
+    try:
+        os.rename(claimed, original)
+    except OSError:
+        return claimed
+    return original
@@ -0,0 +1,191 @@
+"""
+Recording Optimizer - Removes idle time and redundant input from recorded attacks
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .recording_format import RECORDING_EXT, save_recording
+
+class RecordingOptimizer:
+    """Rewrites a recording so the same deployment plays back in less time"""
+
+    # Shortest pause kept before each action type - longer hesitations are cut down to this
+    DEFAULT_MIN_GAPS = {
+        'click': 0.08,
+        'hold': 0.15,
+        'drag': 0.15,
+        'move': 0.0
+    }
+
+    def __init__(self, min_gaps: Optional[Dict[str, float]] = None, merge_radius: int = 8,
+                 merge_window: float = 0.3, keep_delays: bool = True):
+        """
+        Args:
+            min_gaps: Per action type, the gap that longer gaps before it are clamped to
+            merge_radius: Taps closer than this (pixels) count as the same spot
+            merge_window: Taps at the same spot within this many seconds are merged
+            keep_delays: Keep F7 delay markers (they were added on purpose); False drops them
+        """
+        self.min_gaps = dict(self.DEFAULT_MIN_GAPS)
+        self.min_gaps.update(min_gaps or {})
+        self.merge_radius = merge_radius
+        self.merge_window = merge_window
+        self.keep_delays = keep_delays
+
+    def optimize(self, actions: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Optimize a list of action dicts
+
+        Returns:
+            (optimized actions, report)
+        """
+        report = {
+            'original_actions': len(actions),
+            'original_duration': self._duration(actions),
+            'moves_removed': 0,
+            'delays_removed': 0,
+            'taps_merged': 0,
+            'gaps_clamped': 0
+        }
+
+        actions = [dict(action) for action in actions]
+        actions = self._drop_redundant_actions(actions, report)
+        actions = self._merge_repeated_taps(actions, report)
+        actions = self._clamp_gaps(actions, report)
+
+        report['optimized_actions'] = len(actions)
+        report['optimized_duration'] = self._duration(actions)
+        report['time_saved'] = report['original_duration'] - report['optimized_duration']
+        report['reduction_percent'] = (report['time_saved'] / report['original_duration'] * 100
+                                       if report['original_duration'] > 0 else 0.0)
+        return actions, report
+
+    def optimize_session(self, recorder, session_name: str) -> Optional[Dict]:
+        """
+        Optimize a saved session and write it as '<session_name>_optimized'
+
+        Returns:
+            The report with 'session_name' and 'filepath' added, or None on failure
+        """
+        recording = recorder.load_recording(session_name)
+        if not recording:
+            return None
+
+        actions, report = self.optimize(recording.get('actions', []))
+        if not actions:
+            print("Nothing left to play after optimization - not saved")
+            return None
+
+        optimized_name = f"{session_name}_optimized"
+        filepath = os.path.join(recorder.recordings_dir, f"{optimized_name}{RECORDING_EXT}")
+
+        header = {key: value for key, value in recording.items() if key != 'actions'}
+        header.update({
+            'name': optimized_name,
+            'created': datetime.now().isoformat(),
+            'duration': report['optimized_duration'],
+            'optimized_from': session_name
+        })
+
+        try:
+            save_recording(filepath, header, actions)
+        except Exception as e:
+            print(f"Error saving optimized recording: {e}")
+            return None
+        recorder.catalog.update(optimized_name, filepath)
+
+        report['session_name'] = optimized_name
+        report['filepath'] = filepath
+        return report
+
+    def _drop_redundant_actions(self, actions: List[Dict], report: Dict) -> List[Dict]:
+        """Drop moves - every tap, hold and drag positions the pointer itself - and unwanted delays"""
+        result = []
+        for i, action in enumerate(actions):
+            # A trailing move is the last place the pointer was left, so it stays
+            if action.get('type') == 'move' and i < len(actions) - 1:
+                report['moves_removed'] += 1
+                continue
+            if action.get('type') == 'delay' and not self.keep_delays:
+                report['delays_removed'] += 1
+                continue
+            result.append(action)
+        return result
+
+    def _merge_repeated_taps(self, actions: List[Dict], report: Dict) -> List[Dict]:
+        """Fold bursts of taps on one spot into a single click with a repeat count"""
+        result = []
+        last_tap_time = None
+
+        for action in actions:
+            previous = result[-1] if result else None
+            if (previous and action.get('type') == 'click' and previous.get('type') == 'click'
+                    and abs(action['x'] - previous['x']) <= self.merge_radius
+                    and abs(action['y'] - previous['y']) <= self.merge_radius
+                    and action['timestamp'] - last_tap_time <= self.merge_window):
+                previous['repeat'] = previous.get('repeat', 1) + 1
+                previous['interval'] = self.min_gaps.get('click', 0.0)
+                last_tap_time = action['timestamp']
+                report['taps_merged'] += 1
+                continue
+
+            result.append(action)
+            last_tap_time = action.get('timestamp', 0.0)
+
+        return result
+
+    def _clamp_gaps(self, actions: List[Dict], report: Dict) -> List[Dict]:
+        """Shift actions earlier so no gap is longer than its type's minimum"""
+        original_end = 0.0
+        new_end = 0.0
+
+        for action in actions:
+            action_type = action.get('type', '')
+            timestamp = action.get('timestamp', 0.0)
+            gap = max(0.0, timestamp - original_end)
+            original_end = max(original_end, timestamp + self._length(action))
+
+            limit = gap if action_type == 'delay' else self.min_gaps.get(action_type, 0.0)
+            if gap > limit:
+                gap = limit
+                report['gaps_clamped'] += 1
+
+            action['timestamp'] = action['relative_time'] = round(new_end + gap, 4)
+            new_end = action['timestamp'] + self._length(action)
+
+        return actions
+
+    def _length(self, action: Dict) -> float:
+        """
+        How long an action keeps the input busy once it starts
+
+        Delay markers take no recorded time - playback pauses for them on top of the timeline.
+        """
+        action_type = action.get('type')
+        if action_type == 'click':
+            repeat = action.get('repeat', 1)
+            return (repeat - 1) * action.get('interval', 0.0) + repeat * action.get('hold', 0.0)
+        if action_type in ('hold', 'drag'):
+            return action.get('duration', 0.0)
+        return 0.0
+
+    def _duration(self, actions: List[Dict]) -> float:
+        """Playback time: end of the last action plus any delay marker pauses"""
+        timeline = max((action.get('timestamp', 0.0) + self._length(action) for action in actions), default=0.0)
+        pauses = sum(action.get('duration', 0.0) for action in actions if action.get('type') == 'delay')
+        return timeline + pauses
+
+def format_report(report: Dict) -> str:
+    """Human readable summary of an optimization report"""
+    lines = [
+        f"Duration: {report['original_duration']:.1f}s -> {report['optimized_duration']:.1f}s "
+        f"({report['time_saved']:.1f}s faster, -{report['reduction_percent']:.0f}%)",
+        f"Actions: {report['original_actions']} -> {report['optimized_actions']}",
+        f"Moves removed: {report['moves_removed']}",
+        f"Delays removed: {report['delays_removed']}",
+        f"Taps merged: {report['taps_merged']}",
+        f"Gaps shortened: {report['gaps_clamped']}"
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,165 @@
+"""
+Response Parser - Tolerant parsing of Gemini base analysis responses
+"""
+
+import re
+import json
+import math
+from typing import Any, Dict, Optional, Tuple
+
+# Digit groups split by spaces, NBSP, commas or dots, e.g. "123 456" or "1,234,567"
+_GROUPED_NUMBER = re.compile(r'^\d{1,3}(?:[ \u00a0\u202f,.]\d{3})+$')
+# The same, as a bare JSON value (invalid JSON) - "gold": 123 456,
+_GROUPED_VALUE = re.compile(r'(:\s*)(\d{1,3}(?:[ \u00a0\u202f,]\d{3})+)(\s*[,}\n])')
+_SUFFIX_NUMBER = re.compile(r'^(\d+(?:\.\d+)?)\s*([kKmM])$')
+_FENCE = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.DOTALL)
+
+def parse_number(value: Any) -> Optional[int]:
+    """Convert a loot/level value from the model into an int, or None if unreadable"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else None
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip().lstrip('~≈').strip()
+    if not text:
+        return None
+
+    if _GROUPED_NUMBER.match(text):
+        return int(re.sub(r'\D', '', text))
+
+    match = _SUFFIX_NUMBER.match(text)
+    if match:
+        multiplier = 1000 if match.group(2).lower() == 'k' else 1000000
+        return int(float(match.group(1)) * multiplier)
+
+    try:
+        number = float(text)
+    except ValueError:
+        pass
+    else:
+        # "inf", "NaN" or 1e400 - not a loot amount, and int() would raise OverflowError
+        return int(number) if math.isfinite(number) else None
+
+    # Last resort: first run of digits (e.g. "TH 12", "Level 11")
+    digits = re.search(r'\d+', text)
+    return int(digits.group()) if digits else None
+
+def extract_json_text(text: str) -> Optional[str]:
+    """Pull the first JSON object out of fenced or prose-wrapped model output"""
+    if not text:
+        return None
+
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    start = text.find('{')
+    if start < 0:
+        return None
+
+    # Match braces while ignoring any inside string literals
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    return None
+
+def parse_analysis(text: str) -> Tuple[Optional[Dict], bool]:
+    """
+    Parse a base analysis response
+
+    Returns:
+        (analysis, repaired) - analysis is None if nothing usable could be read;
+        repaired is True when the raw text was not clean JSON
+    """
+    if text is None:
+        return None, False
+
+    stripped = text.strip()
+    repaired = False
+
+    try:
+        data = json.loads(stripped)
+    except json.JSONDecodeError:
+        data = None
+
+    if not isinstance(data, dict):
+        repaired = True
+        candidate = extract_json_text(stripped)
+        if candidate is None:
+            return None, repaired
+
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            try:
+                data = json.loads(_GROUPED_VALUE.sub(
+                    lambda m: m.group(1) + re.sub(r'\D', '', m.group(2)) + m.group(3), candidate))
+            except json.JSONDecodeError:
+                return None, repaired
+
+    if not isinstance(data, dict):
+        return None, repaired
+
+    analysis, normalized = _normalize(data)
+    return analysis, repaired or normalized
+
+def _normalize(data: Dict) -> Tuple[Optional[Dict], bool]:
+    """Coerce field types; returns (analysis, changed) or (None, True) if loot is unreadable"""
+    changed = False
+    loot_in = data.get('loot')
+    if not isinstance(loot_in, dict):
+        # Some responses flatten the loot fields to the top level
+        loot_in = data
+        changed = True
+
+    loot = {}
+    for key in ('gold', 'elixir', 'dark_elixir'):
+        raw = loot_in.get(key)
+        value = parse_number(raw)
+        if value is None:
+            return None, True
+        changed = changed or value != raw
+        loot[key] = value
+
+    townhall = parse_number(data.get('townhall_level'))
+    if townhall is None:
+        townhall = 0
+    changed = changed or townhall != data.get('townhall_level')
+
+    raw_recommendation = str(data.get('recommendation', 'SKIP')).strip().upper()
+    recommendation = 'ATTACK' if 'ATTACK' in raw_recommendation and 'SKIP' not in raw_recommendation else 'SKIP'
+    changed = changed or recommendation != raw_recommendation
+
+    analysis = dict(data)
+    analysis['loot'] = loot
+    analysis['townhall_level'] = townhall
+    analysis['recommendation'] = recommendation
+    analysis['difficulty'] = str(data.get('difficulty', 'Unknown'))
+    analysis['reasoning'] = str(data.get('reasoning', ''))
+    if loot_in is data:
+        for key in ('gold', 'elixir', 'dark_elixir'):
+            analysis.pop(key, None)
+    return analysis, changed
@@ -2,56 +2,129 @@
 Screen Capture Module - Handles screen capture and game window detection
 """
 
-import pyautogui
 import cv2
 import numpy as np
+import sys
 import time
 import os
+import functools
 from typing import Optional, Tuple, List
 from datetime import datetime
-import win32gui
-import win32con
+from PIL import Image
+from .x11_backend import X11Capture, default_display, x11_available
+
+@functools.lru_cache(maxsize=None)
+def desktop_backend() -> str:
+    """Platform used for the desktop: 'win32', 'x11' (Linux with an X display, including Xvfb) or 'pyautogui'"""
+    if sys.platform == "win32":
+        return "win32"
+    if x11_available():
+        return "x11"
+    return "pyautogui"
+
+def screen_size() -> Tuple[int, int]:
+    """Width and height of the primary screen"""
+    if desktop_backend() == "x11":
+        return default_display().screen_size()
+    import pyautogui
+    return tuple(pyautogui.size())
+
+def cursor_position() -> Tuple[int, int]:
+    """Current mouse position in screen coordinates"""
+    if desktop_backend() == "x11":
+        return default_display().pointer_position()
+    import pyautogui
+    return tuple(pyautogui.position())
 
 class ScreenCapture:
     """Handles screen capture and game window detection"""
     
-    def __init__(self):
-        self.screenshot_dir = "screenshots"
-        self.game_window_title = "Clash of Clans"
-        self.game_window_bounds = None
+    def __init__(self, window_title: Optional[str] = None, window_bounds: Optional[Tuple[int, int, int, int]] = None,
+                 screenshot_dir: str = "screenshots", device=None, backend: str = "auto"):
+        """
+        Args:
+            window_title: Exact title of one emulator window (multi-instance); by default
+                the first Clash of Clans / BlueStacks / Nox window is used
+            window_bounds: Fixed capture region (x, y, width, height) instead of looking for a window
+            screenshot_dir: Where screenshots are saved
+            device: AdbDevice to capture from instead of the desktop; its screen is the game window
+            backend: Desktop platform - 'auto', 'win32', 'x11' or 'pyautogui' (capture only, no window lookup)
+        """
+        self.screenshot_dir = screenshot_dir
+        self.game_window_title = window_title or "Clash of Clans"
+        self.window_title = window_title
+        self.fixed_bounds = tuple(window_bounds) if window_bounds else None
+        self.game_window_bounds = self.fixed_bounds
+        self.game_window_handle = None
+        self.device = device
+        self.backend = desktop_backend() if backend == "auto" else backend
+        self._x11_capture = None
+        self.frame_bus = None
+        self.frame_max_age = 0.5
+        self.vision_pool = None
         
         # Create screenshots directory
         os.makedirs(self.screenshot_dir, exist_ok=True)
         
         # Configure pyautogui
-        pyautogui.FAILSAFE = True
-        pyautogui.PAUSE = 0.1
+        if not device and self.backend != "x11":
+            import pyautogui
+            pyautogui.FAILSAFE = True
+            pyautogui.PAUSE = 0.1
     
     def find_game_window(self) -> Optional[Tuple[int, int, int, int]]:
         """Find the COC game window and return its bounds (x, y, width, height)"""
-        def enum_windows_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                if "clash of clans" in window_title.lower() or "bluestacks" in window_title.lower() or "nox" in window_title.lower():
-                    rect = win32gui.GetWindowRect(hwnd)
-                    windows.append((hwnd, window_title, rect))
+        if self.fixed_bounds:
+            return self.fixed_bounds
+        if self.device:
+            width, height = self.device.screen_size()
+            self.game_window_bounds = (0, 0, width, height)
+            return self.game_window_bounds
         
-        windows = []
-        win32gui.EnumWindows(enum_windows_callback, windows)
+        if self.backend == "win32":
+            windows = self._win32_windows()
+        elif self.backend == "x11":
+            windows = self._x11().x11.list_windows()
+        else:
+            windows = []
+        windows = [window for window in windows if self._is_game_window(window[1])]
         
         if windows:
             # Take the first match
-            hwnd, title, rect = windows[0]
-            x, y, right, bottom = rect
-            width = right - x
-            height = bottom - y
+            handle, title, (x, y, width, height) = windows[0]
             self.game_window_bounds = (x, y, width, height)
+            self.game_window_handle = handle
             print(f"Found game window: {title} at ({x}, {y}, {width}, {height})")
             return self.game_window_bounds
         
         print("Could not find COC game window. Make sure the game is running.")
         return None
     
+    def _is_game_window(self, window_title: str) -> bool:
+        if self.window_title:
+            return window_title.lower() == self.window_title.lower()
+        title = window_title.lower()
+        return "clash of clans" in title or "bluestacks" in title or "nox" in title
+    
+    def _win32_windows(self) -> List[Tuple[int, str, Tuple[int, int, int, int]]]:
+        """(hwnd, title, bounds) of every visible top-level window"""
+        import win32gui
+        
+        def enum_windows_callback(hwnd, windows):
+            if win32gui.IsWindowVisible(hwnd):
+                x, y, right, bottom = win32gui.GetWindowRect(hwnd)
+                windows.append((hwnd, win32gui.GetWindowText(hwnd), (x, y, right - x, bottom - y)))
+        
+        windows = []
+        win32gui.EnumWindows(enum_windows_callback, windows)
+        return windows
+    
+    def _x11(self) -> X11Capture:
+        """Shared-memory X11 capture, opened on first use"""
+        if self._x11_capture is None:
+            self._x11_capture = X11Capture()
+        return self._x11_capture
+    
     def capture_screen(self, region: Optional[Tuple[int, int, int, int]] = None) -> str:
         """
         Capture screenshot of specified region or full screen
@@ -61,15 +134,21 @@ class ScreenCapture:
         filename = f"screenshot_{timestamp}.png"
         filepath = os.path.join(self.screenshot_dir, filename)
         
+        if self._use_pool():
+            # Cropped and encoded by a vision worker straight from the frame bus
+            try:
+                self.vision_pool.save_region(filepath, region or self.game_window_bounds).result(timeout=10)
+                print(f"Screenshot saved: {filepath}")
+                return filepath
+            except Exception:
+                pass  # No fresh frame covering the region, or the pool is down - capture here instead
+        
         if region:
             # Capture specific region
-            screenshot = pyautogui.screenshot(region=region)
+            screenshot = self._screenshot(region)
         else:
             # Capture full screen or game window if detected
-            if self.game_window_bounds:
-                screenshot = pyautogui.screenshot(region=self.game_window_bounds)
-            else:
-                screenshot = pyautogui.screenshot()
+            screenshot = self._screenshot(self.game_window_bounds)
         
         screenshot.save(filepath)
         print(f"Screenshot saved: {filepath}")
@@ -89,20 +168,24 @@ class ScreenCapture:
         Find a template image on screen using template matching
         Returns the center coordinates of the match if found
         """
+        if not os.path.exists(template_path):
+            print(f"Template not found: {template_path}")
+            return None
+        
+        if self._use_pool():
+            try:
+                match = self.vision_pool.match_template(template_path, threshold, region).result(timeout=10)
+                return (match['x'], match['y']) if match else None
+            except Exception:
+                pass  # No fresh frame covering the region, or the pool is down - match here instead
+        
         # Take screenshot
-        if region:
-            screenshot = pyautogui.screenshot(region=region)
-        else:
-            screenshot = pyautogui.screenshot()
+        screenshot = self._screenshot(region)
         
         # Convert to OpenCV format
         screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
         
         # Load template
-        if not os.path.exists(template_path):
-            print(f"Template not found: {template_path}")
-            return None
-            
         template = cv2.imread(template_path, cv2.IMREAD_COLOR)
         
         # Perform template matching
@@ -140,9 +223,76 @@ class ScreenCapture:
         print(f"Template not found within timeout: {template_path}")
         return None
     
+    def attach_frame_bus(self, frame_bus, max_age: float = 0.5) -> None:
+        """
+        Serve screenshots from a frame bus instead of capturing
+        
+        Args:
+            frame_bus: FrameBus or FrameBusReader fed by a FrameCapturer
+            max_age: Oldest frame (seconds) still used; older ones mean a live capture
+        """
+        self.frame_bus = frame_bus
+        self.frame_max_age = max_age
+    
+    def detach_frame_bus(self) -> None:
+        self.frame_bus = None
+    
+    def attach_vision_pool(self, vision_pool) -> None:
+        """Encode screenshots and match templates in vision worker processes, from frame bus frames"""
+        self.vision_pool = vision_pool
+    
+    def _use_pool(self) -> bool:
+        return bool(self.vision_pool and self.frame_bus and self.vision_pool.is_running)
+    
+    def frame_region(self, region: Optional[Tuple[int, int, int, int]],
+                     max_age: Optional[float] = None) -> Optional[np.ndarray]:
+        """Copy of a region from the newest bus frame, if one is fresh enough and covers it"""
+        frame_bus = self.frame_bus
+        if frame_bus is None or not region:
+            return None
+        frame = frame_bus.latest()
+        if frame is None or frame.age > (self.frame_max_age if max_age is None else max_age):
+            return None
+        pixels = frame.crop(tuple(region))
+        if pixels is None:
+            return None
+        pixels = pixels.copy()
+        return pixels if frame_bus.is_current(frame) else None
+    
+    def _screenshot(self, region: Optional[Tuple[int, int, int, int]] = None) -> Image.Image:
+        """Screenshot of a region (or everything) from the frame bus, the desktop or the device's framebuffer"""
+        pixels = self.frame_region(region)
+        if pixels is not None:
+            return Image.fromarray(pixels)
+        if self.backend == "x11" and not self.device:
+            return Image.fromarray(self._x11().grab(region))
+        if not self.device:
+            import pyautogui
+            return pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        image = Image.fromarray(self.device.screencap())
+        if region:
+            x, y, width, height = region
+            image = image.crop((x, y, x + width, y + height))
+        return image
+    
+    def grab_region(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        """
+        Grab a small screen region (x, y, width, height) as an RGB array without saving it
+        
+        Always a live capture - playback checks need the screen as it is after a tap,
+        and the frame capturer itself grabs through here.
+        """
+        if self.device:
+            x, y, width, height = region
+            return self.device.screencap()[max(y, 0):y + height, max(x, 0):x + width]
+        if self.backend == "x11":
+            return self._x11().grab(region)
+        import pyautogui
+        return np.asarray(pyautogui.screenshot(region=region))
+    
     def get_pixel_color(self, x: int, y: int) -> Tuple[int, int, int]:
         """Get the RGB color of a pixel at specified coordinates"""
-        screenshot = pyautogui.screenshot()
+        screenshot = self._screenshot()
         pixel = screenshot.getpixel((x, y))
         return pixel
     
@@ -151,7 +301,7 @@ class ScreenCapture:
         template_dir = "templates"
         os.makedirs(template_dir, exist_ok=True)
         
-        screenshot = pyautogui.screenshot(region=region)
+        screenshot = self._screenshot(region)
         filepath = os.path.join(template_dir, f"{name}.png")
         screenshot.save(filepath)
         
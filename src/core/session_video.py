@@ -0,0 +1,302 @@
+"""
+Session Video - Continuous video of the game window, encoded by a separate process from frame bus frames
+"""
+
+import os
+import re
+import time
+import queue
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import cv2
+
+VIDEO_EXTENSIONS = {'MJPG': '.avi', 'XVID': '.avi', 'mp4v': '.mp4', 'avc1': '.mp4'}
+LABEL_UNSAFE = re.compile(r"[^\w-]+")
+
+class _SegmentWriter:
+    """Writes frames into rotating video segments and keeps the directory under its disk cap"""
+
+    def __init__(self, options: Dict, stats: Dict):
+        self.directory = options['directory']
+        self.fps = options['fps']
+        self.codec = options['codec']
+        self.extension = VIDEO_EXTENSIONS.get(self.codec, '.avi')
+        self.segment_seconds = options['segment_seconds']
+        self.max_bytes = options['max_disk_mb'] * 1024 * 1024
+        self.stats = stats
+        self.writer = None
+        self.path = None
+        self.size = None
+        self.label = None
+        self.frames = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, image, label: str) -> None:
+        size = (image.shape[1], image.shape[0])
+        # Rotate by length (frames, so the cap holds in video time) and whenever the window size changes
+        if (self.writer is None or label != self.label or size != self.size
+                or self.frames >= self.segment_seconds * self.fps):
+            self.open(label, size)
+        self.writer.write(image)
+        self.frames += 1
+
+    def open(self, label: str, size) -> None:
+        self.close()
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        path = os.path.join(self.directory, f"{stamp}_{LABEL_UNSAFE.sub('_', label)}{self.extension}")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), self.fps, size)
+        if not writer.isOpened():
+            raise RuntimeError(f"Could not open a {self.codec} video writer for {path}")
+        self.writer, self.path, self.size, self.label, self.frames = writer, path, size, label, 0
+        self.stats['segments'] += 1
+        self.stats['current_segment'] = path
+        self.enforce_cap()
+
+    def close(self) -> None:
+        """Finish the current segment so it is playable"""
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            self.stats['current_segment'] = None
+            self.enforce_cap()
+
+    def segments(self) -> List[str]:
+        """Video files in the directory, oldest first"""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if os.path.splitext(name)[1] in VIDEO_EXTENSIONS.values()]
+        return sorted(paths, key=os.path.getmtime)
+
+    def enforce_cap(self) -> None:
+        """Delete the oldest finished segments until the directory fits in max_disk_mb"""
+        segments = self.segments()
+        sizes = {path: os.path.getsize(path) for path in segments}
+        total = sum(sizes.values())
+        for path in segments:
+            if total <= self.max_bytes:
+                break
+            if path == self.path and self.writer is not None:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= sizes[path]
+            self.stats['deleted_segments'] += 1
+        self.stats['disk_mb'] = total / (1024 * 1024)
+
+def _recorder_main(commands, reports, options: Dict) -> None:
+    """
+    Recorder process: sample the bus at options['fps'] while a label is set, until the None sentinel
+
+    Stats are only reported when asked for with a 'stats' command - reports
+    nobody reads would pile up in the queue for the whole session.
+    """
+    if options.get('nice') and hasattr(os, 'nice'):
+        os.nice(options['nice'])  # Encoding must never take the CPU from the input thread
+    cv2.setNumThreads(1)
+    try:
+        from .frame_bus import FrameBusReader
+        reader = FrameBusReader(options['frame_bus'], track=True)
+        stats = {'frames_written': 0, 'dropped': 0, 'repeated': 0, 'segments': 0, 'deleted_segments': 0,
+                 'encode_time': 0.0, 'max_encode_ms': 0.0, 'disk_mb': 0.0, 'current_segment': None,
+                 'label': None, 'error': None}
+        segments = _SegmentWriter(options, stats)
+    except Exception as e:
+        reports.put(('error', f"{type(e).__name__}: {e}"))
+        return
+    reports.put(('ready', os.getpid()))
+
+    interval = 1.0 / options['fps']
+    scale = options['scale']
+    label = None
+    next_tick = time.perf_counter()
+    last_seq, last_image = 0, None
+    while True:
+        now = time.perf_counter()
+        try:
+            command = commands.get(timeout=max(0.0, next_tick - now) if label else 1.0)
+        except queue.Empty:
+            command = ()
+        if command is None:
+            break
+        if command:
+            if command[0] == 'record':
+                if label is None:
+                    next_tick = time.perf_counter()
+                    last_seq, last_image = 0, None
+                label = stats['label'] = command[1]
+            elif command[0] == 'pause' and label is not None:
+                label = stats['label'] = None
+                segments.close()
+            elif command[0] == 'stats':
+                reports.put(('stats', dict(stats)))
+            continue
+        if label is None or time.perf_counter() < next_tick:
+            continue
+
+        # Ticks that passed while the last frame was encoding are lost, not queued up
+        behind = int((time.perf_counter() - next_tick) / interval)
+        stats['dropped'] += behind
+        next_tick += (behind + 1) * interval
+
+        started = time.perf_counter()
+        frame = reader.latest()
+        image = last_image
+        if frame is not None and frame.seq != last_seq:
+            pixels = frame.pixels
+            if scale != 1.0:
+                pixels = cv2.resize(pixels, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            converted = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)  # Copies out of shared memory
+            if reader.is_current(frame):
+                image, last_seq = converted, frame.seq
+            else:
+                stats['dropped'] += 1  # The slot was overwritten mid-copy
+        if image is None:
+            continue
+        if image is last_image:
+            stats['repeated'] += 1  # No new frame since the last tick - hold the picture to keep real time
+        try:
+            segments.write(image, label)
+        except Exception as e:
+            stats['error'] = f"{type(e).__name__}: {e}"
+            label = stats['label'] = None
+            continue
+        last_image = image
+        elapsed = time.perf_counter() - started
+        stats['frames_written'] += 1
+        stats['encode_time'] += elapsed
+        stats['max_encode_ms'] = max(stats['max_encode_ms'], elapsed * 1000)
+
+    segments.close()
+    reader.close()
+    reports.put(('stats', dict(stats)))
+
+class SessionVideoRecorder:
+    """
+    Records the game window to rotating video segments from a separate process
+
+    The recorder process attaches to the frame bus and samples it at a
+    reduced rate, so the bot process only ever pays for putting a command
+    on a queue. Segments are named after the label passed to record()
+    (e.g. 'search', 'battle_my_attack'); the oldest are deleted once the
+    directory exceeds max_disk_mb.
+    """
+
+    def __init__(self, frame_bus: str, directory: str = "videos", fps: float = 4.0, scale: float = 0.5,
+                 segment_seconds: float = 120.0, max_disk_mb: float = 1000.0, codec: str = "MJPG", nice: int = 19):
+        """
+        Args:
+            frame_bus: Name of the frame bus to record from
+            directory: Where segments are written
+            fps: Frames sampled from the bus per second
+            scale: Resize factor applied before encoding
+            segment_seconds: Video length after which a new segment starts
+            max_disk_mb: Disk budget for all segments in directory
+            codec: FourCC of the encoder (MJPG is cheapest; mp4v writes .mp4)
+            nice: Priority decrease for the recorder (POSIX)
+        """
+        self.options = {'frame_bus': frame_bus, 'directory': directory, 'fps': max(0.1, fps),
+                        'scale': scale, 'segment_seconds': segment_seconds, 'max_disk_mb': max_disk_mb,
+                        'codec': codec, 'nice': nice}
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._commands = None
+        self._reports = None
+        self._stats = {}
+        self._started = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._process and self._process.is_alive())
+
+    def start(self, timeout: float = 30.0) -> bool:
+        """Start the recorder process; it stays idle until record() is called"""
+        if self.is_running:
+            return True
+        self._commands = self._context.Queue()
+        self._reports = self._context.Queue()
+        self._process = self._context.Process(target=_recorder_main, name="SessionVideoRecorder",
+                                              args=(self._commands, self._reports, self.options), daemon=True)
+        self._process.start()
+
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                status, payload = self._reports.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if self._process.exitcode is not None or time.perf_counter() > deadline:
+                    status, payload = 'error', "process exited" if self._process.exitcode is not None else "timed out"
+                    break
+        if status != 'ready':
+            print(f"Session video recorder did not start: {payload}")
+            self.close()
+            return False
+        self._started = time.perf_counter()
+        print(f"Session video recorder started: {self.options['fps']:g} fps into {self.options['directory']}")
+        return True
+
+    def record(self, label: str) -> None:
+        """Record under label from now on - a new label starts a new segment"""
+        self._send(('record', label))
+
+    def pause(self) -> None:
+        """Stop recording and finish the current segment"""
+        self._send(('pause',))
+
+    def _send(self, command) -> None:
+        if self.is_running:
+            self._commands.put(command)  # Never blocks - a feeder thread does the pipe write
+
+    def _drain(self) -> None:
+        while self._reports is not None:
+            try:
+                status, payload = self._reports.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            if status == 'stats':
+                self._stats = payload
+
+    def _request_stats(self, timeout: float) -> None:
+        """Ask the recorder for its stats and wait for the reply"""
+        if not self.is_running:
+            return
+        self._commands.put(('stats',))
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                status, payload = self._reports.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except (queue.Empty, OSError, ValueError):
+                return
+            if status == 'stats':
+                self._stats = payload
+                return
+
+    def get_stats(self, timeout: float = 1.0) -> Dict:
+        """Encoder throughput, dropped and repeated frames and disk use, fetched from the recorder"""
+        self._request_stats(timeout)
+        stats = dict(self._stats)
+        written = stats.get('frames_written', 0)
+        encode_time = stats.pop('encode_time', 0.0)
+        stats['mean_encode_ms'] = encode_time / written * 1000 if written else 0.0
+        stats['encode_fps'] = written / encode_time if encode_time else 0.0  # Throughput the encoder could sustain
+        stats['running'] = self.is_running
+        stats['target_fps'] = self.options['fps']
+        return stats
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Finish the current segment and stop the recorder process"""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._commands.put(None)
+            deadline = time.perf_counter() + timeout
+            while self._process.is_alive() and time.perf_counter() < deadline:
+                self._drain()  # Keep the report pipe flowing so the recorder can exit
+                self._process.join(0.1)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._drain()
+        self._process = None
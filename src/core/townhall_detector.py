@@ -0,0 +1,222 @@
+"""
+Town Hall Detector - Local CPU-only Town Hall location and level classification
+"""
+
+import os
+import time
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+class TownHallDetector:
+    """Locates the Town Hall with a multi-scale template bank and classifies its level"""
+
+    def __init__(self, bank_path: str = "templates/townhall_bank.npz",
+                 scales: Tuple[float, ...] = (0.8, 0.9, 1.0, 1.1, 1.25),
+                 work_width: int = 640, min_score: float = 0.55, min_margin: float = 0.05):
+        self.bank_path = bank_path
+        self.scales = scales
+        self.work_width = work_width
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+        self.templates = []  # (level, grayscale template at reference_width)
+        self.reference_width = 1280
+        self._scaled_cache = {}
+
+        if os.path.exists(bank_path):
+            self.load_bank(bank_path)
+
+    def is_available(self) -> bool:
+        """True once a template bank has been loaded"""
+        return bool(self.templates)
+
+    def load_bank(self, bank_path: str) -> bool:
+        """Load a template bank written by build_bank()"""
+        try:
+            with np.load(bank_path) as bank:
+                levels = bank['levels']
+                self.reference_width = int(bank['reference_width'])
+                self.templates = [(int(level), bank[f't{i}']) for i, level in enumerate(levels)]
+            self._scaled_cache = {}
+            print(f"Town Hall bank loaded: {len(self.templates)} templates, "
+                  f"levels {sorted(set(level for level, _ in self.templates))}")
+            return True
+        except Exception as e:
+            print(f"Error loading Town Hall bank: {e}")
+            self.templates = []
+            return False
+
+    def detect_file(self, image_path: str) -> Optional[Dict]:
+        """Run detection on a screenshot file"""
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Could not read image: {image_path}")
+            return None
+        return self.detect(image)
+
+    def detect(self, image: np.ndarray) -> Optional[Dict]:
+        """
+        Locate and classify the Town Hall in a screenshot
+
+        Args:
+            image: Grayscale or BGR screenshot
+
+        Returns:
+            Dict with level, score, margin, confident, box (in image pixels) and
+            elapsed_ms, or None if no bank is loaded or nothing matched
+        """
+        if not self.templates:
+            return None
+
+        start = time.perf_counter()
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # Work on a fixed-width copy so cost doesn't depend on capture resolution
+        factor = self.work_width / image.shape[1]
+        work = cv2.resize(image, (self.work_width, max(1, int(image.shape[0] * factor))),
+                          interpolation=cv2.INTER_AREA)
+
+        # Stage 1: locate with one prototype per level on a half-resolution image
+        coarse = cv2.resize(work, (work.shape[1] // 2, work.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        best = None
+        for level, template_index in self._prototypes().items():
+            for scale in self.scales:
+                template = self._scaled(template_index, scale, 0.5)
+                if template is None or template.shape[0] > coarse.shape[0] or template.shape[1] > coarse.shape[1]:
+                    continue
+                result = cv2.matchTemplate(coarse, template, cv2.TM_CCOEFF_NORMED)
+                _, score, _, location = cv2.minMaxLoc(result)
+                if best is None or score > best[0]:
+                    best = (score, scale, location, template.shape)
+
+        if best is None:
+            return None
+
+        _, scale, location, (coarse_h, coarse_w) = best
+
+        # Stage 2: classify every template in a small window around the hit
+        center_x = int((location[0] + coarse_w / 2) * 2)
+        center_y = int((location[1] + coarse_h / 2) * 2)
+        level_scores = {}
+        level_boxes = {}
+        for index, (level, _) in enumerate(self.templates):
+            for candidate_scale in self._neighbour_scales(scale):
+                template = self._scaled(index, candidate_scale, 1.0)
+                if template is None:
+                    continue
+                th, tw = template.shape
+                x0 = max(0, center_x - tw)
+                y0 = max(0, center_y - th)
+                roi = work[y0:min(work.shape[0], center_y + th), x0:min(work.shape[1], center_x + tw)]
+                if roi.shape[0] < th or roi.shape[1] < tw:
+                    continue
+                result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+                _, score, _, loc = cv2.minMaxLoc(result)
+                if score > level_scores.get(level, -1.0):
+                    level_scores[level] = score
+                    level_boxes[level] = (x0 + loc[0], y0 + loc[1], tw, th)
+
+        if not level_scores:
+            return None
+
+        ranked = sorted(level_scores.items(), key=lambda item: item[1], reverse=True)
+        level, score = ranked[0]
+        margin = score - ranked[1][1] if len(ranked) > 1 else score
+
+        x, y, w, h = level_boxes[level]
+        box = (int(x / factor), int(y / factor), int(w / factor), int(h / factor))
+
+        return {
+            'level': level,
+            'score': float(score),
+            'margin': float(margin),
+            'confident': score >= self.min_score and margin >= self.min_margin,
+            'box': box,
+            'scores': {lvl: float(s) for lvl, s in ranked},
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def _prototypes(self) -> Dict[int, int]:
+        """First template index for each level"""
+        prototypes = {}
+        for index, (level, _) in enumerate(self.templates):
+            prototypes.setdefault(level, index)
+        return prototypes
+
+    def _neighbour_scales(self, scale: float) -> List[float]:
+        """The matched scale and the ones either side of it"""
+        position = self.scales.index(scale)
+        return list(self.scales[max(0, position - 1):position + 2])
+
+    def _scaled(self, index: int, scale: float, resolution: float) -> Optional[np.ndarray]:
+        """Template resized to work-image pixels, cached per (index, scale, resolution)"""
+        key = (index, scale, resolution)
+        if key not in self._scaled_cache:
+            template = self.templates[index][1]
+            factor = self.work_width / self.reference_width * scale * resolution
+            width = int(round(template.shape[1] * factor))
+            height = int(round(template.shape[0] * factor))
+            if width < 4 or height < 4:
+                self._scaled_cache[key] = None
+            else:
+                self._scaled_cache[key] = cv2.resize(template, (width, height), interpolation=cv2.INTER_AREA)
+        return self._scaled_cache[key]
+
+    @staticmethod
+    def build_bank(samples: List[Dict], output_path: str, reference_width: int = 1280) -> int:
+        """
+        Build a template bank from labelled screenshots
+
+        Args:
+            samples: Dicts with 'image' (path), 'level' and optional 'box' [x, y, w, h];
+                without a box the whole image is treated as a Town Hall crop and
+                'source_width' gives the width of the screenshot it was cut from
+            output_path: Where to write the .npz bank
+            reference_width: Screenshot width that template pixels are normalized to
+
+        Returns:
+            Number of templates written
+        """
+        arrays = {}
+        levels = []
+
+        for sample in samples:
+            image = cv2.imread(sample['image'], cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                print(f"Skipping unreadable image: {sample['image']}")
+                continue
+
+            box = sample.get('box')
+            if box:
+                x, y, w, h = [int(v) for v in box]
+                crop = image[y:y + h, x:x + w]
+                source_width = image.shape[1]
+            else:
+                crop = image
+                source_width = int(sample.get('source_width', reference_width))
+
+            if crop.size == 0:
+                print(f"Skipping empty crop: {sample['image']}")
+                continue
+
+            factor = reference_width / source_width
+            crop = cv2.resize(crop, (max(1, int(crop.shape[1] * factor)), max(1, int(crop.shape[0] * factor))),
+                              interpolation=cv2.INTER_AREA)
+
+            arrays[f't{len(levels)}'] = crop
+            levels.append(int(sample['level']))
+
+        if not levels:
+            print("No templates built")
+            return 0
+
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+        np.savez_compressed(output_path, levels=np.array(levels, dtype=np.int16),
+                            reference_width=np.array(reference_width), **arrays)
+        print(f"Town Hall bank saved: {output_path} ({len(levels)} templates)")
+        return len(levels)
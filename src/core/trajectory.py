@@ -0,0 +1,98 @@
+"""
+Trajectory - Compression of recorded drag/swipe paths
+"""
+
+import numpy as np
+from typing import List, Sequence
+
+def rdp(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker simplification on the (x, y) columns
+
+    Args:
+        points: Array of shape (N, 3) with columns x, y, t
+        epsilon: Maximum allowed perpendicular deviation in pixels
+
+    Returns:
+        Boolean mask of the points to keep
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if count < 3:
+        return keep
+
+    xy = points[:, :2].astype(np.float64)
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start, end = xy[first], xy[last]
+        segment = end - start
+        length = np.hypot(segment[0], segment[1])
+        inner = xy[first + 1:last] - start
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return keep
+
+def compress_trajectory(path: Sequence[Sequence[float]], epsilon: float = 3.0,
+                        min_interval: float = 1 / 60, max_interval: float = 0.25) -> List[List[float]]:
+    """
+    Compress a drag path to the points needed to reproduce it
+
+    RDP removes points that don't change the shape; time resampling then puts
+    back a point wherever RDP left a gap longer than max_interval (so slow
+    stretches keep their pace) and drops points closer than min_interval
+    (faster than the game can register).
+
+    Args:
+        path: Sequence of [x, y, t] with t in seconds relative to the press
+        epsilon: RDP tolerance in pixels
+        min_interval: Minimum time between kept points
+        max_interval: Maximum time between kept points
+
+    Returns:
+        List of [x, y, t] with integer coordinates
+    """
+    points = np.asarray(path, dtype=np.float64).reshape(-1, 3)
+    if len(points) <= 2:
+        return [[int(round(x)), int(round(y)), round(float(t), 4)] for x, y, t in points]
+
+    keep = rdp(points, epsilon)
+
+    # Re-insert original samples across long time gaps between kept points
+    kept_indices = np.flatnonzero(keep)
+    for first, last in zip(kept_indices[:-1], kept_indices[1:]):
+        next_time = points[first, 2] + max_interval
+        for index in range(first + 1, last):
+            if points[index, 2] >= next_time:
+                keep[index] = True
+                next_time = points[index, 2] + max_interval
+
+    # Drop points that follow too closely, always keeping both endpoints
+    result = []
+    last_time = None
+    kept_indices = np.flatnonzero(keep)
+    for position, index in enumerate(kept_indices):
+        x, y, t = points[index]
+        is_endpoint = position == 0 or position == len(kept_indices) - 1
+        if not is_endpoint and last_time is not None and t - last_time < min_interval:
+            continue
+        result.append([int(round(x)), int(round(y)), round(float(t), 4)])
+        last_time = t
+
+    return result
@@ -0,0 +1,362 @@
+"""
+Vision Worker - Template matching, Town Hall detection and image encoding in separate processes
+"""
+
+import os
+import time
+import queue
+import threading
+import itertools
+import multiprocessing
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+class VisionError(Exception):
+    """A vision request failed in the worker, or the pool is not running"""
+
+class _VisionWorker:
+    """State of one worker process: the Town Hall bank, cached templates and the frame bus"""
+
+    def __init__(self, options: Dict):
+        self.options = options
+        self.frame_bus = None
+        self.templates = {}  # path -> (mtime, BGR template)
+        self.detector = None
+        if options.get('townhall_bank'):
+            from .townhall_detector import TownHallDetector
+            self.detector = TownHallDetector(options['townhall_bank'], min_score=options.get('min_score', 0.55),
+                                             min_margin=options.get('min_margin', 0.05))
+
+    def info(self) -> Dict:
+        return {'pid': os.getpid(), 'townhall_templates': len(self.detector.templates) if self.detector else 0}
+
+    def handle(self, op: str, params: Dict):
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            raise VisionError(f"Unknown vision request '{op}'")
+        return handler(**params)
+
+    def _image(self, image_path: Optional[str] = None, pixels: Optional[np.ndarray] = None,
+               region: Optional[Tuple[int, int, int, int]] = None, max_age: Optional[float] = None):
+        """
+        BGR image of the request's source and its screen origin
+
+        The source is a file, pixels sent with the request (RGB) or, by default,
+        the newest frame on the frame bus - cropped to region if one is given.
+        """
+        if image_path:
+            image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if image is None:
+                raise VisionError(f"Could not read image: {image_path}")
+            origin = (0, 0)
+        elif pixels is not None:
+            image = cv2.cvtColor(np.asarray(pixels), cv2.COLOR_RGB2BGR)
+            origin = (0, 0)
+        else:
+            frame = self._frame(max_age)
+            rgb = frame.crop(tuple(region)) if region else frame.pixels
+            if rgb is None:
+                raise VisionError(f"Frame {frame.region} doesn't cover region {tuple(region)}")
+            image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)  # Copies out of shared memory
+            origin = tuple(region[:2]) if region else frame.region[:2]
+            return image, origin
+
+        if region:
+            x, y, width, height = region
+            image = image[y:y + height, x:x + width]
+            origin = (x, y)
+        return image, origin
+
+    def _frame(self, max_age: Optional[float] = None):
+        if not self.options.get('frame_bus'):
+            raise VisionError("No image given and no frame bus attached")
+        if self.frame_bus is None:
+            from .frame_bus import FrameBusReader
+            self.frame_bus = FrameBusReader(self.options['frame_bus'], track=True)
+        frame = self.frame_bus.latest()
+        max_age = self.options.get('max_frame_age', 0.5) if max_age is None else max_age
+        if frame is None or frame.age > max_age:
+            raise VisionError("No fresh frame on the frame bus")
+        return frame
+
+    def _template(self, template_path: str) -> np.ndarray:
+        mtime = os.path.getmtime(template_path)
+        cached = self.templates.get(template_path)
+        if cached is None or cached[0] != mtime:
+            template = cv2.imread(template_path, cv2.IMREAD_COLOR)
+            if template is None:
+                raise VisionError(f"Could not read template: {template_path}")
+            cached = self.templates[template_path] = (mtime, template)
+        return cached[1]
+
+    def _match(self, image: np.ndarray, template_path: str) -> Tuple[float, Tuple[int, int]]:
+        """Best TM_CCOEFF_NORMED score and the center of the match in image pixels"""
+        template = self._template(template_path)
+        if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+            return -1.0, (0, 0)
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, location = cv2.minMaxLoc(result)
+        return float(score), (location[0] + template.shape[1] // 2, location[1] + template.shape[0] // 2)
+
+    def _op_ping(self) -> Dict:
+        return self.info()
+
+    def _op_match_template(self, template_path: str, threshold: float = 0.8, **source) -> Optional[Dict]:
+        image, (origin_x, origin_y) = self._image(**source)
+        score, (x, y) = self._match(image, template_path)
+        if score < threshold:
+            return None
+        return {'x': origin_x + x, 'y': origin_y + y, 'score': score}
+
+    def _op_classify_screen(self, templates: Dict[str, str], threshold: float = 0.8, **source) -> Dict:
+        """Which of several named screen templates (e.g. 'home', 'battle') matches best"""
+        image, _ = self._image(**source)
+        scores = {name: self._match(image, path)[0] for name, path in templates.items()}
+        best = max(scores, key=scores.get) if scores else None
+        return {'state': best if best is not None and scores[best] >= threshold else None, 'scores': scores}
+
+    def _op_detect_townhall(self, **source) -> Optional[Dict]:
+        if not self.detector or not self.detector.is_available():
+            return None
+        image, _ = self._image(**source)
+        return self.detector.detect(image)
+
+    def _op_save_region(self, path: str, **source) -> str:
+        """Crop and encode an image (PNG, JPEG... by extension) - by default the latest bus frame"""
+        image, _ = self._image(**source)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not cv2.imwrite(path, image):
+            raise VisionError(f"Could not write {path}")
+        return path
+
+    def close(self) -> None:
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+
+def _worker_main(requests, responses, options: Dict) -> None:
+    """Worker process: answer requests until the None sentinel arrives"""
+    if options.get('nice') and hasattr(os, 'nice'):
+        os.nice(options['nice'])  # Lose CPU contention to the input thread, never win it
+    cv2.setNumThreads(options.get('cv_threads', 1))
+    try:
+        worker = _VisionWorker(options)
+    except Exception as e:
+        responses.put((None, 'error', f"{type(e).__name__}: {e}"))
+        return
+    responses.put((None, 'ready', worker.info()))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        request_id, op, params = item
+        try:
+            responses.put((request_id, 'ok', worker.handle(op, params)))
+        except Exception as e:
+            responses.put((request_id, 'error', f"{type(e).__name__}: {e}"))
+    worker.close()
+
+class VisionPool:
+    """
+    Vision work in a pool of worker processes, behind an async request/response API
+
+    CV calls hold the GIL for milliseconds at a time, which delays the
+    thread injecting taps. Running them in other processes keeps the bot
+    process free; callers get a Future and block (GIL released) only if
+    they wait on it. Workers read frames straight from the frame bus, so
+    screenshots never have to be pickled across.
+
+    detect_file() and is_available() make the pool a drop-in
+    townhall_detector for AutoAttacker and VisionService.
+    """
+
+    thread_safe = True  # Callers may submit from any number of threads
+
+    def __init__(self, workers: int = 1, frame_bus: Optional[str] = None, townhall_bank: Optional[str] = None,
+                 min_score: float = 0.55, min_margin: float = 0.05, nice: int = 19, max_frame_age: float = 0.5,
+                 cv_threads: int = 1):
+        """
+        Args:
+            workers: Number of worker processes
+            frame_bus: Name of the frame bus workers read frames from
+            townhall_bank: Town Hall template bank each worker loads
+            min_score, min_margin: Town Hall detector thresholds
+            nice: Priority decrease for the workers (POSIX)
+            max_frame_age: Oldest bus frame (seconds) a request may use
+            cv_threads: OpenCV threads per worker
+        """
+        self.workers = max(1, workers)
+        self.options = {'frame_bus': frame_bus, 'townhall_bank': townhall_bank, 'min_score': min_score,
+                        'min_margin': min_margin, 'nice': nice, 'max_frame_age': max_frame_age,
+                        'cv_threads': cv_threads}
+        self.info = []
+        self._context = multiprocessing.get_context('spawn')  # No fork of a process full of threads
+        self._processes = []
+        self._requests = None
+        self._responses = None
+        self._collector = None
+        self._pending = {}  # request id -> (future, op, submitted)
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {'requests': 0, 'errors': 0, 'busy_time': 0.0, 'max_ms': 0.0, 'ops': {}}
+
+    @property
+    def is_running(self) -> bool:
+        return any(process.is_alive() for process in self._processes)
+
+    def start(self, timeout: float = 60.0) -> bool:
+        """Start the workers and wait until each has loaded its state"""
+        if self.is_running:
+            return True
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        self._processes = [self._context.Process(target=_worker_main, name=f"VisionWorker-{i + 1}",
+                                                 args=(self._requests, self._responses, self.options), daemon=True)
+                           for i in range(self.workers)]
+        for process in self._processes:
+            process.start()
+
+        self.info = []
+        deadline = time.perf_counter() + timeout
+        while len(self.info) < self.workers:
+            try:
+                _, status, payload = self._responses.get(timeout=0.5)
+            except queue.Empty:
+                crashed = [process.name for process in self._processes if process.exitcode is not None]
+                if crashed or time.perf_counter() > deadline:
+                    print(f"Vision workers did not start: {', '.join(crashed) or 'timed out'}")
+                    self.close()
+                    return False
+                continue
+            if status != 'ready':
+                print(f"Vision worker failed to start: {payload}")
+                self.close()
+                return False
+            self.info.append(payload)
+
+        self._collector = threading.Thread(target=self._collect, name="VisionPoolCollector", daemon=True)
+        self._collector.start()
+        print(f"Vision pool started: {self.workers} worker process(es)")
+        return True
+
+    def submit(self, op: str, **params) -> Future:
+        """
+        Queue a request; the Future resolves with the worker's result or a VisionError
+
+        Ops: 'match_template', 'classify_screen', 'detect_townhall', 'save_region', 'ping'.
+        The image comes from image_path=, pixels= (RGB array) or, by default, the
+        latest frame bus frame; region= crops it.
+        """
+        future = Future()
+        if not self.is_running:
+            future.set_exception(VisionError("Vision pool is not running"))
+            return future
+        request_id = next(self._ids)
+        with self.lock:
+            self._pending[request_id] = (future, op, time.perf_counter())
+        self._requests.put((request_id, op, params))
+        return future
+
+    def call(self, op: str, timeout: Optional[float] = 30.0, **params):
+        """submit() and wait for the result"""
+        return self.submit(op, **params).result(timeout)
+
+    def match_template(self, template_path: str, threshold: float = 0.8,
+                       region: Optional[Tuple[int, int, int, int]] = None, **source) -> Future:
+        """Future of {'x', 'y', 'score'} in screen coordinates, or None below threshold"""
+        return self.submit('match_template', template_path=template_path, threshold=threshold,
+                           region=region, **source)
+
+    def classify_screen(self, templates: Dict[str, str], threshold: float = 0.8, **source) -> Future:
+        return self.submit('classify_screen', templates=templates, threshold=threshold, **source)
+
+    def save_region(self, path: str, region: Optional[Tuple[int, int, int, int]] = None, **source) -> Future:
+        return self.submit('save_region', path=path, region=region, **source)
+
+    def is_available(self) -> bool:
+        """Whether Town Hall detection can be used (a worker loaded a template bank)"""
+        return self.is_running and any(info['townhall_templates'] for info in self.info)
+
+    def detect_file(self, image_path: str) -> Optional[Dict]:
+        """TownHallDetector.detect_file, run in a worker"""
+        try:
+            return self.call('detect_townhall', image_path=image_path)
+        except Exception as e:
+            print(f"Town Hall detection failed: {e}")
+            return None
+
+    def _collect(self) -> None:
+        """Resolve futures as responses arrive; fail the pending ones if the workers die"""
+        while True:
+            try:
+                item = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                if not self.is_running:
+                    self._fail_pending("Vision workers exited")
+                    return
+                continue
+            except (EOFError, OSError, ValueError):
+                self._fail_pending("Vision pool closed")
+                return
+            if item is None:
+                return
+            request_id, status, payload = item
+            with self.lock:
+                pending = self._pending.pop(request_id, None)
+                if pending is None:
+                    continue
+                future, op, submitted = pending
+                elapsed = time.perf_counter() - submitted
+                self.stats['requests'] += 1
+                self.stats['busy_time'] += elapsed
+                self.stats['max_ms'] = max(self.stats['max_ms'], elapsed * 1000)
+                self.stats['ops'][op] = self.stats['ops'].get(op, 0) + 1
+                if status != 'ok':
+                    self.stats['errors'] += 1
+            if status == 'ok':
+                future.set_result(payload)
+            else:
+                future.set_exception(VisionError(payload))
+
+    def _fail_pending(self, reason: str) -> None:
+        with self.lock:
+            pending, self._pending = self._pending, {}
+        for future, _, _ in pending.values():
+            if not future.done():
+                future.set_exception(VisionError(reason))
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats, ops=dict(self.stats['ops']), pending=len(self._pending))
+        requests = stats['requests']
+        stats['mean_ms'] = stats.pop('busy_time') / requests * 1000 if requests else 0.0
+        stats['workers'] = sum(process.is_alive() for process in self._processes)
+        return stats
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the workers; requests still pending fail"""
+        if not self._processes:
+            return
+        for _ in self._processes:
+            try:
+                self._requests.put(None)
+            except (OSError, ValueError):
+                pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._collector:
+            self._responses.put(None)
+            self._collector.join(timeout)
+            self._collector = None
+        self._fail_pending("Vision pool closed")
+        self._processes = []
@@ -0,0 +1,372 @@
+"""
+X11 Backend - Window lookup, shared-memory screen capture and XTest input on Linux, via ctypes
+"""
+
+import os
+import sys
+import ctypes
+import ctypes.util
+import threading
+import functools
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .input_backend import InputBackend, InputCommand
+
+Window = ctypes.c_ulong
+Atom = ctypes.c_ulong
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IS_VIEWABLE = 2
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+class X11Error(Exception):
+    """The X server or one of its libraries is unavailable, or refused a request"""
+
+class XImage(ctypes.Structure):
+    _fields_ = [('width', ctypes.c_int), ('height', ctypes.c_int), ('xoffset', ctypes.c_int),
+                ('format', ctypes.c_int), ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int),
+                ('bitmap_unit', ctypes.c_int), ('bitmap_bit_order', ctypes.c_int), ('bitmap_pad', ctypes.c_int),
+                ('depth', ctypes.c_int), ('bytes_per_line', ctypes.c_int), ('bits_per_pixel', ctypes.c_int),
+                ('red_mask', ctypes.c_ulong), ('green_mask', ctypes.c_ulong), ('blue_mask', ctypes.c_ulong),
+                ('obdata', ctypes.c_void_p), ('funcs', ctypes.c_void_p * 6)]
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [('shmseg', ctypes.c_ulong), ('shmid', ctypes.c_int), ('shmaddr', ctypes.c_void_p),
+                ('readOnly', ctypes.c_int)]
+
+class XWindowAttributes(ctypes.Structure):
+    _fields_ = [('x', ctypes.c_int), ('y', ctypes.c_int), ('width', ctypes.c_int), ('height', ctypes.c_int),
+                ('border_width', ctypes.c_int), ('depth', ctypes.c_int), ('visual', ctypes.c_void_p),
+                ('root', Window), ('class_', ctypes.c_int), ('bit_gravity', ctypes.c_int),
+                ('win_gravity', ctypes.c_int), ('backing_store', ctypes.c_int),
+                ('backing_planes', ctypes.c_ulong), ('backing_pixel', ctypes.c_ulong),
+                ('save_under', ctypes.c_int), ('colormap', ctypes.c_ulong), ('map_installed', ctypes.c_int),
+                ('map_state', ctypes.c_int), ('all_event_masks', ctypes.c_long),
+                ('your_event_mask', ctypes.c_long), ('do_not_propagate_mask', ctypes.c_long),
+                ('override_redirect', ctypes.c_int), ('screen', ctypes.c_void_p)]
+
+ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+def _load(name: str) -> ctypes.CDLL:
+    path = ctypes.util.find_library(name)
+    if not path:
+        raise X11Error(f"lib{name} not found")
+    return ctypes.CDLL(path)
+
+def _prototype(lib: ctypes.CDLL, name: str, restype, *argtypes) -> None:
+    function = getattr(lib, name)
+    function.restype = restype
+    function.argtypes = list(argtypes)
+
+@ERROR_HANDLER
+def _error_handler(display, event):
+    return 0
+
+@functools.lru_cache(maxsize=None)
+def _xlib() -> ctypes.CDLL:
+    """libX11 with the prototypes used here, set up for use from several threads"""
+    xlib = _load('X11')
+    p, vp, c_int, c_uint, c_ulong = ctypes.POINTER, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+    _prototype(xlib, 'XInitThreads', c_int)
+    _prototype(xlib, 'XOpenDisplay', vp, ctypes.c_char_p)
+    _prototype(xlib, 'XCloseDisplay', c_int, vp)
+    _prototype(xlib, 'XSetErrorHandler', vp, ERROR_HANDLER)
+    _prototype(xlib, 'XDefaultScreen', c_int, vp)
+    _prototype(xlib, 'XRootWindow', Window, vp, c_int)
+    _prototype(xlib, 'XDisplayWidth', c_int, vp, c_int)
+    _prototype(xlib, 'XDisplayHeight', c_int, vp, c_int)
+    _prototype(xlib, 'XDefaultVisual', vp, vp, c_int)
+    _prototype(xlib, 'XDefaultDepth', c_int, vp, c_int)
+    _prototype(xlib, 'XFree', c_int, vp)
+    _prototype(xlib, 'XFlush', c_int, vp)
+    _prototype(xlib, 'XSync', c_int, vp, c_int)
+    _prototype(xlib, 'XQueryTree', c_int, vp, Window, p(Window), p(Window), p(p(Window)), p(c_uint))
+    _prototype(xlib, 'XFetchName', c_int, vp, Window, p(ctypes.c_char_p))
+    _prototype(xlib, 'XInternAtom', Atom, vp, ctypes.c_char_p, c_int)
+    _prototype(xlib, 'XGetWindowProperty', c_int, vp, Window, Atom, ctypes.c_long, ctypes.c_long, c_int, Atom,
+               p(Atom), p(c_int), p(c_ulong), p(c_ulong), p(p(ctypes.c_ubyte)))
+    _prototype(xlib, 'XGetWindowAttributes', c_int, vp, Window, p(XWindowAttributes))
+    _prototype(xlib, 'XTranslateCoordinates', c_int, vp, Window, Window, c_int, c_int, p(c_int), p(c_int),
+               p(Window))
+    _prototype(xlib, 'XQueryPointer', c_int, vp, Window, p(Window), p(Window), p(c_int), p(c_int), p(c_int),
+               p(c_int), p(c_uint))
+    _prototype(xlib, 'XGetImage', p(XImage), vp, c_ulong, c_int, c_int, c_uint, c_uint, c_ulong, c_int)
+    xlib.XInitThreads()
+    # The default handler exits the process - e.g. when a window closes while the tree is walked
+    xlib.XSetErrorHandler(_error_handler)
+    return xlib
+
+@functools.lru_cache(maxsize=None)
+def _xext() -> ctypes.CDLL:
+    xext = _load('Xext')
+    p, vp, c_int, c_uint = ctypes.POINTER, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint
+    _prototype(xext, 'XShmQueryExtension', c_int, vp)
+    _prototype(xext, 'XShmCreateImage', p(XImage), vp, vp, c_uint, c_int, vp, p(XShmSegmentInfo), c_uint, c_uint)
+    _prototype(xext, 'XShmAttach', c_int, vp, p(XShmSegmentInfo))
+    _prototype(xext, 'XShmDetach', c_int, vp, p(XShmSegmentInfo))
+    _prototype(xext, 'XShmGetImage', c_int, vp, Window, p(XImage), c_int, c_int, ctypes.c_ulong)
+    return xext
+
+@functools.lru_cache(maxsize=None)
+def _xtst() -> ctypes.CDLL:
+    xtst = _load('Xtst')
+    p, vp, c_int, c_uint, c_ulong = ctypes.POINTER, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+    _prototype(xtst, 'XTestQueryExtension', c_int, vp, p(c_int), p(c_int), p(c_int), p(c_int))
+    _prototype(xtst, 'XTestFakeMotionEvent', c_int, vp, c_int, c_int, c_int, c_ulong)
+    _prototype(xtst, 'XTestFakeButtonEvent', c_int, vp, c_uint, c_int, c_ulong)
+    return xtst
+
+@functools.lru_cache(maxsize=None)
+def _libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _prototype(libc, 'shmget', ctypes.c_int, ctypes.c_int, ctypes.c_size_t, ctypes.c_int)
+    _prototype(libc, 'shmat', ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+    _prototype(libc, 'shmdt', ctypes.c_int, ctypes.c_void_p)
+    _prototype(libc, 'shmctl', ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_void_p)
+    return libc
+
+def x11_available() -> bool:
+    """Whether this is a Linux session with an X display (including Xvfb) and libX11"""
+    if not sys.platform.startswith('linux') or not os.environ.get('DISPLAY'):
+        return False
+    try:
+        _xlib()
+        return True
+    except (X11Error, OSError):
+        return False
+
+class X11Display:
+    """One connection to the X server: screen size, pointer position and window lookup"""
+
+    def __init__(self, display_name: Optional[str] = None):
+        """
+        Args:
+            display_name: e.g. ':99'; None uses $DISPLAY
+        """
+        self.xlib = _xlib()
+        self.display = self.xlib.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise X11Error(f"Cannot open X display {display_name or os.environ.get('DISPLAY')}")
+        self.screen = self.xlib.XDefaultScreen(self.display)
+        self.root = self.xlib.XRootWindow(self.display, self.screen)
+        self.lock = threading.RLock()
+        self._net_wm_name = self.xlib.XInternAtom(self.display, b"_NET_WM_NAME", 0)
+        self._utf8_string = self.xlib.XInternAtom(self.display, b"UTF8_STRING", 0)
+
+    def screen_size(self) -> Tuple[int, int]:
+        return (self.xlib.XDisplayWidth(self.display, self.screen),
+                self.xlib.XDisplayHeight(self.display, self.screen))
+
+    def pointer_position(self) -> Tuple[int, int]:
+        root, child = Window(), Window()
+        root_x, root_y, window_x, window_y = (ctypes.c_int() for _ in range(4))
+        mask = ctypes.c_uint()
+        with self.lock:
+            self.xlib.XQueryPointer(self.display, self.root, ctypes.byref(root), ctypes.byref(child),
+                                    ctypes.byref(root_x), ctypes.byref(root_y), ctypes.byref(window_x),
+                                    ctypes.byref(window_y), ctypes.byref(mask))
+        return root_x.value, root_y.value
+
+    def _children(self, window: int) -> List[int]:
+        root, parent = Window(), Window()
+        children = ctypes.POINTER(Window)()
+        count = ctypes.c_uint()
+        if not self.xlib.XQueryTree(self.display, window, ctypes.byref(root), ctypes.byref(parent),
+                                    ctypes.byref(children), ctypes.byref(count)):
+            return []
+        result = [children[i] for i in range(count.value)]
+        if children:
+            self.xlib.XFree(children)
+        return result
+
+    def window_title(self, window: int) -> str:
+        """_NET_WM_NAME (UTF-8), falling back to WM_NAME"""
+        actual_type, actual_format = Atom(), ctypes.c_int()
+        items, remaining = ctypes.c_ulong(), ctypes.c_ulong()
+        value = ctypes.POINTER(ctypes.c_ubyte)()
+        if self.xlib.XGetWindowProperty(self.display, window, self._net_wm_name, 0, 1024, 0, self._utf8_string,
+                                        ctypes.byref(actual_type), ctypes.byref(actual_format),
+                                        ctypes.byref(items), ctypes.byref(remaining), ctypes.byref(value)) == 0:
+            if value:
+                title = ctypes.string_at(value, items.value).decode('utf-8', 'replace')
+                self.xlib.XFree(value)
+                if title:
+                    return title
+
+        name = ctypes.c_char_p()
+        if self.xlib.XFetchName(self.display, window, ctypes.byref(name)) and name.value is not None:
+            title = name.value.decode('latin-1')
+            self.xlib.XFree(ctypes.cast(name, ctypes.c_void_p))
+            return title
+        return ""
+
+    def window_bounds(self, window: int) -> Optional[Tuple[int, int, int, int]]:
+        """(x, y, width, height) on the root window, or None if the window is gone or unmapped"""
+        attributes = XWindowAttributes()
+        with self.lock:
+            if not self.xlib.XGetWindowAttributes(self.display, window, ctypes.byref(attributes)):
+                return None
+            if attributes.map_state != IS_VIEWABLE:
+                return None
+            x, y, child = ctypes.c_int(), ctypes.c_int(), Window()
+            self.xlib.XTranslateCoordinates(self.display, window, self.root, 0, 0, ctypes.byref(x),
+                                            ctypes.byref(y), ctypes.byref(child))
+        return (x.value, y.value, attributes.width, attributes.height)
+
+    def list_windows(self) -> List[Tuple[int, str, Tuple[int, int, int, int]]]:
+        """(window, title, bounds) of every visible, titled window, top-level ones first"""
+        windows = []
+        with self.lock:
+            pending = self._children(self.root)
+            while pending:
+                window = pending.pop(0)
+                title = self.window_title(window)
+                if title:
+                    bounds = self.window_bounds(window)
+                    if bounds:
+                        windows.append((window, title, bounds))
+                        continue  # A titled window's children are its contents, not other windows
+                pending.extend(self._children(window))
+        return windows
+
+    def close(self) -> None:
+        if self.display:
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+@functools.lru_cache(maxsize=None)
+def default_display() -> X11Display:
+    """Process-wide connection for screen size and pointer queries"""
+    return X11Display()
+
+class X11Capture:
+    """
+    Region capture from the root window
+
+    Uses the MIT-SHM extension when the server supports it: the server
+    copies pixels straight into a shared-memory segment, which is kept and
+    reused for each region size. Otherwise falls back to plain XGetImage.
+    """
+
+    max_cached_images = 8
+
+    def __init__(self, display: Optional[X11Display] = None):
+        self.x11 = display or X11Display()
+        self.xlib = self.x11.xlib
+        try:
+            self.xext = _xext()
+            self.use_shm = bool(self.xext.XShmQueryExtension(self.x11.display))
+        except (X11Error, OSError):
+            self.xext = None
+            self.use_shm = False
+        self._images = OrderedDict()  # (width, height) -> (XImage pointer, XShmSegmentInfo)
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """Region (x, y, width, height) - or the whole screen - as an RGB array, clipped to the screen"""
+        screen_width, screen_height = self.x11.screen_size()
+        x, y, width, height = region or (0, 0, screen_width, screen_height)
+        left, top = max(x, 0), max(y, 0)
+        width, height = min(x + width, screen_width) - left, min(y + height, screen_height) - top
+        if width <= 0 or height <= 0:
+            return np.zeros((0, 0, 3), dtype=np.uint8)
+
+        with self.x11.lock:
+            if self.use_shm:
+                image = self._shm_image(width, height)
+                if not self.xext.XShmGetImage(self.x11.display, self.x11.root, image, left, top, ALL_PLANES):
+                    raise X11Error(f"XShmGetImage failed for {(left, top, width, height)}")
+                return self._to_rgb(image.contents)
+
+            image = self.xlib.XGetImage(self.x11.display, self.x11.root, left, top, width, height,
+                                        ALL_PLANES, ZPIXMAP)
+            if not image:
+                raise X11Error(f"XGetImage failed for {(left, top, width, height)}")
+            try:
+                return self._to_rgb(image.contents)
+            finally:
+                self.xlib.XFree(image.contents.data)
+                self.xlib.XFree(image)
+
+    def _shm_image(self, width: int, height: int):
+        key = (width, height)
+        if key in self._images:
+            self._images.move_to_end(key)
+            return self._images[key][0]
+
+        libc = _libc()
+        info = XShmSegmentInfo()
+        x11 = self.x11
+        visual = self.xlib.XDefaultVisual(x11.display, x11.screen)
+        depth = self.xlib.XDefaultDepth(x11.display, x11.screen)
+        image = self.xext.XShmCreateImage(x11.display, visual, depth, ZPIXMAP, None, ctypes.byref(info),
+                                          width, height)
+        if not image:
+            raise X11Error("XShmCreateImage failed")
+        info.shmid = libc.shmget(IPC_PRIVATE, image.contents.bytes_per_line * height, IPC_CREAT | 0o600)
+        if info.shmid < 0:
+            self.xlib.XFree(image)
+            raise X11Error(f"shmget failed: {os.strerror(ctypes.get_errno())}")
+        address = libc.shmat(info.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            libc.shmctl(info.shmid, IPC_RMID, None)
+            self.xlib.XFree(image)
+            raise X11Error(f"shmat failed: {os.strerror(ctypes.get_errno())}")
+        info.shmaddr = image.contents.data = address
+        self.xext.XShmAttach(x11.display, ctypes.byref(info))
+        self.xlib.XSync(x11.display, 0)
+        libc.shmctl(info.shmid, IPC_RMID, None)  # Freed once both sides detach, even if we crash
+
+        self._images[key] = (image, info)
+        if len(self._images) > self.max_cached_images:
+            self._release(*self._images.popitem(last=False)[1])
+        return image
+
+    def _release(self, image, info: XShmSegmentInfo) -> None:
+        self.xext.XShmDetach(self.x11.display, ctypes.byref(info))
+        self.xlib.XSync(self.x11.display, 0)
+        _libc().shmdt(info.shmaddr)
+        self.xlib.XFree(image)
+
+    def _to_rgb(self, image: XImage) -> np.ndarray:
+        """Copy a 32 bpp ZPixmap XImage out as RGB"""
+        if image.bits_per_pixel != 32 or (image.red_mask, image.green_mask, image.blue_mask) != \
+                (0xFF0000, 0xFF00, 0xFF):
+            raise X11Error(f"Unsupported X visual: {image.bits_per_pixel} bpp, red mask {image.red_mask:#x}")
+        buffer = (ctypes.c_ubyte * (image.bytes_per_line * image.height)).from_address(image.data)
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(image.height, image.bytes_per_line)
+        pixels = pixels[:, :image.width * 4].reshape(image.height, image.width, 4)
+        # LSBFirst stores pixels as B, G, R, X; MSBFirst as X, R, G, B
+        return pixels[..., [2, 1, 0]] if image.byte_order == 0 else pixels[..., [1, 2, 3]]
+
+    def close(self) -> None:
+        with self.x11.lock:
+            while self._images:
+                self._release(*self._images.popitem()[1])
+
+class XTestInputBackend(InputBackend):
+    """XTest fake pointer events on its own X connection, flushed once per batch"""
+
+    name = "xtest"
+
+    def __init__(self, display_name: Optional[str] = None):
+        self.x11 = X11Display(display_name)
+        self.xtst = _xtst()
+        dummy = [ctypes.c_int() for _ in range(4)]
+        if not self.xtst.XTestQueryExtension(self.x11.display, *(ctypes.byref(value) for value in dummy)):
+            raise X11Error("The X server has no XTEST extension")
+
+    def send(self, commands: Sequence[InputCommand]) -> None:
+        display, xtst = self.x11.display, self.xtst
+        with self.x11.lock:
+            for command in commands:
+                xtst.XTestFakeMotionEvent(display, -1, command.x, command.y, 0)
+                if command.kind in ('down', 'up'):
+                    xtst.XTestFakeButtonEvent(display, BUTTONS.get(command.button, 1), command.kind == 'down', 0)
+            self.x11.xlib.XFlush(display)
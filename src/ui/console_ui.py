@@ -7,6 +7,7 @@ import os
 import time
 from typing import Optional
 from ..bot_controller import BotController
+from ..core.recording_optimizer import format_report
 
 class ConsoleUI:
     """Console-based user interface for the COC Attack Bot"""
@@ -107,7 +108,8 @@ class ConsoleUI:
             print("3. Stop Auto Attack")
             print("4. View Statistics")
             print("5. Configure Required Buttons")
-            print("6. Back to main menu")
+            print("6. Multi-Instance")
+            print("7. Back to main menu")
             print("=" * 40)
             
             choice = input("Enter your choice: ").strip()
@@ -123,6 +125,43 @@ class ConsoleUI:
             elif choice == '5':
                 self.configure_auto_attack_buttons()
             elif choice == '6':
+                self.multi_instance_menu()
+            elif choice == '7':
+                break
+            else:
+                print("Invalid choice.")
+    
+    def multi_instance_menu(self) -> None:
+        """Run the auto attacker on several emulator instances at once"""
+        while True:
+            print("\n" + "=" * 40)
+            print("       MULTI-INSTANCE")
+            print("=" * 40)
+            status = self.bot.get_instance_status()
+            if status:
+                for instance in status:
+                    state = "RUNNING" if instance['is_running'] else "STOPPED"
+                    print(f"{instance['name']:<12} {state:<8} attacks: {instance['total_attacks']} "
+                          f"(success {instance['success_rate']:.0f}%)  input: {instance['input_backend']}")
+            else:
+                print("No instances loaded (configure orchestrator.instances in config)")
+            print("=" * 40)
+            print("1. Start all instances")
+            print("2. Stop all instances")
+            print("3. Refresh status")
+            print("4. Back")
+            print("=" * 40)
+            
+            choice = input("Enter your choice: ").strip()
+            
+            if choice == '1':
+                started = self.bot.start_instances()
+                print(f"Started {started} instance(s). Emergency stop for all: Ctrl+Alt+S")
+            elif choice == '2':
+                self.bot.stop_instances()
+            elif choice == '3':
+                continue
+            elif choice == '4':
                 break
             else:
                 print("Invalid choice.")
@@ -277,6 +316,33 @@ class ConsoleUI:
         print(f"Attacks/Hour: {stats['attacks_per_hour']:.1f}")
         print(f"Last Attack: {stats['last_attack']}")
         print(f"Configured Sessions: {', '.join(stats['configured_sessions'])}")
+        
+        usage = stats.get('ai_usage')
+        if usage:
+            quota = usage['quota']
+            print("-" * 50)
+            print("AI Usage:")
+            for key in ('calls_per_hour', 'calls_per_day', 'tokens_per_hour', 'tokens_per_day'):
+                limit = quota[key]['limit']
+                print(f"  {key.replace('_', ' ').title()}: {quota[key]['used']:,} / {limit:,}" if limit
+                      else f"  {key.replace('_', ' ').title()}: {quota[key]['used']:,} (no limit)")
+            print(f"  Budget Pressure: {quota['pressure']:.0%}")
+            print(f"  Requests: {usage['requests']} | Budget Skips: {usage['budget_skips']} | "
+                  f"Throttle Timeouts: {usage['throttle_timeouts']} | 429s: {usage['rate_limited']}")
+            print(f"  Parse Failures: {usage['parse_failures']} ({usage['parse_failure_rate']:.1%}) | "
+                  f"Repaired Responses: {usage['parse_repairs']}")
+        
+        video = stats.get('session_video')
+        if video:
+            print("-" * 50)
+            print(f"Session Video: {'RUNNING' if video['running'] else 'STOPPED'}"
+                  + (f" - {video['error']}" if video.get('error') else ""))
+            print(f"  Frames: {video.get('frames_written', 0)} at {video['target_fps']:g} fps | "
+                  f"Dropped: {video.get('dropped', 0)} | Repeated: {video.get('repeated', 0)}")
+            print(f"  Encoder: {video['encode_fps']:.0f} frames/s capacity, {video['mean_encode_ms']:.1f} ms mean, "
+                  f"{video.get('max_encode_ms', 0.0):.1f} ms max")
+            print(f"  Segments: {video.get('segments', 0)} ({video.get('deleted_segments', 0)} deleted for space) | "
+                  f"Disk: {video.get('disk_mb', 0.0):.1f} MB")
         print("=" * 50)
         
         input("\nPress Enter to continue...")
@@ -364,7 +430,8 @@ class ConsoleUI:
             print("3. View recording info")
             print("4. Delete recording")
             print("5. Toggle auto-detection")
-            print("6. Back to main menu")
+            print("6. Optimize recording")
+            print("7. Back to main menu")
             print("=" * 40)
             
             choice = input("Enter your choice: ").strip()
@@ -421,6 +488,16 @@ class ConsoleUI:
                     print("⚠️ You must use F6 to manually record each click during sessions")
             
             elif choice == '6':
+                session_name = input("Enter session name to optimize: ").strip()
+                if session_name:
+                    report = self.bot.optimize_recording(session_name)
+                    if report:
+                        print(f"\n=== OPTIMIZED: {report['session_name']} ===")
+                        print(format_report(report))
+                    else:
+                        print("Could not optimize session.")
+            
+            elif choice == '7':
                 break
             else:
                 print("Invalid choice.")
@@ -435,7 +512,8 @@ class ConsoleUI:
             print("2. Preview recording")
             print("3. Validate recording")
             print("4. Set playback speed")
-            print("5. Back to main menu")
+            print("5. Playback history")
+            print("6. Back to main menu")
             print("=" * 40)
             
             choice = input("Enter your choice: ").strip()
@@ -499,6 +577,23 @@ class ConsoleUI:
                     print("Invalid speed value.")
             
             elif choice == '5':
+                history = self.bot.attack_player.get_playback_history()
+                if not history:
+                    print("No playbacks yet.")
+                    continue
+                
+                print(f"\n=== LAST {len(history)} PLAYBACKS ===")
+                for run in reversed(history):
+                    timing = run['timing'] or {}
+                    print(f"{run['started'][:19]}  {run['session_name']} @ {run['speed']}x - {run['outcome']}")
+                    print(f"  Actions: {run['actions_played']}/{run['total_actions']}  "
+                          f"p95 late: {timing.get('p95_ms', 0):.1f}ms  max: {run['max_lateness_ms']:.1f}ms")
+                    problems = {status: count for status, count in run['statuses'].items()
+                                if status not in ('ok', 'batched', 'confirmed')}
+                    if problems:
+                        print("  " + ", ".join(f"{status}: {count}" for status, count in problems.items()))
+            
+            elif choice == '6':
                 break
             else:
                 print("Invalid choice.")
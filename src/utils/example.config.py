@@ -66,6 +66,30 @@ class Config:
                     "emergency_stop": "esc"
                 }
             },
+            "capture": {
+                "backend": "auto",  # auto (win32 on Windows, x11 on Linux with an X display or Xvfb), win32, x11 or pyautogui
+                "frame_bus": {
+                    "enabled": False,  # One capture thread publishes frames to shared memory for every consumer
+                    "name": "coc_frames",  # Shared memory name other processes attach to
+                    "fps": 10,
+                    "slots": 4,
+                    "region": None,  # [x, y, width, height]; None follows the game window
+                    "max_age": 0.5  # Seconds a frame may be old and still replace a screenshot
+                }
+            },
+            "input": {
+                "backend": "auto"  # auto (SendInput on Windows, XTest under X11), sendinput, xtest, pyautogui or virtual
+            },
+            "playback": {
+                "verify": {
+                    "enabled": False,  # Check troop selections on screen and skip deploys from empty slots
+                    "budget_ms": 40,  # Longest a single check may take
+                    "troop_bar_fraction": 0.15,  # Bottom part of the game window holding the troop bar
+                    "change_threshold": 12.0,
+                    "empty_saturation": 20.0,
+                    "max_retries": 1
+                }
+            },
             "game": {
                 "window_titles": [
                     "Clash of Clans",
@@ -81,9 +105,71 @@ class Config:
             "ai_analyzer": {
                 "google_gemini_api_key": "AIzaSyC5tOcA2HA20BvrDMLlS7UDyFuT",
                 "enabled": False,
+                "base_url": "",  # Override the Gemini endpoint (e.g. a local mock server)
                 "min_gold": 300000,
                 "min_elixir": 300000,
-                "min_dark_elixir": 2000
+                "min_dark_elixir": 2000,
+                "rate_limit": {
+                    "requests_per_minute": 15,
+                    "burst": 3,
+                    "max_wait_seconds": 20,
+                    "cooldown_on_429": 30,  # Pause after the API returns 429
+                    "calls_per_hour": 0,  # 0 = unlimited
+                    "calls_per_day": 1000,
+                    "tokens_per_hour": 0,
+                    "tokens_per_day": 0,
+                    "pressure_threshold": 0.8  # Above this budget use, only promising bases are analyzed
+                }
+            },
+            "recording_optimizer": {
+                "min_gaps": {  # Longer pauses before each action type are cut down to these (seconds)
+                    "click": 0.08,
+                    "hold": 0.15,
+                    "drag": 0.15,
+                    "move": 0.0
+                },
+                "merge_radius": 8,  # pixels
+                "merge_window": 0.3,  # Taps on one spot closer together than this are merged
+                "keep_delays": True
+            },
+            "auto_attacker": {
+                "max_townhall_level": 12
+            },
+            "adb": {
+                "enabled": False,  # Capture and input through ADB instead of the desktop (emulators)
+                "host": "127.0.0.1",
+                "port": 5037,
+                "serial": "",  # Empty uses the only connected device
+                "gestures": "swipe"  # "motionevent" plays holds and drags in real time (Android 10+)
+            },
+            "orchestrator": {
+                # One entry per emulator instance, e.g.
+                # {"name": "bs1", "window_title": "BlueStacks 1", "input_backend": "window",
+                #  "coordinates": "coordinates/bs1.json", "attack_sessions": ["my_attack"]}
+                # or over ADB (uses the adb host/port above): {"name": "bs2", "adb_serial": "emulator-5556"}
+                "instances": [],
+                "max_concurrent_ai": 2,  # AI calls in flight at once across all instances
+                "start_stagger_seconds": 5
+            },
+            "townhall_detector": {
+                "enabled": True,  # Only active once templates/townhall_bank.npz has been built
+                "bank_path": "templates/townhall_bank.npz",
+                "min_score": 0.55,
+                "min_margin": 0.05  # Required lead of the best level over the runner-up
+            },
+            "vision_workers": {
+                "enabled": False,  # Town Hall detection, template matching and screenshot encoding in separate processes
+                "workers": 1,
+                "nice": 19  # Lowest worker priority (Linux/macOS) so taps always win the CPU
+            },
+            "session_video": {
+                "enabled": False,  # Video of searches and battles, encoded in a separate process (needs capture.frame_bus)
+                "directory": "videos",
+                "fps": 4,  # Frames sampled from the frame bus per second
+                "scale": 0.5,  # Resize before encoding
+                "codec": "MJPG",  # MJPG (.avi) is cheapest; mp4v writes .mp4
+                "segment_seconds": 120,
+                "max_disk_mb": 1000  # Oldest segments are deleted beyond this
             }
         }
     
@@ -0,0 +1,291 @@
+"""
+Mock ADB Server - Local stand-in for an ADB server with one or more fake devices
+
+Speaks the parts of the ADB smart-socket protocol used by AdbDevice
+(host:devices, transport selection, one-shot and interactive shell, and the
+framebuffer service), so capture and input can be exercised without an
+emulator. Every shell command a device receives is recorded.
+"""
+
+import re
+import time
+import struct
+import threading
+import socketserver
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TAP_PATTERN = re.compile(r"input tap (\d+) (\d+)")
+SWIPE_PATTERN = re.compile(r"input swipe (\d+) (\d+) (\d+) (\d+)(?: (\d+))?")
+
+class MockDevice:
+    """A fake device: a screen to capture and a log of the commands it was sent"""
+
+    def __init__(self, serial: str, width: int = 1280, height: int = 720,
+                 frame_provider: Optional[Callable[[], np.ndarray]] = None, input_delay: float = 0.0):
+        """
+        Args:
+            input_delay: Seconds each 'input' command takes to run, like app_process start-up on a
+                real device (swipes also take their duration) - 0 runs them instantly
+        """
+        self.serial = serial
+        self.width = width
+        self.height = height
+        self.frame_provider = frame_provider
+        self.input_delay = input_delay
+        self.frames_served = 0
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def frame(self) -> np.ndarray:
+        """RGB frame - by default a gradient that shifts on every capture"""
+        if self.frame_provider:
+            return self.frame_provider()
+        x = np.arange(self.width, dtype=np.uint16)
+        y = np.arange(self.height, dtype=np.uint16)[:, None]
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + self.frames_served) % 256
+        frame[..., 1] = y % 256
+        frame[..., 2] = (x + y) // 8 % 256
+        return frame
+
+    def record(self, command: str) -> None:
+        with self.lock:
+            self.commands.append((time.perf_counter(), command))
+
+    def get_commands(self) -> List[Tuple[float, str]]:
+        with self.lock:
+            return list(self.commands)
+
+    def get_taps(self) -> List[Tuple[int, int]]:
+        """Positions of every 'input tap' received"""
+        return [(int(match.group(1)), int(match.group(2)))
+                for _, command in self.get_commands() for match in [TAP_PATTERN.fullmatch(command)] if match]
+
+    def get_swipes(self) -> List[Tuple[int, int, int, int, int]]:
+        """(x1, y1, x2, y2, duration_ms) of every 'input swipe' received"""
+        swipes = []
+        for _, command in self.get_commands():
+            match = SWIPE_PATTERN.fullmatch(command)
+            if match:
+                swipes.append(tuple(int(value or 300) for value in match.groups()))
+        return swipes
+
+class MockAdbServer:
+    """Threaded TCP server answering ADB client requests for a set of MockDevices"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, devices: Optional[List] = None,
+                 latency: float = 0.0):
+        """
+        Args:
+            host, port: Address to listen on (port 0 picks a free one)
+            devices: MockDevice objects or serials (1280x720 devices are created for serials)
+            latency: Seconds added before each reply, to mimic a slow device
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.devices: Dict[str, MockDevice] = {}
+        for device in devices or ["emulator-5554"]:
+            self.add_device(device if isinstance(device, MockDevice) else MockDevice(device))
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def add_device(self, device: MockDevice) -> MockDevice:
+        self.devices[device.serial] = device
+        return device
+
+    def get_device(self, serial: str) -> MockDevice:
+        return self.devices[serial]
+
+    def start(self) -> Tuple[str, int]:
+        """Start serving in a background thread and return (host, port)"""
+        if self._server:
+            return self.host, self.port
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.host, self.port
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def get_requests(self) -> List[str]:
+        with self.lock:
+            return list(self.requests)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                device = None
+                try:
+                    while True:
+                        request = self._read_request()
+                        if request is None:
+                            return
+                        with server.lock:
+                            server.requests.append(request)
+                        if server.latency:
+                            time.sleep(server.latency)
+
+                        if request == "host:version":
+                            self._okay(self._message("0029"))
+                            return
+                        if request == "host:devices":
+                            listing = "".join(f"{serial}\tdevice\n" for serial in server.devices)
+                            self._okay(self._message(listing))
+                            return
+                        if request.startswith("host:transport"):
+                            device = self._select(request)
+                            if device is None:
+                                return
+                            self._okay()
+                            continue  # The service request follows on this connection
+                        if device is None:
+                            self._fail(f"unknown request {request}")
+                            return
+                        if request == "framebuffer:":
+                            self._okay(self._framebuffer(device))
+                            return
+                        if request == "shell:":
+                            self._okay()
+                            self._interactive_shell(device)
+                            return
+                        if request.startswith("shell:"):
+                            self._okay(self._run(device, request[len("shell:"):]).encode('utf-8'))
+                            return
+                        self._fail(f"unsupported service {request}")
+                        return
+                except (ConnectionError, OSError):
+                    return
+
+            def _read_exact(self, size: int) -> Optional[bytes]:
+                data = b""
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+            def _read_request(self) -> Optional[str]:
+                length = self._read_exact(4)
+                if length is None:
+                    return None
+                payload = self._read_exact(int(length, 16))
+                return payload.decode('utf-8') if payload is not None else None
+
+            def _message(self, text: str) -> bytes:
+                data = text.encode('utf-8')
+                return b"%04x" % len(data) + data
+
+            def _okay(self, body: bytes = b"") -> None:
+                self.request.sendall(b"OKAY" + body)
+
+            def _fail(self, reason: str) -> None:
+                self.request.sendall(b"FAIL" + self._message(reason))
+
+            def _select(self, request: str) -> Optional[MockDevice]:
+                if request == "host:transport-any":
+                    if len(server.devices) != 1:
+                        self._fail("more than one device/emulator" if server.devices else "no devices/emulators found")
+                        return None
+                    return next(iter(server.devices.values()))
+                serial = request.split(':', 2)[2]
+                if serial not in server.devices:
+                    self._fail(f"device '{serial}' not found")
+                    return None
+                return server.devices[serial]
+
+            def _framebuffer(self, device: MockDevice) -> bytes:
+                """Version 1 header (32 bpp RGBA) followed by the pixels"""
+                frame = device.frame()
+                height, width = frame.shape[:2]
+                rgba = np.empty((height, width, 4), dtype=np.uint8)
+                rgba[..., :3] = frame
+                rgba[..., 3] = 255
+                device.frames_served += 1
+                header = struct.pack('<13I', 1, 32, rgba.nbytes, width, height, 0, 8, 16, 8, 8, 8, 24, 8)
+                return header + rgba.tobytes()
+
+            def _run(self, device: MockDevice, command: str) -> str:
+                """Shell command line - ';'-separated commands run in order"""
+                output = ""
+                for part in (part.strip() for part in command.split(';')):
+                    if not part:
+                        continue
+                    if part.startswith("echo "):
+                        output += part[len("echo "):] + "\n"
+                        continue
+                    device.record(part)
+                    if part == "wm size":
+                        output += f"Physical size: {device.width}x{device.height}\n"
+                    elif part.startswith("input ") and device.input_delay:
+                        swipe = SWIPE_PATTERN.fullmatch(part)
+                        time.sleep(device.input_delay + (int(swipe.group(5) or 300) / 1000 if swipe else 0))
+                return output
+
+            def _interactive_shell(self, device: MockDevice) -> None:
+                """Read command lines until the client hangs up"""
+                buffer = b""
+                while True:
+                    chunk = self.request.recv(4096)
+                    if not chunk:
+                        return
+                    buffer += chunk
+                    while b"\n" in buffer:
+                        line, buffer = buffer.split(b"\n", 1)
+                        output = self._run(device, line.decode('utf-8', 'replace'))
+                        self.request.sendall(line + b"\r\n" + output.encode('utf-8'))
+
+        return Handler
+
+def main():
+    """Run the mock ADB server in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock ADB server with fake devices")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5037)
+    parser.add_argument("--devices", nargs="+", default=["emulator-5554"], help="Device serials")
+    parser.add_argument("--size", default="1280x720", help="Screen size of every device, WIDTHxHEIGHT")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added before each reply")
+    parser.add_argument("--input-delay", type=float, default=0.0,
+                        help="Seconds each input command takes on the device (real devices: ~0.1-0.5)")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    devices = [MockDevice(serial, width, height, input_delay=args.input_delay) for serial in args.devices]
+    server = MockAdbServer(args.host, args.port, devices, latency=args.latency)
+    host, port = server.start()
+    print(f"Mock ADB server listening on {host}:{port} with {', '.join(args.devices)}")
+    print("Press Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for device in devices:
+            print(f"{device.serial}: {len(device.get_commands())} commands, {device.frames_served} frames")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Mock Gemini Server - Local stand-in for the Gemini generateContent API
+
+Serves the request/response shapes used by AIAnalyzer so analysis, retries and
+throughput can be exercised without an API key or network access.
+"""
+
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urlparse, parse_qs
+
+FAULT_KINDS = ('429', '500', 'malformed', 'markdown')
+
+class LatencyModel:
+    """Seeded latency distribution parsed from a spec like 'uniform:0.1,0.5'"""
+
+    def __init__(self, spec: Optional[str] = None, seed: int = 0):
+        self.spec = spec or "fixed:0"
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        kind, _, params = self.spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(',') if p.strip()]
+
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec: {self.spec}")
+
+    def sample(self) -> float:
+        """Draw one latency in seconds (never negative)"""
+        with self.lock:
+            if self.kind == 'fixed':
+                value = self.params[0]
+            elif self.kind == 'uniform':
+                value = self.rng.uniform(self.params[0], self.params[1])
+            elif self.kind == 'normal':
+                value = self.rng.gauss(self.params[0], self.params[1])
+            else:
+                value = self.rng.lognormvariate(self.params[0], self.params[1])
+        return max(0.0, value)
+
+class MockGeminiServer:
+    """Threaded HTTP server implementing generateContent and streamGenerateContent"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 responses: Optional[List[Union[str, Dict]]] = None,
+                 responder: Optional[Callable[[Dict], Union[str, Dict]]] = None,
+                 latency: Optional[str] = None, faults: Optional[Dict[str, float]] = None,
+                 fault_sequence: Optional[List[Optional[str]]] = None, seed: int = 0,
+                 model: str = "mock-gemini"):
+        self.host = host
+        self.port = port
+        self.model = model
+        self.responses = list(responses or [])
+        self.responder = responder or default_responder
+        self.latency = LatencyModel(latency, seed)
+        self.faults = dict(faults or {})
+        self.fault_sequence = list(fault_sequence or [])
+        self.rng = random.Random(seed + 1)
+
+        for kind in list(self.faults) + [f for f in self.fault_sequence if f]:
+            if kind not in FAULT_KINDS:
+                raise ValueError(f"Unknown fault kind: {kind} (expected one of {FAULT_KINDS})")
+
+        self.recorded_requests = []
+        self.lock = threading.Lock()
+        self._response_index = 0
+        self._request_count = 0
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the running server"""
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def generate_url(self) -> str:
+        """URL to pass to AIAnalyzer(base_url=...)"""
+        return f"{self.base_url}/v1beta/models/{self.model}:generateContent"
+
+    @property
+    def stream_url(self) -> str:
+        """URL of the streaming endpoint"""
+        return f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the generateContent URL"""
+        if self._httpd:
+            return self.generate_url
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.generate_url
+
+    def stop(self) -> None:
+        """Stop the server"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def script(self, responses: List[Union[str, Dict]]) -> None:
+        """Replace the scripted responses (served in order, then cycled)"""
+        with self.lock:
+            self.responses = list(responses)
+            self._response_index = 0
+
+    def get_requests(self) -> List[Dict]:
+        """Return a copy of every request received so far"""
+        with self.lock:
+            return list(self.recorded_requests)
+
+    def reset(self) -> None:
+        """Clear recorded requests and rewind scripted responses and faults"""
+        with self.lock:
+            self.recorded_requests.clear()
+            self._response_index = 0
+            self._request_count = 0
+
+    def _next_fault(self) -> Optional[str]:
+        """Pick the fault for the next request - the sequence wins over probabilities"""
+        with self.lock:
+            index = self._request_count
+            self._request_count += 1
+            if index < len(self.fault_sequence):
+                return self.fault_sequence[index]
+
+            roll = self.rng.random()
+            cumulative = 0.0
+            for kind in FAULT_KINDS:
+                cumulative += self.faults.get(kind, 0.0)
+                if roll < cumulative:
+                    return kind
+        return None
+
+    def _next_text(self, payload: Dict) -> str:
+        """Produce the model text for a request from the script or the responder"""
+        with self.lock:
+            if self.responses:
+                response = self.responses[self._response_index % len(self.responses)]
+                self._response_index += 1
+            else:
+                response = None
+
+        if response is None:
+            response = self.responder(payload)
+        return response if isinstance(response, str) else json.dumps(response)
+
+    def _make_handler(self):
+        """Build the request handler class bound to this server instance"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                length = int(self.headers.get('Content-Length', 0))
+                raw_body = self.rfile.read(length) if length else b""
+
+                try:
+                    payload = json.loads(raw_body or b"{}")
+                except ValueError:  # Also undecodable bytes, not just bad JSON
+                    payload = None
+
+                record = {
+                    'time': time.time(),
+                    'path': parsed.path,
+                    'query': {k: v[0] for k, v in query.items()},
+                    'payload': payload,
+                    'bytes': len(raw_body)
+                }
+                with server.lock:
+                    server.recorded_requests.append(record)
+
+                if parsed.path.endswith(':generateContent'):
+                    streaming = False
+                elif parsed.path.endswith(':streamGenerateContent'):
+                    streaming = True
+                else:
+                    self._send_error(404, "NOT_FOUND", f"Unknown endpoint: {parsed.path}")
+                    return
+
+                if payload is None:
+                    self._send_error(400, "INVALID_ARGUMENT", "Invalid JSON payload received.")
+                    return
+                if not isinstance(payload, dict):
+                    self._send_error(400, "INVALID_ARGUMENT",
+                                     "Invalid JSON payload received. Root element must be a message.")
+                    return
+                if not record['query'].get('key') and not self.headers.get('x-goog-api-key'):
+                    self._send_error(403, "PERMISSION_DENIED", "Method doesn't allow unregistered callers.")
+                    return
+
+                time.sleep(server.latency.sample())
+
+                fault = server._next_fault()
+                record['fault'] = fault
+                if fault == '429':
+                    self._send_error(429, "RESOURCE_EXHAUSTED",
+                                     "Resource has been exhausted (e.g. check quota).")
+                    return
+                if fault == '500':
+                    self._send_error(500, "INTERNAL", "An internal error has occurred.")
+                    return
+
+                text = server._next_text(payload)
+                if fault == 'malformed':
+                    text = text[:max(1, len(text) // 2)]
+                elif fault == 'markdown':
+                    text = f"Here is my analysis of the base:\n```json\n{text}\n```\nGood luck!"
+
+                prompt_tokens = _estimate_prompt_tokens(payload)
+                if streaming:
+                    self._send_stream(text, prompt_tokens, record['query'].get('alt') == 'sse')
+                else:
+                    self._send_json(200, _build_response(text, prompt_tokens, server.model))
+
+            def _send_json(self, status: int, body) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, status: int, reason: str, message: str) -> None:
+                self._send_json(status, {'error': {'code': status, 'message': message, 'status': reason}})
+
+            def _send_stream(self, text: str, prompt_tokens: int, sse: bool) -> None:
+                chunk_size = max(1, len(text) // 4)
+                pieces = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+                chunks = []
+                for i, piece in enumerate(pieces):
+                    chunk = _build_response(piece, prompt_tokens, server.model)
+                    if i < len(pieces) - 1:
+                        chunk['candidates'][0].pop('finishReason')
+                    chunks.append(chunk)
+
+                if sse:
+                    data = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks).encode('utf-8')
+                    content_type = 'text/event-stream'
+                else:
+                    data = json.dumps(chunks).encode('utf-8')
+                    content_type = 'application/json; charset=UTF-8'
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def _extract_parts(payload: Dict) -> List[Dict]:
+    """Flatten the parts of every content entry in a request"""
+    parts = []
+    for content in payload.get('contents', []) or []:
+        parts.extend(content.get('parts', []) or [])
+    return parts
+
+def _estimate_prompt_tokens(payload: Dict) -> int:
+    """Rough token count: ~4 characters per text token, fixed cost per image"""
+    tokens = 0
+    for part in _extract_parts(payload):
+        if 'text' in part:
+            tokens += max(1, len(part['text']) // 4)
+        if 'inline_data' in part or 'inlineData' in part:
+            tokens += 258
+    return tokens
+
+def _build_response(text: str, prompt_tokens: int, model: str) -> Dict:
+    """Build a GenerateContentResponse body around model text"""
+    output_tokens = max(1, len(text) // 4)
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0
+        }],
+        'usageMetadata': {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_tokens + output_tokens
+        },
+        'modelVersion': model
+    }
+
+def default_responder(payload: Dict) -> Union[str, Dict]:
+    """Deterministic analysis derived from the image bytes - same image, same answer"""
+    image_data = None
+    for part in _extract_parts(payload):
+        inline = part.get('inline_data') or part.get('inlineData')
+        if inline:
+            image_data = inline.get('data', '')
+
+    if image_data is None:
+        return "OK"
+
+    rng = random.Random(hashlib.sha256(image_data.encode('utf-8')).hexdigest())
+    gold = rng.randrange(0, 1200000, 1000)
+    elixir = rng.randrange(0, 1200000, 1000)
+    dark = rng.randrange(0, 12000, 100)
+    townhall = rng.randint(8, 16)
+    attack = gold >= 300000 and elixir >= 300000 and dark >= 2000 and townhall <= 12
+
+    return {
+        'loot': {'gold': gold, 'elixir': elixir, 'dark_elixir': dark},
+        'townhall_level': townhall,
+        'difficulty': rng.choice(['Easy', 'Medium', 'Hard']),
+        'recommendation': 'ATTACK' if attack else 'SKIP',
+        'reasoning': f"Mock: Gold {gold}, Elixir {elixir}, Dark {dark}, TH level {townhall}"
+    }
+
+def main():
+    """Run the mock server in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock Gemini generateContent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MU,SIGMA (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", default=None,
+                        help="JSON file with a list of scripted responses (strings or objects)")
+    for kind in FAULT_KINDS:
+        parser.add_argument(f"--fault-{kind}", type=float, default=0.0,
+                            help=f"Probability of injecting a '{kind}' fault")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    faults = {kind: getattr(args, f"fault_{kind}") for kind in FAULT_KINDS}
+    server = MockGeminiServer(args.host, args.port, responses=responses, latency=args.latency,
+                              faults=faults, seed=args.seed)
+    url = server.start()
+    print(f"Mock Gemini server listening: {url}")
+    print("Press Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nServed {len(server.get_requests())} requests")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
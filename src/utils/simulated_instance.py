@@ -0,0 +1,250 @@
+"""
+Simulated Instances - Run the multi-instance orchestrator against fake emulator windows
+
+Each simulated instance has its own window rectangle, a capture that renders
+random "bases" as small PNGs and a virtual input sink in place of the mouse.
+AI analysis goes to the local mock Gemini server through one shared
+AIAnalyzer, exactly as real instances share one. Waits are compressed so an
+attack cycle takes seconds, and every click is checked to have landed inside
+its own instance's window.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import contextlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ..core.ai_analyzer import AIAnalyzer
+from ..core.attack_player import AttackPlayer
+from ..core.attack_recorder import AttackRecorder
+from ..core.coordinate_mapper import CoordinateMapper
+from ..core.hotkey_service import HotkeyService
+from ..core.input_backend import VirtualInputSink
+from ..core.input_events import SyntheticInputSource
+from ..core.orchestrator import Orchestrator, VisionService
+from ..core.rate_limiter import TokenBucket
+from ..core.recording_format import save_recording
+from .mock_gemini_server import MockGeminiServer
+
+# Button positions as fractions of the window (x, y)
+BUTTON_LAYOUT = {
+    'attack': (0.07, 0.90),
+    'find_a_match': (0.20, 0.75),
+    'next_button': (0.92, 0.80),
+    'end_button': (0.07, 0.78),
+    'return_home': (0.50, 0.85)
+}
+
+class SimulatedCapture:
+    """Stands in for ScreenCapture: a fixed window and generated screenshots"""
+
+    def __init__(self, name: str, bounds: Tuple[int, int, int, int], screenshot_dir: str, seed: int = 0):
+        self.name = name
+        self.game_window_bounds = tuple(bounds)
+        self.game_window_handle = None
+        self.screenshot_dir = screenshot_dir
+        self.rng = np.random.default_rng(seed)
+        self.captures = 0
+        os.makedirs(screenshot_dir, exist_ok=True)
+
+    def find_game_window(self) -> Tuple[int, int, int, int]:
+        return self.game_window_bounds
+
+    def capture_game_screen(self) -> str:
+        """A new random base each call - the mock server derives its loot from the image bytes"""
+        self.captures += 1
+        pixels = self.rng.integers(0, 256, size=(90, 160, 3), dtype=np.uint8)
+        filepath = os.path.join(self.screenshot_dir, f"{self.name}_{self.captures:05d}.png")
+        Image.fromarray(pixels).save(filepath)
+        return filepath
+
+    def grab_region(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        return self.rng.integers(0, 256, size=(region[3], region[2], 3), dtype=np.uint8)
+
+class SimulationConfig:
+    """Dict-backed stand-in for Config with dotted keys"""
+
+    def __init__(self, values: Optional[Dict] = None):
+        self.values = dict(values or {})
+
+    def get(self, key: str, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        self.values[key] = value
+
+class SimulationLogger:
+    """Keeps log lines in memory instead of printing them"""
+
+    def __init__(self):
+        self.lines = []
+
+    def _log(self, level: str, message: str) -> None:
+        self.lines.append((level, message))
+
+    def debug(self, message: str) -> None:
+        self._log('DEBUG', message)
+
+    def info(self, message: str) -> None:
+        self._log('INFO', message)
+
+    def warning(self, message: str) -> None:
+        self._log('WARNING', message)
+
+    def error(self, message: str) -> None:
+        self._log('ERROR', message)
+
+    def critical(self, message: str) -> None:
+        self._log('CRITICAL', message)
+
+def instance_bounds(index: int, width: int = 640, height: int = 360) -> Tuple[int, int, int, int]:
+    """Non-overlapping windows tiled three to a row"""
+    return (index % 3 * (width + 20), index // 3 * (height + 40), width, height)
+
+def instance_coordinates(bounds: Tuple[int, int, int, int]) -> Dict[str, Dict[str, int]]:
+    x, y, width, height = bounds
+    return {name: {'x': x + int(width * fx), 'y': y + int(height * fy)}
+            for name, (fx, fy) in BUTTON_LAYOUT.items()}
+
+def write_attack_recording(filepath: str, bounds: Tuple[int, int, int, int], taps: int = 20,
+                           duration: float = 1.0, seed: int = 0) -> None:
+    """A short troop-deploy recording made in this window"""
+    rng = random.Random(seed)
+    x, y, width, height = bounds
+    actions = [{'type': 'click', 'timestamp': duration * i / taps,
+                'x': x + rng.randint(width // 10, width * 9 // 10),
+                'y': y + rng.randint(height // 10, height * 7 // 10)} for i in range(taps)]
+    save_recording(filepath, {'name': os.path.splitext(os.path.basename(filepath))[0],
+                              'duration': duration, 'window': list(bounds)}, actions)
+
+def clicks_outside(sink: VirtualInputSink, bounds: Tuple[int, int, int, int]) -> int:
+    """Button presses that landed outside the instance's window"""
+    x, y, width, height = bounds
+    return sum(1 for _, command in sink.get_events('down')
+               if not (x <= command.x < x + width and y <= command.y < y + height))
+
+def run_simulation(instances: int = 3, duration: float = 20.0, wait_scale: float = 0.01,
+                   ai_latency: str = "uniform:0.05,0.3", max_concurrent_ai: int = 2,
+                   ai_requests_per_minute: float = 600, seed: int = 0, quiet: bool = True) -> Dict:
+    """
+    Run the orchestrator with simulated instances for a while and report on each
+
+    Args:
+        instances: Number of simulated emulator instances
+        duration: Seconds to let them run
+        wait_scale: Factor applied to every auto attacker wait (0.01 turns a 3 minute battle into 1.8 s)
+        ai_latency: Mock Gemini latency spec, e.g. 'uniform:0.05,0.3'
+        max_concurrent_ai: AI calls allowed in flight at once across all instances
+        ai_requests_per_minute: Shared rate limit of the AI analyzer
+        seed: Seed for screenshots and recordings
+        quiet: Silence component output while running
+    """
+    workdir = tempfile.mkdtemp(prefix="coc_sim_")
+    previous_dir = os.getcwd()
+    server = MockGeminiServer(latency=ai_latency, seed=seed)
+    logger = SimulationLogger()
+
+    output = open(os.devnull, 'w') if quiet else None
+    try:
+        os.chdir(workdir)  # Recordings, coordinates and screenshots all use relative paths
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            analyzer = AIAnalyzer("mock-key", logger, base_url=server.start(),
+                                  rate_limiter=TokenBucket(ai_requests_per_minute, burst=max(3, instances)))
+            vision = VisionService(analyzer, max_concurrent_ai=max_concurrent_ai)
+            config = SimulationConfig({'ai_analyzer.enabled': True, 'auto_attacker.max_search_attempts': 10})
+            hotkeys = HotkeyService(SyntheticInputSource())  # No OS keyboard hook
+            recorder = AttackRecorder(auto_detect_clicks=False)
+            orchestrator = Orchestrator(config, logger, vision, hotkeys, attack_recorder=recorder)
+
+            sinks = {}
+            for index in range(instances):
+                name = f"sim{index + 1}"
+                bounds = instance_bounds(index)
+                capture = SimulatedCapture(name, bounds, os.path.join("screenshots", name), seed + index)
+                mapper = CoordinateMapper(hotkey_service=hotkeys,
+                                          coordinates_file=os.path.join("coordinates", f"{name}.json"))
+                mapper.coordinates = instance_coordinates(bounds)
+                sinks[name] = VirtualInputSink()
+                player = AttackPlayer(screen_capture=capture, input_backend=sinks[name], hotkey_service=hotkeys,
+                                      attack_recorder=recorder)
+                # Recorded in the first window; each instance's player maps it onto its own
+                if index == 0:
+                    write_attack_recording(os.path.join(recorder.recordings_dir, "sim_attack.npz"),
+                                           bounds, seed=seed)
+                worker = orchestrator.build_worker(name, capture, mapper, sinks[name], player, ["sim_attack"])
+                worker.auto_attacker.wait_scale = wait_scale
+                orchestrator.add_worker(worker)
+
+            started = time.perf_counter()
+            orchestrator.start_all(stagger=0.1)
+            time.sleep(max(0.0, duration - (time.perf_counter() - started)))
+            orchestrator.stop_all()
+            elapsed = time.perf_counter() - started
+
+        results = []
+        for worker in orchestrator.workers.values():
+            status = worker.get_status()
+            sink = sinks[worker.name]
+            results.append({
+                'name': worker.name,
+                'window': list(status['window']),
+                'attacks': status['total_attacks'],
+                'successful': status['successful_attacks'],
+                'bases_checked': worker.screen_capture.captures,
+                'clicks': len(sink.get_events('down')),
+                'clicks_outside_window': clicks_outside(sink, worker.screen_capture.game_window_bounds)
+            })
+        return {
+            'instances': results,
+            'elapsed': elapsed,
+            'vision': vision.get_stats(),
+            'ai_usage': vision.get_usage_stats(),
+            'mock_requests': len(server.get_requests()),
+            'errors': [message for level, message in logger.lines if level in ('ERROR', 'CRITICAL')]
+        }
+    finally:
+        server.stop()
+        os.chdir(previous_dir)
+        if output:
+            output.close()
+
+def main():
+    """Run a simulation from the command line and print the per-instance results"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run several simulated emulator instances concurrently")
+    parser.add_argument("--instances", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--wait-scale", type=float, default=0.01, help="Factor applied to every bot wait")
+    parser.add_argument("--ai-latency", default="uniform:0.05,0.3", help="Mock Gemini latency spec")
+    parser.add_argument("--max-concurrent-ai", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show component output while running")
+    args = parser.parse_args()
+
+    print(f"Running {args.instances} simulated instance(s) for {args.duration:g}s...")
+    summary = run_simulation(args.instances, args.duration, args.wait_scale, args.ai_latency,
+                             args.max_concurrent_ai, seed=args.seed, quiet=not args.verbose)
+
+    print(f"\n{'instance':<10} {'window':<22} {'attacks':>8} {'bases':>6} {'clicks':>7} {'outside':>8}")
+    for result in summary['instances']:
+        window = ",".join(str(value) for value in result['window'])
+        print(f"{result['name']:<10} {window:<22} {result['attacks']:>8} {result['bases_checked']:>6} "
+              f"{result['clicks']:>7} {result['clicks_outside_window']:>8}")
+
+    vision = summary['vision']
+    print(f"\nShared AI: {vision['ai_calls']} calls, mean wait for a slot {vision['ai_mean_wait_ms']:.0f} ms, "
+          f"{summary['mock_requests']} requests served by the mock")
+    for error in summary['errors'][:5]:
+        print(f"Error: {error}")
+
+    leaked = sum(result['clicks_outside_window'] for result in summary['instances'])
+    if leaked:
+        print(f"\nFAILED: {leaked} click(s) landed outside their instance's window")
+        sys.exit(1)